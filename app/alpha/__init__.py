@@ -0,0 +1 @@
+# This file makes the alpha directory a Python package
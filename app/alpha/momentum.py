@@ -15,10 +15,72 @@ Methods:
     - frame: DataFrame with all symbols at ts
       Columns: ts, symbol, open, high, low, close, volume
     Logic:
-    - Compute momentum over lookback_days (will need precomputed history)
+    - Compute momentum over lookback_days (MomentumSignal keeps the history, see signals.py)
     - Rank symbols by momentum
     - Generate BUY orders for new entries in top K
     - Generate SELL orders for symbols dropped from top K
     - Generate adjustment orders if current qty != target qty
     Output: list of Order objects
+
+- targets(bars) -> target-quantity matrix
+    Same logic for the whole run at once, for the vectorized engine mode.
 """
+
+import math
+
+import numpy as np
+import pandas as pd
+
+from app.backtest.engine import Strategy, VectorizedStrategy
+from app.backtest.matrix import BarMatrix
+from app.backtest.order import Order
+from .signals import MomentumSignal, top_k_mask
+
+
+class MomentumStrategy(Strategy, VectorizedStrategy):
+    """
+    Momentum is measured over the last lookback_days timestamps of the run
+    (close_now / close_N_ts_ago - 1) by a MomentumSignal: streaming updates
+    in on_bar, one batch computation in targets(). Ties are broken by symbol
+    so the event and vectorized modes rank identically.
+    """
+
+    def __init__(self, lookback_days: int = 20, top_k: int = 2, dollar_per_position: float = 50_000.0):
+        super().__init__()
+        if lookback_days < 1 or top_k < 1:
+            raise ValueError("lookback_days and top_k must be positive")
+        self.lookback_days = lookback_days
+        self.top_k = top_k
+        self.dollar_per_position = dollar_per_position
+        self.signal = MomentumSignal(lookback_days)
+        # Targets at a ts only look lookback_days rows back, so chunked runs need that much history
+        self.warmup = lookback_days
+
+    ## Event mode ##
+
+    def on_bar(self, ts, frame: pd.DataFrame) -> list[Order]:
+        symbols = frame["symbol"].tolist()
+        closes = frame["close"].to_numpy(dtype=np.float64, na_value=np.nan)
+        momentum = self.signal.update(symbols, closes)
+        top = set(self.signal.top_k(self.top_k, momentum))
+
+        orders = []
+        for symbol, close in sorted(zip(symbols, closes)):
+            if np.isnan(self.signal.get(symbol)):
+                continue
+            target = math.floor(self.dollar_per_position / close) if symbol in top else 0
+            qty = target - self.positions.get(symbol, 0)
+            if qty != 0:
+                orders.append(Order(ts=ts, symbol=symbol, qty=qty, note="momentum"))
+        return orders
+
+    ## Vectorized mode ##
+
+    def targets(self, bars: BarMatrix) -> np.ndarray:
+        momentum = self.signal.compute(np.where(bars.tradable(), bars.close, np.nan))
+        top = top_k_mask(momentum, self.top_k)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            sized = np.floor(self.dollar_per_position / bars.close)
+        targets = np.where(top, sized, 0.0)
+        return np.where(np.isnan(momentum), np.nan, targets)
@@ -0,0 +1,221 @@
+"""
+Pairs Mean-Reversion Strategy (Sprint 2)
+----------------------------------------
+Goal: Trade two related assets when their price spread moves unusually far
+from normal, expecting it to revert.
+
+Screening (screen_pairs), run on a formation window before trading:
+- Correlation of log returns for all N*(N-1)/2 pairs from one matrix product.
+- Hedge ratio (OLS of log y on log x) for all pairs from the covariance
+  matrix of log prices.
+- Pairs above min_corr get an Engle-Granger style stationarity test on
+  their spread: the Dickey-Fuller t-statistic of d(spread) on the lagged
+  spread, computed for a whole chunk of pairs at once from column sums.
+  Chunks can be spread over processes (max_workers).
+- Symbols with a missing or non-positive close in the window are skipped.
+
+Strategy (PairsStrategy.on_bar):
+- spread = log(y) - hedge_ratio * log(x) per pair, z-scored over the last
+  `window` bars (SpreadZScore, see signals.py)
+- z > entry_z: short the spread (sell y, buy x); z < -entry_z: long it
+- |z| < exit_z: close the pair
+- Legs are sized at entry: dollar_per_leg of y against
+  hedge_ratio * dollar_per_leg of x. A symbol shared by several pairs
+  trades the net of their legs.
+- Short legs need Portfolio(allow_short=True); a long-only portfolio clips
+  them away and only the long leg is held. The engine's vectorized mode
+  honours allow_short the same way, so negative targets short there too.
+"""
+
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from app.backtest.engine import Strategy
+from app.backtest.matrix import BarMatrix
+from app.backtest.order import Order
+from .signals import SpreadZScore
+
+PAIR_COLUMNS = ["y", "x", "correlation", "hedge_ratio", "intercept", "adf_t", "half_life"]
+
+# Engle-Granger 5% critical value for two series
+ADF_CRITICAL_5PCT = -3.34
+
+
+## Screening ##
+
+def screen_pairs(close, symbols: Optional[list[str]] = None, min_corr: float = 0.8,
+                 max_adf_t: float = ADF_CRITICAL_5PCT, chunk_size: int = 20_000,
+                 max_workers: int = 1) -> pd.DataFrame:
+    """
+    Screen every pair of a close-price panel for mean-reverting spreads.
+    close is a BarMatrix, a (ts x symbol) DataFrame or an array with `symbols`.
+    Returns one row per accepted pair (PAIR_COLUMNS), most stationary first.
+    """
+    if isinstance(close, BarMatrix):
+        close, symbols = np.where(close.tradable(), close.close, np.nan), close.symbols
+    elif isinstance(close, pd.DataFrame):
+        close, symbols = close.to_numpy(dtype=np.float64, na_value=np.nan), list(close.columns)
+    close = np.asarray(close, dtype=np.float64)
+    if symbols is None or len(symbols) != close.shape[1]:
+        raise ValueError("symbols must name every column of close")
+
+    prices = np.where(close > 0, close, np.nan)
+    complete = np.isfinite(prices).all(axis=0)
+    names = np.asarray(symbols, dtype=object)[complete]
+    logp = np.log(prices[:, complete])
+    if logp.shape[0] < 3 or logp.shape[1] < 2:
+        return pd.DataFrame(columns=PAIR_COLUMNS)
+
+    # All-pairs statistics from two (symbol x symbol) matrix products
+    means = logp.mean(axis=0)
+    centered = logp - means
+    cov = centered.T @ centered
+    returns = np.diff(logp, axis=0)
+    returns -= returns.mean(axis=0)
+    scale = np.sqrt((returns * returns).sum(axis=0))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        corr = (returns.T @ returns) / np.outer(scale, scale)
+        hedge = cov / np.diag(cov)[None, :]
+
+    y, x = np.nonzero(np.triu(corr >= min_corr, k=1))
+    beta = hedge[y, x]
+    chunks = [(y[i:i + chunk_size], x[i:i + chunk_size], beta[i:i + chunk_size])
+              for i in range(0, len(y), chunk_size)]
+
+    if max_workers > 1 and len(chunks) > 1:
+        with ProcessPoolExecutor(max_workers=min(max_workers, os.cpu_count() or 1, len(chunks)),
+                                 initializer=_attach, initargs=(logp,)) as pool:
+            results = list(pool.map(_screen_chunk, *zip(*chunks)))
+    else:
+        results = [_adf_t(logp, *chunk) for chunk in chunks]
+
+    adf_t = np.concatenate([r[0] for r in results]) if results else np.empty(0)
+    gamma = np.concatenate([r[1] for r in results]) if results else np.empty(0)
+    keep = adf_t <= max_adf_t
+    y, x, beta, adf_t, gamma = y[keep], x[keep], beta[keep], adf_t[keep], gamma[keep]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        half_life = np.where((gamma < 0) & (gamma > -1), -math.log(2) / np.log1p(gamma), np.inf)
+
+    pairs = pd.DataFrame({
+        "y": names[y],
+        "x": names[x],
+        "correlation": corr[y, x],
+        "hedge_ratio": beta,
+        "intercept": means[y] - beta * means[x],
+        "adf_t": adf_t,
+        "half_life": half_life,
+    })
+    return pairs.sort_values(["adf_t", "y", "x"], ignore_index=True)
+
+
+def _adf_t(logp: np.ndarray, y: np.ndarray, x: np.ndarray, beta: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Dickey-Fuller t-statistic and slope of d(spread) ~ spread_lag + c, for a chunk of pairs"""
+    spread = logp[:, y] - logp[:, x] * beta
+    lag = spread[:-1]
+    diff = spread[1:] - lag
+    lag = lag - lag.mean(axis=0)
+    diff -= diff.mean(axis=0)
+
+    sxx = np.einsum("tp,tp->p", lag, lag)
+    sxy = np.einsum("tp,tp->p", lag, diff)
+    syy = np.einsum("tp,tp->p", diff, diff)
+    dof = len(lag) - 2
+    with np.errstate(divide="ignore", invalid="ignore"):
+        gamma = sxy / sxx
+        rss = np.maximum(syy - gamma * sxy, 0.0)
+        t = gamma / np.sqrt(rss / dof / sxx)
+    return np.where(np.isfinite(t), t, np.inf), gamma
+
+
+# Per-worker log prices set up once by the pool initializer
+_worker_logp: Optional[np.ndarray] = None
+
+
+def _attach(logp: np.ndarray) -> None:
+    global _worker_logp
+    _worker_logp = logp
+
+
+def _screen_chunk(y: np.ndarray, x: np.ndarray, beta: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    assert _worker_logp is not None, "worker not attached to the log prices"
+    return _adf_t(_worker_logp, y, x, beta)
+
+
+## Strategy ##
+
+class PairsStrategy(Strategy):
+    """
+    Trades a fixed set of pairs: a screen_pairs result (y, x, hedge_ratio
+    columns) or an iterable of (y, x, hedge_ratio). All pairs are updated
+    together with array operations on every bar.
+    """
+
+    def __init__(self, pairs, window: int = 20, entry_z: float = 2.0, exit_z: float = 0.5,
+                 dollar_per_leg: float = 10_000.0):
+        super().__init__()
+        if entry_z <= exit_z:
+            raise ValueError("entry_z must be above exit_z")
+        if isinstance(pairs, pd.DataFrame):
+            pairs = pairs[["y", "x", "hedge_ratio"]].itertuples(index=False, name=None)
+        pairs = list(pairs)
+        self.window = window
+        self.entry_z = entry_z
+        self.exit_z = exit_z
+        self.dollar_per_leg = dollar_per_leg
+
+        self.symbols = sorted({symbol for y, x, _ in pairs for symbol in (y, x)})
+        self._index = pd.Index(self.symbols)
+        self._y = self._index.get_indexer([y for y, _, _ in pairs])
+        self._x = self._index.get_indexer([x for _, x, _ in pairs])
+        self.hedge_ratio = np.array([h for _, _, h in pairs], dtype=np.float64)
+
+        n = len(pairs)
+        self.zscore = SpreadZScore(window, n)
+        # +1 long the spread, -1 short it, 0 flat
+        self.state = np.zeros(n, dtype=np.int64)
+        self._size_y = np.zeros(n, dtype=np.int64)
+        self._size_x = np.zeros(n, dtype=np.int64)
+
+    def on_bar(self, ts, frame: pd.DataFrame) -> list[Order]:
+        prices = np.full(len(self.symbols), np.nan)
+        pos = self._index.get_indexer(frame["symbol"])
+        closes = frame["close"].to_numpy(dtype=np.float64, na_value=np.nan)
+        ours = pos >= 0
+        prices[pos[ours]] = closes[ours]
+        prices[~(prices > 0)] = np.nan
+
+        with np.errstate(invalid="ignore"):
+            logp = np.log(prices)
+        py, px = prices[self._y], prices[self._x]
+        z = self.zscore.update(logp[self._y] - self.hedge_ratio * logp[self._x])
+
+        flat = self.state == 0
+        with np.errstate(invalid="ignore"):
+            enter_long = flat & (z < -self.entry_z)
+            enter_short = flat & (z > self.entry_z)
+            leave = ~flat & (np.abs(z) < self.exit_z)
+        entering = enter_long | enter_short
+        if entering.any():
+            self._size_y[entering] = np.floor(self.dollar_per_leg / py[entering])
+            self._size_x[entering] = np.trunc(self.hedge_ratio[entering] * self.dollar_per_leg / px[entering])
+        self.state[enter_long] = 1
+        self.state[enter_short] = -1
+        self.state[leave] = 0
+
+        # Net the legs of all pairs per symbol
+        target = np.zeros(len(self.symbols), dtype=np.int64)
+        np.add.at(target, self._y, self.state * self._size_y)
+        np.add.at(target, self._x, -self.state * self._size_x)
+
+        orders = []
+        for i in np.flatnonzero(np.isfinite(prices)).tolist():
+            symbol = self.symbols[i]
+            qty = int(target[i]) - self.positions.get(symbol, 0)
+            if qty != 0:
+                orders.append(Order(ts=ts, symbol=symbol, qty=qty, note="pairs"))
+        return orders
@@ -0,0 +1,219 @@
+"""
+Signal Engine
+-------------
+Goal: Compute lookback momentum, top-K selection and rolling spread
+z-scores once, for both engine modes.
+
+Momentum at ts (per symbol):
+    close[ts] / close[ts - N] - 1     (N timestamps back, NaN if either is missing)
+
+Modes:
+- Batch (backtests): compute(close_matrix) shifts the whole (ts x symbol)
+  matrix at once.
+- Streaming (paper trading / event loop): update(symbols, closes) pushes one
+  cross-section into a fixed-size ring buffer of the last N+1 closes per
+  symbol and returns the new momentum in O(1) per symbol.
+
+Top-K:
+- Selected with argpartition (O(N)) and only the K winners are sorted.
+- Ties are broken by symbol name in both modes, so batch and streaming
+  produce identical selections.
+
+Spread z-score (per pair, see pairs.py):
+    (spread[ts] - mean(last W spreads)) / std(last W spreads)
+- Streaming: SpreadZScore.update(spreads) keeps a ring buffer of the last W
+  spreads for all pairs plus running sums of x and x^2, so each bar costs
+  O(pairs) whatever W is; the sums are rebuilt from the buffer every W bars
+  to stop floating-point drift.
+- Batch: compute(spread_matrix) uses cumulative sums over the whole run.
+- The z-score is NaN until a pair has W finite spreads in its window.
+"""
+
+from typing import Optional, Sequence
+
+import numpy as np
+
+
+class MomentumSignal:
+
+    def __init__(self, lookback: int, capacity: int = 64):
+        if lookback < 1:
+            raise ValueError("lookback must be positive")
+        self.lookback = lookback
+        self.symbols: list[str] = []
+        self._ids: dict[str, int] = {}
+        # Ring buffer of the last lookback+1 cross-sections (rows) per symbol (columns)
+        self._buffer = np.full((lookback + 1, capacity), np.nan)
+        self._head = 0
+        self._count = 0
+        self.latest: Optional[np.ndarray] = None
+
+    ## Streaming mode ##
+
+    def _column_ids(self, symbols: Sequence[str]) -> np.ndarray:
+        ids = np.empty(len(symbols), dtype=np.int64)
+        for i, symbol in enumerate(symbols):
+            idx = self._ids.get(symbol)
+            if idx is None:
+                idx = len(self.symbols)
+                self._ids[symbol] = idx
+                self.symbols.append(symbol)
+            ids[i] = idx
+        if len(self.symbols) > self._buffer.shape[1]:
+            grown = np.full((self._buffer.shape[0], max(len(self.symbols), 2 * self._buffer.shape[1])), np.nan)
+            grown[:, :self._buffer.shape[1]] = self._buffer
+            self._buffer = grown
+        return ids
+
+    def update(self, symbols: Sequence[str], closes) -> np.ndarray:
+        """
+        Push one timestamp's closes; symbols absent from this call count as
+        missing at this ts. Returns momentum for every known symbol (in
+        self.symbols order).
+        """
+        ids = self._column_ids(symbols)
+        closes = np.asarray(closes, dtype=np.float64)
+        closes = np.where(closes > 0, closes, np.nan)
+
+        row = self._buffer[self._head]
+        row.fill(np.nan)
+        row[ids] = closes
+        oldest = self._buffer[(self._head + 1) % (self.lookback + 1)]
+        self._head = (self._head + 1) % (self.lookback + 1)
+        self._count += 1
+
+        n = len(self.symbols)
+        if self._count <= self.lookback:
+            momentum = np.full(n, np.nan)
+        else:
+            with np.errstate(divide="ignore", invalid="ignore"):
+                momentum = row[:n] / oldest[:n] - 1
+        self.latest = momentum
+        return momentum
+
+    def get(self, symbol: str) -> float:
+        """Latest momentum for one symbol (NaN if unknown or undefined)"""
+        idx = self._ids.get(symbol)
+        if idx is None or self.latest is None or idx >= len(self.latest):
+            return np.nan
+        return float(self.latest[idx])
+
+    def top_k(self, k: int, scores: Optional[np.ndarray] = None) -> list[str]:
+        """Symbols with the k highest finite scores (default: the latest momentum)"""
+        scores = self.latest if scores is None else scores
+        if scores is None:
+            return []
+        return [self.symbols[i] for i in top_k_indices(scores, k, self.symbols)]
+
+    ## Batch mode ##
+
+    def compute(self, close: np.ndarray) -> np.ndarray:
+        """Momentum for a whole (ts x symbol) close matrix with one vectorized shift"""
+        close = np.where(close > 0, close, np.nan)
+        momentum = np.full(close.shape, np.nan)
+        n = self.lookback
+        if close.shape[0] > n:
+            with np.errstate(divide="ignore", invalid="ignore"):
+                momentum[n:] = close[n:] / close[:-n] - 1
+        return momentum
+
+
+def top_k_indices(scores: np.ndarray, k: int, names: Optional[Sequence[str]] = None) -> np.ndarray:
+    """
+    Indices of the k highest finite scores, best first.
+    Ties are broken by `names` (or by index when names is None).
+    """
+    valid = np.flatnonzero(~np.isnan(scores))
+    if len(valid) > k:
+        negated = -scores[valid]
+        kth = negated[np.argpartition(negated, k - 1)[:k]].max()
+        # Keep everything tied with the k-th score so the tie-break below decides
+        valid = valid[negated <= kth]
+    tie_key: np.ndarray = np.array([names[i] for i in valid.tolist()]) if names is not None else valid
+    order = np.lexsort((tie_key, -scores[valid]))
+    return valid[order][:k]
+
+
+def top_k_mask(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Per-row mask of the k highest finite scores of a (ts x symbol) matrix.
+    Columns must be sorted by symbol: ties go to the lower column.
+    """
+    if scores.size == 0 or scores.shape[1] <= k:
+        return ~np.isnan(scores)
+    negated = np.where(np.isnan(scores), np.inf, -scores)
+
+    kth = np.partition(negated, k - 1, axis=1)[:, k - 1:k]
+    better = negated < kth
+    tied = negated == kth
+    remaining = k - better.sum(axis=1, keepdims=True)
+    mask = better | (tied & (np.cumsum(tied, axis=1) <= remaining))
+    return mask & ~np.isnan(scores)
+
+
+class SpreadZScore:
+
+    def __init__(self, window: int, n_pairs: int):
+        if window < 2:
+            raise ValueError("window must be at least 2")
+        self.window = window
+        self._buffer = np.full((window, n_pairs), np.nan)
+        self._sum = np.zeros(n_pairs)
+        self._sumsq = np.zeros(n_pairs)
+        self._count = np.zeros(n_pairs, dtype=np.int64)
+        self._head = 0
+        self._updates = 0
+        self.latest = np.full(n_pairs, np.nan)
+
+    ## Streaming mode ##
+
+    def update(self, spreads) -> np.ndarray:
+        """Push one bar of spreads (NaN = missing) and return the z-scores"""
+        spreads = np.asarray(spreads, dtype=np.float64)
+        old = self._buffer[self._head]
+        leaving = np.isfinite(old)
+        self._sum -= np.where(leaving, old, 0.0)
+        self._sumsq -= np.where(leaving, old * old, 0.0)
+        self._count -= leaving
+
+        entering = np.isfinite(spreads)
+        self._sum += np.where(entering, spreads, 0.0)
+        self._sumsq += np.where(entering, spreads * spreads, 0.0)
+        self._count += entering
+        self._buffer[self._head] = spreads
+        self._head = (self._head + 1) % self.window
+
+        self._updates += 1
+        if self._updates % self.window == 0:
+            self._sum = np.nansum(self._buffer, axis=0)
+            self._sumsq = np.nansum(self._buffer * self._buffer, axis=0)
+
+        self.latest = _zscore(spreads, self._sum, self._sumsq, self._count, self.window)
+        return self.latest
+
+    ## Batch mode ##
+
+    def compute(self, spreads: np.ndarray) -> np.ndarray:
+        """Z-scores for a whole (ts x pair) spread matrix"""
+        spreads = np.asarray(spreads, dtype=np.float64)
+        finite = np.isfinite(spreads)
+        values = np.where(finite, spreads, 0.0)
+
+        def rolling(x):
+            total = np.cumsum(x, axis=0)
+            total[self.window:] -= total[:-self.window]
+            return total
+
+        return _zscore(spreads, rolling(values), rolling(values * values), rolling(finite.astype(np.int64)),
+                       self.window)
+
+
+def _zscore(x, total, total_sq, count, window: int) -> np.ndarray:
+    """Population z-score of x from window sums; NaN unless the window is fully populated"""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = total / window
+        std = np.sqrt(np.maximum(total_sq / window - mean * mean, 0.0))
+        z = (x - mean) / std
+    # Flat windows leave rounding noise in the variance: treat them as undefined
+    flat = std <= 1e-9 * np.maximum(np.abs(mean), 1.0)
+    return np.where((count == window) & ~flat, z, np.nan)
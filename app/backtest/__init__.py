@@ -0,0 +1 @@
+# This file makes the backtest directory a Python package
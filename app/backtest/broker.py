@@ -0,0 +1,51 @@
+"""
+Broker (Sprint 1)
+-----------------
+Role:
+- Turn the Strategy's Orders into Fills using the prices available at ts.
+
+Rules (Sprint 1):
+- Market orders fill in full at the bar close.
+- Orders with qty == 0 are dropped.
+- Orders for symbols missing from prices_at_ts (missing bar, NaN or
+  non-positive close) are skipped.
+- An OrderBatch is filled with array operations and returns a FillBatch;
+  prices_at_ts may then be a dict or an array indexed by symbol code.
+"""
+
+import numpy as np
+
+from .order import Fill, OrderBatch, FillBatch
+
+
+class Broker:
+
+    def simulate(self, orders, prices_at_ts) -> list[Fill] | FillBatch:
+        """Simulate execution of orders at the current close prices"""
+        if isinstance(orders, OrderBatch):
+            return self.simulate_batch(orders, prices_at_ts)
+        fills = []
+        for order in orders:
+            if order.qty == 0:
+                continue
+            price = prices_at_ts.get(order.symbol)
+            if price is None:
+                continue
+            fills.append(Fill(ts=order.ts, symbol=order.symbol, qty=int(order.qty), price=price, note=order.note))
+        return fills
+
+    def simulate_batch(self, orders: OrderBatch, prices_at_ts) -> FillBatch:
+        """Vectorized fills for a whole OrderBatch"""
+        if isinstance(prices_at_ts, dict):
+            codes = orders.table.codes(prices_at_ts)
+            prices = np.full(len(orders.table), np.nan)
+            prices[codes] = list(prices_at_ts.values())
+        else:
+            prices = np.asarray(prices_at_ts, dtype=np.float64)
+
+        ids = orders.symbol_id
+        price = np.full(len(orders), np.nan)
+        known = ids < len(prices)
+        price[known] = prices[ids[known]]
+        ok = (orders.qty != 0) & np.isfinite(price) & (price > 0)
+        return FillBatch(orders.table, orders.ts[ok], ids[ok], orders.qty[ok], price[ok])
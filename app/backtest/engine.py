@@ -8,14 +8,15 @@ Role:
 - For each timestamp (ts) it:
     1) Provides the full cross-section to the Strategy
     2) Receives zero-or-more Orders from the Strategy.
+    2b) Clips the Orders to the risk limits (optional RiskEngine, app/risk).
     3) Sends Orders + current prices to Broker to simulate Fills.
     4) Applies Fills to the Portfolio (cash, positions).
     5) Marks the Portfolio to market and records equity.
 
 Inputs:
 - Bars DataFrame with columns: [ts, symbol, open, high, low, close, volume]
-- Strategy instance exposing: on_bar(ts, frame) -> list[Order]
-- Broker instance exposing: simulate(orders, prices_at_ts) -> list[Fill]
+- Strategy instance exposing: on_bar(ts, frame) -> list[Order] | OrderBatch
+- Broker instance exposing: simulate(orders, prices_at_ts) -> list[Fill] | FillBatch
 - Portfolio instance exposing:
     apply_fills(fills, prices_at_ts) -> None
     mark_to_market(ts, prices_at_ts) -> float (equity)
@@ -23,6 +24,7 @@ Inputs:
 Outputs:
 - equity_timeseries: list[dict(ts, equity)]
 - trades_log: list[dict(ts, symbol, qty, price)]
+  (a columnar TradesLog that reads like that list and exports to Arrow/Parquet)
 
 Assumptions (Sprint 1):
 - Daily bars; market orders fill at close.
@@ -34,4 +36,359 @@ Edge Cases to handle (later in code):
 - Missing symbol price when filling (skip that order).
 - NaN prices: skip trading for that symbol on this ts.
 
-"""
\ No newline at end of file
+Vectorized mode:
+- run(bars, mode="vectorized") pivots the bars once into (ts x symbol)
+  matrices (see matrix.py) instead of slicing a frame per ts.
+- The Strategy must also implement VectorizedStrategy and return either a
+  target-quantity or a target-weight matrix for the whole run.
+- Fills, cash, positions and equity are computed with array operations and
+  follow the same rules as Broker/Portfolio (sells before buys, buys clipped
+  to available cash in symbol order, sells floored at flat unless the
+  Portfolio allows shorts, last known price for marks), so both
+  modes produce the same equity_timeseries and trades_log. Each ts' trades
+  are logged as the Portfolio applies them, sells then buys, in symbol
+  order (the event log follows the Strategy's order within each side, so
+  the logs match entry for entry when on_bar emits orders by symbol).
+- Risk limits are checked per ts against the live portfolio, so a
+  RiskEngine is only supported in the event mode.
+- A Portfolio passed in with holdings starts from them in both modes; the
+  vectorized mode requires every held symbol to be in the bars.
+
+Intraday / long runs:
+- Memory should not grow with the number of bars. run_matrix(bars,
+  chunk_rows=N) walks a (typically memory-mapped, see BarMatrix.load /
+  from_store) matrix N timestamps at a time and carries cash, positions and
+  marks across chunks, so only one chunk of prices, targets and trades is
+  in memory. A strategy's targets are computed per chunk on the chunk plus
+  `warmup` rows of history before it; strategies that need the whole run
+  (warmup None) are run in one piece.
+- run_frames(frames) is the event mode over a stream of long-format chunks
+  (e.g. BarMatrix.iter_frames or BarStore reads); every timestamp must be
+  whole within one chunk.
+
+Timing breakdown (app/core/instrument.py):
+- With BacktestEngine(timings=True), or while a process-wide recorder is
+  enabled, each run times its stages (on_bar, risk_check, simulate,
+  apply_fills, mark_to_market; targets and simulate_matrix in the
+  vectorized mode) and returns the table as BacktestResult.timings.
+- The stage callables are wrapped once per run, so with timings off the
+  loop calls them directly and pays nothing.
+"""
+
+import math
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from typing import Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+from app.core import instrument
+from .broker import Broker
+from .matrix import BarMatrix
+from .order import FillBatch, Order, TradesLog
+from .portfolio import Portfolio
+
+
+class Strategy(ABC):
+    """Event-loop strategy contract"""
+
+    def __init__(self):
+        self.positions: dict[str, int] = {}
+
+    @abstractmethod
+    def on_bar(self, ts, frame: pd.DataFrame) -> list[Order]:
+        """Return the orders to place at ts given all rows for ts (a list or an OrderBatch)"""
+        pass
+
+    def on_fills(self, fills) -> None:
+        """Keep the strategy's view of its positions in sync with the portfolio"""
+        if isinstance(fills, FillBatch):
+            symbols = fills.table.symbols
+            deltas = ((symbols[i], q) for i, q in zip(fills.symbol_id.tolist(), fills.qty.tolist()))
+        else:
+            deltas = ((fill.symbol, fill.qty) for fill in fills)
+        for symbol, qty in deltas:
+            position = self.positions.get(symbol, 0) + qty
+            if position == 0:
+                self.positions.pop(symbol, None)
+            else:
+                self.positions[symbol] = position
+
+
+class VectorizedStrategy(ABC):
+    """
+    Whole-run strategy contract for the vectorized mode.
+    target_kind is "quantity" (shares) or "weight" (fraction of equity).
+    NaN entries mean "no order at this ts" (keep the current position).
+    warmup is how many rows before a ts its target depends on (e.g. a
+    lookback); None means the whole history, which disables chunked runs.
+    """
+    target_kind = "quantity"
+    warmup: Optional[int] = None
+
+    @abstractmethod
+    def targets(self, bars: BarMatrix) -> np.ndarray:
+        """Return a (ts x symbol) target matrix aligned with bars"""
+        pass
+
+
+@dataclass
+class BacktestResult:
+    equity_timeseries: list[dict] = field(default_factory=list)
+    trades_log: TradesLog = field(default_factory=TradesLog)
+    # Per-stage timing table (instrument.SUMMARY_COLUMNS) when timings were recorded
+    timings: Optional[pd.DataFrame] = None
+
+
+class BacktestEngine:
+
+    def __init__(self, strategy, broker: Optional[Broker] = None, portfolio: Optional[Portfolio] = None,
+                 initial_cash: float = 1_000_000.0, risk=None, timings: bool = False):
+        self.strategy = strategy
+        self.broker = broker or Broker()
+        # Optional pre-trade RiskEngine (app.risk.engine)
+        self.risk = risk
+        self.portfolio = portfolio or Portfolio(initial_cash)
+        # Shared by the portfolio ledger, the trades log and any OrderBatch the strategy builds
+        self.symbols = self.portfolio.symbols
+        # Record a per-run stage breakdown even when no process-wide recorder is enabled
+        self.timings = timings
+
+    def run(self, bars: pd.DataFrame, mode: str = "event") -> BacktestResult:
+        """Run the backtest over a long-format bars frame"""
+        if mode == "event":
+            return self._run_event(bars)
+        if mode == "vectorized":
+            return self.run_matrix(BarMatrix.from_frame(bars))
+        raise ValueError(f"Unknown backtest mode: {mode}")
+
+    ## Event loop ##
+
+    def _run_event(self, bars: pd.DataFrame) -> BacktestResult:
+        return self.run_frames([bars])
+
+    def run_frames(self, frames: Iterable[pd.DataFrame]) -> BacktestResult:
+        """Run the event loop over consecutive long-format chunks of one run"""
+        recorder = self._recorder()
+        on_bar, check = self.strategy.on_bar, self.risk.check if self.risk is not None else None
+        simulate, apply_fills = self.broker.simulate, self.portfolio.apply_fills
+        mark_to_market = self.portfolio.mark_to_market
+        if recorder is not None:
+            on_bar = recorder.wrap("on_bar", on_bar, instrument.frame_rows)
+            check = recorder.wrap("risk_check", check) if check is not None else None
+            simulate = recorder.wrap("simulate", simulate)
+            apply_fills = recorder.wrap("apply_fills", apply_fills)
+            mark_to_market = recorder.wrap("mark_to_market", mark_to_market)
+
+        if isinstance(self.strategy, Strategy):
+            # The strategy sizes its orders from the holdings the Portfolio starts with
+            self.strategy.positions = self.portfolio.positions
+        trades_log = None
+        for bars in frames:
+            if trades_log is None:
+                trades_log = TradesLog(self.symbols, tz=getattr(bars["ts"].dt, "tz", None))
+            groups = bars.groupby("ts", sort=True)
+            self.portfolio.reserve(groups.ngroups)
+            for ts, frame in groups:
+                orders = on_bar(ts, frame) or []
+                prices_at_ts = prices_at(frame)
+                if check is not None:
+                    orders = check(ts, orders, self.portfolio, prices_at_ts)
+                fills = simulate(orders, prices_at_ts)
+                fills = apply_fills(fills, prices_at_ts)
+                self.strategy.on_fills(fills)
+                mark_to_market(ts, prices_at_ts)
+                trades_log.append(fills)
+        if trades_log is None:
+            trades_log = TradesLog(self.symbols)
+
+        return BacktestResult(equity_timeseries=self.portfolio.equity_history, trades_log=trades_log,
+                              timings=self._finish(recorder))
+
+    def _recorder(self) -> Optional[instrument.Recorder]:
+        """A fresh recorder for this run, or None when nothing is timing"""
+        return instrument.Recorder() if self.timings or instrument.active() is not None else None
+
+    def _finish(self, recorder: Optional[instrument.Recorder]) -> Optional[pd.DataFrame]:
+        if recorder is None:
+            return None
+        shared = instrument.active()
+        if shared is not None:
+            shared.merge(recorder)
+        return recorder.summary()
+
+    ## Vectorized ##
+
+    def run_matrix(self, bars: BarMatrix, chunk_rows: Optional[int] = None) -> BacktestResult:
+        """
+        Run the vectorized mode on an already pivoted BarMatrix, in chunks of
+        chunk_rows timestamps when given (see "Intraday / long runs" above)
+        """
+        if not isinstance(self.strategy, VectorizedStrategy):
+            raise ValueError(f"{type(self.strategy).__name__} does not implement VectorizedStrategy")
+        if self.risk is not None:
+            raise ValueError("Risk limits are only enforced in the event mode")
+        if self.strategy.target_kind not in ("quantity", "weight"):
+            raise ValueError(f"Unknown target kind: {self.strategy.target_kind}")
+
+        n_ts, n_sym = bars.shape
+        warmup = self.strategy.warmup
+        if chunk_rows is None or warmup is None:
+            chunk_rows = max(n_ts, 1)
+
+        outside = sorted(set(self.portfolio.positions) - set(bars.symbols))
+        if outside:
+            raise ValueError(f"Portfolio holds symbols that are not in the bars: {outside}")
+
+        recorder = self._recorder()
+        codes = self.symbols.codes(bars.symbols)
+        # Start from the Portfolio's holdings, like the event mode
+        positions = self.portfolio.shares(self.symbols, codes).astype(np.float64)
+        marks = self.portfolio.marks(self.symbols, codes).copy()
+        cash = self.portfolio.cash
+        allow_short = self.portfolio.allow_short
+        trades_log = TradesLog(self.symbols, tz=bars.index.tz)
+        index_ns = bars.index.as_unit("ns").asi8
+        for start in range(0, n_ts, chunk_rows):
+            stop = min(start + chunk_rows, n_ts)
+            history = start if warmup is None else min(start, warmup)
+            whole = start == 0 and stop == n_ts
+            chunk = bars if whole else bars.window(start, stop)
+
+            started = time.perf_counter_ns()
+            context = chunk if history == 0 else bars.window(start - history, stop)
+            targets = np.asarray(self.strategy.targets(context), dtype=np.float64)
+            if recorder is not None:
+                recorder.record("targets", time.perf_counter_ns() - started, (stop - start) * n_sym)
+                started = time.perf_counter_ns()
+            if targets.shape != (stop - start + history, n_sym):
+                raise ValueError(f"Target matrix shape {targets.shape} does not match bars "
+                                 f"{(stop - start + history, n_sym)}")
+            targets = targets[history:]
+
+            tradable = chunk.tradable()
+            close = np.where(tradable, chunk.close, np.nan)
+            result = None
+            if self.strategy.target_kind == "quantity":
+                result = _simulate_unconstrained(close, tradable, targets, cash, positions, marks, allow_short)
+            if result is None:
+                result = _simulate_rows(close, tradable, targets, cash, self.strategy.target_kind == "weight",
+                                        positions, marks, allow_short)
+            positions, trades, cash_hist, equity = result
+            cash = float(cash_hist[-1])
+            marks = _ffill(close, marks)[-1]
+            if recorder is not None:
+                recorder.record("simulate_matrix", time.perf_counter_ns() - started, (stop - start) * n_sym)
+
+            if start == 0:
+                self.portfolio.record_equity_curve(chunk.index, equity)
+                self.portfolio.reserve(n_ts - stop)
+            else:
+                self.portfolio.append_equity_curve(chunk.index, equity)
+            # Log each ts' fills like the event mode applies them: sells, then buys, in symbol order
+            rows, cols = np.nonzero(trades)
+            order = np.lexsort((cols, trades[rows, cols] > 0, rows))
+            rows, cols = rows[order], cols[order]
+            trades_log.append(FillBatch(self.symbols, index_ns[start:stop][rows], codes[cols],
+                                        trades[rows, cols].astype(np.int64), close[rows, cols]))
+
+        # Keep the Portfolio consistent with the event mode's end state
+        held = np.flatnonzero(positions)
+        self.portfolio.cash = cash
+        self.portfolio.set_positions({bars.symbols[j]: int(positions[j]) for j in held},
+                                     marks={bars.symbols[j]: float(marks[j]) for j in held})
+        if n_ts == 0:
+            self.portfolio.record_equity_curve(bars.index, np.empty(0))
+        return BacktestResult(equity_timeseries=self.portfolio.equity_history, trades_log=trades_log,
+                              timings=self._finish(recorder))
+
+
+def prices_at(frame: pd.DataFrame) -> dict[str, float]:
+    """Close prices usable for fills at this ts (finite and > 0)"""
+    close = frame["close"].to_numpy(dtype=np.float64, na_value=np.nan)
+    ok = np.isfinite(close) & (close > 0)
+    return dict(zip(frame["symbol"].to_numpy()[ok], close[ok].tolist()))
+
+
+def _ffill(values: np.ndarray, fill_value) -> np.ndarray:
+    """Forward-fill NaNs down each column, seeding leading NaNs with fill_value (scalar or per column)"""
+    mask = np.isnan(values)
+    idx = np.where(mask, 0, np.arange(values.shape[0])[:, None])
+    np.maximum.accumulate(idx, axis=0, out=idx)
+    filled = values[idx, np.arange(values.shape[1])]
+    seen = np.maximum.accumulate(~mask, axis=0)
+    return np.where(seen, filled, fill_value)
+
+
+def _simulate_unconstrained(close, tradable, targets, cash0, positions0, marks0, allow_short: bool = False):
+    """
+    Fully vectorized path for quantity targets: assume every order fills,
+    then verify cash never went negative. Returns None if it did, in which
+    case clipping is needed and the row-by-row path takes over.
+    positions0 / marks0 carry the state in from the previous chunk.
+    Negative targets are floored at flat unless allow_short.
+    """
+    wanted = np.where(tradable, np.maximum(np.trunc(targets), -np.inf if allow_short else 0.0), np.nan)
+    held = _ffill(wanted, positions0)
+    trades = np.diff(held, axis=0, prepend=positions0[None, :])
+    spend = np.nansum(trades * close, axis=1)
+    cash = cash0 - np.cumsum(spend)
+    if len(cash) and cash.min() < 0:
+        return None
+    marks = _ffill(close, marks0)
+    equity = cash + (held * marks).sum(axis=1)
+    positions = held[-1] if len(held) else positions0
+    return positions, trades, cash, equity
+
+
+def _simulate_rows(close, tradable, targets, cash0, weights: bool, positions0, marks0, allow_short: bool = False):
+    """Row-by-row path with array math across symbols; handles clipping and weights"""
+    n_ts, n_sym = close.shape
+    positions = positions0.copy()
+    marks = marks0
+    trades = np.zeros((n_ts, n_sym))
+    cash_hist = np.empty(n_ts)
+    equity = np.empty(n_ts)
+    cash = cash0
+    floor = -np.inf if allow_short else 0.0
+
+    for t in range(n_ts):
+        ok = tradable[t]
+        px = close[t]
+        marks = np.where(ok, px, marks)
+
+        target = targets[t]
+        if weights:
+            equity_pre = cash + positions @ marks
+            with np.errstate(divide="ignore", invalid="ignore"):
+                target = np.trunc(target * equity_pre / px)
+        active = ok & ~np.isnan(target)
+        delta = np.where(active, np.maximum(np.trunc(target), floor) - positions, 0.0)
+
+        sells = delta < 0
+        if sells.any():
+            cash -= delta[sells] @ px[sells]
+            positions[sells] += delta[sells]
+
+        buys = delta > 0
+        if buys.any():
+            cost = delta[buys] @ px[buys]
+            if cost > cash:
+                # Clip sequentially in symbol order, like Portfolio.apply_fills
+                for j in np.flatnonzero(buys):
+                    qty = delta[j]
+                    if qty * px[j] > cash:
+                        qty = math.floor(cash / px[j])
+                    delta[j] = qty
+                    cash -= qty * px[j]
+            else:
+                cash -= cost
+            positions[buys] += delta[buys]
+
+        trades[t] = delta
+        cash_hist[t] = cash
+        equity[t] = cash + positions @ marks
+
+    return positions, trades, cash_hist, equity
@@ -0,0 +1,200 @@
+"""
+Bar Matrix
+----------
+Role:
+- Pivot long-format bars [ts, symbol, open, high, low, close, volume] once
+  into dense (ts x symbol) NumPy arrays for the vectorized engine mode.
+
+- Keep long intraday histories on disk: save()/load() store the arrays as
+  .npy files that load() memory-maps, and from_store() builds them straight
+  from a BarStore one year at a time, so neither the long frame nor the
+  full matrices ever have to fit in memory.
+
+Layout:
+- index: sorted unique timestamps (rows)
+- symbols: sorted unique symbols (columns)
+- one float64 array per field, NaN where a symbol has no bar at ts
+- On disk: <dir>/index.npy (int64 ns, UTC), <dir>/<field>.npy and
+  <dir>/meta.json (symbols, tz)
+
+window(start, stop) and iter_frames() slice rows without copying, so a
+memory-mapped matrix is only paged in for the rows being used.
+"""
+
+import json
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator, Optional
+
+import numpy as np
+import pandas as pd
+
+FIELDS = ("open", "high", "low", "close", "volume")
+
+
+@dataclass
+class BarMatrix:
+    index: pd.DatetimeIndex
+    symbols: list[str]
+    open: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+    volume: np.ndarray
+
+    @classmethod
+    def from_frame(cls, bars: pd.DataFrame) -> "BarMatrix":
+        """Build the matrices from a long-format bars frame in a single pass"""
+        if bars.duplicated(["ts", "symbol"]).any():
+            raise ValueError("Bars must be unique on (ts, symbol)")
+
+        ts_codes, index = pd.factorize(bars["ts"], sort=True)
+        sym_codes, symbols = pd.factorize(bars["symbol"], sort=True)
+        shape = (len(index), len(symbols))
+
+        arrays = {}
+        for field in FIELDS:
+            values = np.full(shape, np.nan)
+            if field in bars.columns:
+                values[ts_codes, sym_codes] = bars[field].to_numpy(dtype=np.float64, na_value=np.nan)
+            arrays[field] = values
+
+        return cls(index=pd.DatetimeIndex(index), symbols=[str(s) for s in symbols], **arrays)
+
+    @property
+    def shape(self) -> tuple[int, int]:
+        return self.close.shape
+
+    def window(self, start: int, stop: int) -> "BarMatrix":
+        """Rows [start, stop) as views of this matrix's arrays (no copy, also for memory maps)"""
+        return BarMatrix(index=self.index[start:stop], symbols=self.symbols,
+                         **{field: getattr(self, field)[start:stop] for field in FIELDS})
+
+    def iter_frames(self, chunk_rows: int = 10_000) -> Iterator[pd.DataFrame]:
+        """
+        Long-format bars chunk_rows timestamps at a time (cells with no field
+        set are dropped), for running the event mode over a memory-mapped
+        matrix without building the whole frame
+        """
+        categories = pd.CategoricalDtype(self.symbols)
+        for start in range(0, self.shape[0], chunk_rows):
+            chunk = self.window(start, start + chunk_rows)
+            values = {field: np.asarray(getattr(chunk, field)) for field in FIELDS}
+            present = ~np.isnan(np.stack(list(values.values()))).all(axis=0)
+            rows, cols = np.nonzero(present)
+            yield pd.DataFrame({
+                "ts": chunk.index[rows],
+                "symbol": pd.Categorical.from_codes(cols, dtype=categories),
+                **{field: array[rows, cols] for field, array in values.items()},
+            })
+
+    ## On disk ##
+
+    def save(self, directory) -> Path:
+        """Write the matrix as .npy files that load() can memory-map"""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        np.save(directory / "index.npy", self.index.as_unit("ns").asi8)
+        for field in FIELDS:
+            np.save(directory / f"{field}.npy", np.asarray(getattr(self, field), dtype=np.float64))
+        _write_meta(directory, self.symbols, self.index.tz)
+        return directory
+
+    @classmethod
+    def load(cls, directory, mmap: bool = True) -> "BarMatrix":
+        """Open a saved matrix; with mmap the field arrays are read-only memory maps"""
+        directory = Path(directory)
+        meta = json.loads((directory / "meta.json").read_text())
+        index = pd.DatetimeIndex(np.load(directory / "index.npy").view("datetime64[ns]"))
+        if meta["tz"] is not None:
+            index = index.tz_localize("UTC").tz_convert(meta["tz"])
+        return cls(index=index, symbols=meta["symbols"],
+                   **{field: np.load(directory / f"{field}.npy", mmap_mode="r" if mmap else None) for field in FIELDS})
+
+    @classmethod
+    def from_store(cls, store, directory, symbols: Optional[list[str]] = None, start=None, end=None,
+                   interval: str = "1d") -> "BarMatrix":
+        """
+        Pivot a BarStore's bars into memory-mapped matrices under directory,
+        reading one calendar year at a time (peak memory: one year of bars).
+        Works for derived intervals too (store.read resamples them).
+        """
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        years = _years(store, symbols, start, end, interval)
+
+        # Pass 1: the timestamp index and the symbols, from the key columns only
+        stamps, names = [], set()
+        for lo, hi in years:
+            keys = store.read(symbols, start=lo, end=hi, columns=[], interval=interval)
+            stamps.append(np.unique(_ts_ns(keys["ts"])))
+            names.update(keys["symbol"].astype(str).unique())
+        index_ns = np.unique(np.concatenate(stamps)) if stamps else np.empty(0, dtype=np.int64)
+        symbols = sorted(names)
+        np.save(directory / "index.npy", index_ns)
+        _write_meta(directory, symbols, "UTC")
+
+        # Pass 2: scatter each year's bars into the preallocated on-disk arrays
+        shape = (len(index_ns), len(symbols))
+        arrays = {field: np.lib.format.open_memmap(directory / f"{field}.npy", mode="w+", dtype=np.float64,
+                                                   shape=shape) for field in FIELDS}
+        for array in arrays.values():
+            array.fill(np.nan)
+        codes = {symbol: i for i, symbol in enumerate(symbols)}
+        for lo, hi in years:
+            bars = store.read(symbols, start=lo, end=hi, interval=interval)
+            if bars.empty:
+                continue
+            rows = np.searchsorted(index_ns, _ts_ns(bars["ts"]))
+            cols = bars["symbol"].map(codes).to_numpy(dtype=np.int64)
+            for field in FIELDS:
+                arrays[field][rows, cols] = bars[field].to_numpy(dtype=np.float64, na_value=np.nan)
+        for array in arrays.values():
+            array.flush()
+        del arrays
+        return cls.load(directory)
+
+    def tradable(self) -> np.ndarray:
+        """Mask of cells with a usable close (finite and > 0)"""
+        close = self.close
+        return np.isfinite(close) & (close > 0)
+
+
+def _write_meta(directory: Path, symbols: list[str], tz) -> None:
+    meta = {"symbols": [str(s) for s in symbols], "tz": str(tz) if tz is not None else None}
+    (directory / "meta.json").write_text(json.dumps(meta))
+
+
+def _ts_ns(ts: pd.Series) -> np.ndarray:
+    return pd.DatetimeIndex(ts).as_unit("ns").asi8
+
+
+def _years(store, symbols, start, end, interval: str) -> list[tuple]:
+    """
+    Calendar-year (lo, hi) read bounds covering [start, end]. Years come from
+    the store's partition layout; the first and last ranges stay open-ended
+    (None) when start / end are not given.
+    """
+    start, end = _utc(start), _utc(end)
+    years = store.years(symbols, interval)
+    if start is not None:
+        years = [year for year in years if year >= start.year] or [start.year]
+    if end is not None:
+        years = [year for year in years if year <= end.year] or [end.year]
+    if not years:
+        return []
+    ranges = []
+    for year in range(years[0], years[-1] + 1):
+        lo = pd.Timestamp(f"{year}-01-01", tz="UTC")
+        hi = pd.Timestamp(f"{year + 1}-01-01", tz="UTC") - pd.Timedelta(1, "ns")
+        ranges.append((lo, hi))
+    ranges[0] = (start, ranges[0][1])
+    ranges[-1] = (ranges[-1][0], end)
+    return ranges
+
+
+def _utc(value) -> Optional[pd.Timestamp]:
+    if value is None:
+        return None
+    ts = pd.Timestamp(value)
+    return ts.tz_localize("UTC") if ts.tzinfo is None else ts.tz_convert("UTC")
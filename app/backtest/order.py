@@ -22,4 +22,234 @@ Notes:
 - Market-only in Sprint 1 (fills at close).
 - Direction: qty > 0 buy; qty < 0 sell.
 - Later sprints can add order_id, limit price, partial fills, fees, slippage.
+
+Representations:
+- Order / Fill: one record each, with __slots__ (event path, small lists).
+- OrderBatch / FillBatch: columnar NumPy arrays (ts as int64 ns, symbol as
+  an int32 code from a shared SymbolTable, qty, price) for strategies and
+  engines that emit many orders per ts.
+- TradesLog: append-only columnar fill storage; exports to Arrow/Parquet
+  directly and only builds dicts when rows are read one by one.
 """
+
+from dataclasses import dataclass
+from datetime import tzinfo
+from typing import Any, Iterable, Iterator, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+
+@dataclass(slots=True)
+class Order:
+    """A market order to trade `qty` shares of `symbol` at the close of `ts`."""
+    ts: Any
+    symbol: str
+    qty: int
+    note: str = ""
+
+
+@dataclass(slots=True)
+class Fill:
+    """The executed result of an Order."""
+    ts: Any
+    symbol: str
+    qty: int
+    price: float
+    note: str = ""
+
+    def to_dict(self) -> dict:
+        """Row for the engine's trades_log"""
+        return {"ts": self.ts, "symbol": self.symbol, "qty": self.qty, "price": self.price}
+
+
+class SymbolTable:
+    """Interns symbol strings to dense int32 codes shared by batches, broker and portfolio"""
+
+    def __init__(self, symbols: Iterable[str] = ()):
+        self.symbols: list[str] = []
+        self._codes: dict[str, int] = {}
+        for symbol in symbols:
+            self.code(symbol)
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    def code(self, symbol: str) -> int:
+        code = self._codes.get(symbol)
+        if code is None:
+            code = len(self.symbols)
+            self._codes[symbol] = code
+            self.symbols.append(symbol)
+        return code
+
+    def codes(self, symbols: Iterable[str]) -> np.ndarray:
+        return np.fromiter((self.code(s) for s in symbols), dtype=np.int32)
+
+    def symbol(self, code: int) -> str:
+        return self.symbols[code]
+
+
+def _ts_ns(ts) -> int:
+    return pd.Timestamp(ts).value
+
+
+def _from_ns(value: int, tz: Optional[Union[str, tzinfo]]) -> pd.Timestamp:
+    ts = pd.Timestamp(value)
+    return ts.tz_localize("UTC").tz_convert(tz) if tz is not None else ts
+
+
+@dataclass(slots=True)
+class OrderBatch:
+    """Columnar orders: ts (int64 ns since epoch), symbol_id (int32), qty (int64)"""
+    table: SymbolTable
+    ts: np.ndarray
+    symbol_id: np.ndarray
+    qty: np.ndarray
+    note: str = ""
+
+    def __len__(self) -> int:
+        return len(self.qty)
+
+    @classmethod
+    def from_arrays(cls, table: SymbolTable, ts, symbol_id, qty, note: str = "") -> "OrderBatch":
+        symbol_id = np.asarray(symbol_id, dtype=np.int32)
+        ts = np.broadcast_to(np.asarray(ts if np.ndim(ts) else _ts_ns(ts), dtype=np.int64), symbol_id.shape)
+        return cls(table, ts, symbol_id, np.asarray(qty, dtype=np.int64), note)
+
+    @classmethod
+    def from_orders(cls, orders: Sequence[Order], table: SymbolTable) -> "OrderBatch":
+        return cls.from_arrays(
+            table,
+            np.fromiter((_ts_ns(o.ts) for o in orders), dtype=np.int64, count=len(orders)),
+            table.codes(o.symbol for o in orders),
+            np.fromiter((o.qty for o in orders), dtype=np.int64, count=len(orders)),
+        )
+
+    def to_orders(self) -> list[Order]:
+        return [
+            Order(ts=pd.Timestamp(t, tz="UTC"), symbol=self.table.symbol(s), qty=int(q), note=self.note)
+            for t, s, q in zip(self.ts.tolist(), self.symbol_id.tolist(), self.qty.tolist())
+        ]
+
+
+@dataclass(slots=True)
+class FillBatch:
+    """Columnar fills: ts (int64 ns since epoch), symbol_id (int32), qty (int64), price (float64)"""
+    table: SymbolTable
+    ts: np.ndarray
+    symbol_id: np.ndarray
+    qty: np.ndarray
+    price: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.qty)
+
+    @classmethod
+    def from_fills(cls, fills: Sequence[Fill], table: SymbolTable) -> "FillBatch":
+        n = len(fills)
+        return cls(
+            table,
+            np.fromiter((_ts_ns(f.ts) for f in fills), dtype=np.int64, count=n),
+            table.codes(f.symbol for f in fills),
+            np.fromiter((f.qty for f in fills), dtype=np.int64, count=n),
+            np.fromiter((f.price for f in fills), dtype=np.float64, count=n),
+        )
+
+    def take(self, mask) -> "FillBatch":
+        """Subset of rows (boolean mask or indices)"""
+        return FillBatch(self.table, self.ts[mask], self.symbol_id[mask], self.qty[mask], self.price[mask])
+
+    def to_fills(self) -> list[Fill]:
+        return [
+            Fill(ts=pd.Timestamp(t, tz="UTC"), symbol=self.table.symbol(s), qty=int(q), price=p)
+            for t, s, q, p in zip(self.ts.tolist(), self.symbol_id.tolist(), self.qty.tolist(), self.price.tolist())
+        ]
+
+
+class TradesLog:
+    """
+    Append-only columnar trades log. Behaves like the spec's list of
+    {ts, symbol, qty, price} dicts when indexed or iterated, but stores
+    NumPy chunks and exports to Arrow/Parquet without building dicts.
+    """
+
+    def __init__(self, table: Optional[SymbolTable] = None, tz: Optional[Union[str, tzinfo]] = "UTC"):
+        self.table = table or SymbolTable()
+        # Time zone of the ts values handed back by __getitem__/__iter__ (None: naive)
+        self.tz = tz
+        self._chunks: list[FillBatch] = []
+        self._merged: Optional[FillBatch] = None
+
+    def append(self, fills) -> None:
+        """Add a FillBatch or a list of Fill records"""
+        if not isinstance(fills, FillBatch):
+            fills = FillBatch.from_fills(fills, self.table)
+        elif fills.table is not self.table:
+            fills = FillBatch(self.table, fills.ts, self.table.codes(fills.table.symbols)[fills.symbol_id],
+                              fills.qty, fills.price)
+        if len(fills):
+            self._chunks.append(fills)
+            self._merged = None
+
+    def columns(self) -> FillBatch:
+        """All fills as one FillBatch (concatenated lazily and cached)"""
+        if self._merged is None:
+            chunks = self._chunks
+            self._merged = FillBatch(
+                self.table,
+                np.concatenate([c.ts for c in chunks]) if chunks else np.empty(0, np.int64),
+                np.concatenate([c.symbol_id for c in chunks]) if chunks else np.empty(0, np.int32),
+                np.concatenate([c.qty for c in chunks]) if chunks else np.empty(0, np.int64),
+                np.concatenate([c.price for c in chunks]) if chunks else np.empty(0, np.float64),
+            )
+            self._chunks = [self._merged] if chunks else []
+        return self._merged
+
+    def __len__(self) -> int:
+        return sum(len(c) for c in self._chunks)
+
+    def _row(self, i: int) -> dict:
+        cols = self.columns()
+        return {
+            "ts": _from_ns(int(cols.ts[i]), self.tz),
+            "symbol": self.table.symbol(int(cols.symbol_id[i])),
+            "qty": int(cols.qty[i]),
+            "price": float(cols.price[i]),
+        }
+
+    def __getitem__(self, i: int) -> dict:
+        n = len(self)
+        if i < 0:
+            i += n
+        if not 0 <= i < n:
+            raise IndexError("trades log index out of range")
+        return self._row(i)
+
+    def __iter__(self) -> Iterator[dict]:
+        for i in range(len(self)):
+            yield self._row(i)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, TradesLog):
+            other = list(other)
+        return isinstance(other, list) and list(self) == other
+
+    def to_arrow(self):
+        """Arrow table with ts (UTC), dictionary-encoded symbol, qty and price"""
+        import pyarrow as pa
+
+        cols = self.columns()
+        symbol = pa.DictionaryArray.from_arrays(pa.array(cols.symbol_id, pa.int32()),
+                                                pa.array(self.table.symbols, pa.string()))
+        return pa.table({
+            "ts": pa.array(cols.ts, pa.timestamp("ns", tz=str(self.tz) if self.tz is not None else None)),
+            "symbol": symbol,
+            "qty": pa.array(cols.qty, pa.int64()),
+            "price": pa.array(cols.price, pa.float64()),
+        })
+
+    def to_parquet(self, path: str) -> None:
+        import pyarrow.parquet as pq
+
+        pq.write_table(self.to_arrow(), path)
@@ -22,4 +22,310 @@ Key responsibilities:
 Constraints (Sprint 1):
 - No margin/leverage; cash cannot go below zero.
 - Shorting optional in later sprint; if added, track borrow via negative positions.
+
+Decisions (engine spec):
+- Sells are applied before buys so freed cash can fund the same ts' buys.
+- A buy that would make cash negative is clipped to the affordable whole
+  number of shares (possibly zero, which drops the fill).
+- A sell larger than the held position is clipped to the position (long-only),
+  unless the portfolio is created with allow_short=True; shorts are then
+  negative positions, sale proceeds go to cash and covering them is a buy.
+- Held symbols without a price at ts are marked at their last known price.
+- apply_fills also accepts a FillBatch; the same rules are applied with
+  array operations and the applied fills come back as a FillBatch.
+
+Ledger layout:
+- Positions, average cost basis and last marks live in dense arrays indexed
+  by SymbolTable code; the set of held codes is tracked separately.
+- Holdings value (and gross exposure, sum of |shares| * mark) is kept up to
+  date incrementally: fills add qty*price and mark_to_market only revalues
+  held names by their price change, so its cost scales with the number of
+  positions, not the universe.
+- Equity history is written into preallocated float64/int64 arrays
+  (reserve() sizes them up front; they double if outgrown).
 """
+
+import math
+from datetime import tzinfo
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from .order import Fill, FillBatch, SymbolTable
+
+
+class Portfolio:
+
+    def __init__(self, initial_cash: float = 1_000_000.0, symbols: Optional[SymbolTable] = None,
+                 capacity: int = 256, allow_short: bool = False):
+        self.initial_cash = float(initial_cash)
+        self.cash = float(initial_cash)
+        self.allow_short = allow_short
+        self.symbols = symbols if symbols is not None else SymbolTable()
+
+        self._shares = np.zeros(capacity, dtype=np.int64)
+        self._cost = np.zeros(capacity)
+        self._marks = np.zeros(capacity)
+        self._held: set[int] = set()
+        self.holdings_value = 0.0
+        self.gross_value = 0.0
+
+        self._equity = np.empty(capacity)
+        self._equity_ts = np.empty(capacity, dtype=np.int64)
+        self._n_equity = 0
+        self._tz: Optional[tzinfo] = None
+        self._remaps: dict[int, tuple[SymbolTable, np.ndarray]] = {}
+
+    ## Storage ##
+
+    def _ensure(self, size: int) -> None:
+        """Grow the per-symbol arrays to hold `size` symbol codes"""
+        if size <= len(self._shares):
+            return
+        new = max(size, 2 * len(self._shares))
+        for name in ("_shares", "_cost", "_marks"):
+            old = getattr(self, name)
+            grown = np.zeros(new, dtype=old.dtype)
+            grown[:len(old)] = old
+            setattr(self, name, grown)
+
+    def reserve(self, n_ts: int) -> None:
+        """Preallocate room for n_ts more equity points"""
+        needed = self._n_equity + n_ts
+        if needed > len(self._equity):
+            self._equity = np.resize(self._equity, needed)
+            self._equity_ts = np.resize(self._equity_ts, needed)
+
+    def _codes(self, table: SymbolTable, ids: np.ndarray) -> np.ndarray:
+        """Translate codes from another SymbolTable into this ledger's codes"""
+        if table is self.symbols:
+            return ids
+        cached = self._remaps.get(id(table))
+        if cached is None or cached[0] is not table or len(cached[1]) < len(table):
+            cached = (table, self.symbols.codes(table.symbols))
+            self._remaps[id(table)] = cached
+        return cached[1][ids]
+
+    ## Positions ##
+
+    @property
+    def positions(self) -> dict[str, int]:
+        """Held shares by symbol"""
+        return {self.symbols.symbol(i): int(self._shares[i]) for i in sorted(self._held)}
+
+    @positions.setter
+    def positions(self, positions: dict[str, int]) -> None:
+        self.set_positions(positions)
+
+    def set_positions(self, positions: dict[str, int], marks: Optional[dict[str, float]] = None) -> None:
+        """Replace all positions; cost basis restarts at the (optional) marks"""
+        for i in self._held:
+            self._shares[i] = 0
+            self._cost[i] = 0.0
+        self._held = set()
+        self.holdings_value = 0.0
+        self.gross_value = 0.0
+        codes = self.symbols.codes(positions)
+        self._ensure(len(self.symbols))
+        if marks:
+            self._marks[self.symbols.codes(marks)] = list(marks.values())
+        for code, shares in zip(codes.tolist(), positions.values()):
+            if shares:
+                self._shares[code] = shares
+                self._cost[code] = shares * self._marks[code]
+                self._held.add(code)
+                self.holdings_value += shares * self._marks[code]
+                self.gross_value += abs(shares) * self._marks[code]
+
+    def shares(self, table: SymbolTable, ids: np.ndarray) -> np.ndarray:
+        """Held shares for codes of another SymbolTable (e.g. an OrderBatch's)"""
+        codes = self._codes(table, ids)
+        self._ensure(len(self.symbols))
+        return self._shares[codes]
+
+    def marks(self, table: SymbolTable, ids: np.ndarray) -> np.ndarray:
+        """Last marks for codes of another SymbolTable (0 for never-marked symbols)"""
+        codes = self._codes(table, ids)
+        self._ensure(len(self.symbols))
+        return self._marks[codes]
+
+    def cost_basis(self, symbol: str) -> float:
+        """Total cost of the held shares (average cost method)"""
+        code = self.symbols.code(symbol)
+        self._ensure(len(self.symbols))
+        return float(self._cost[code])
+
+    ## Fills ##
+
+    def apply_fills(self, fills, prices_at_ts=None) -> list[Fill] | FillBatch:
+        """
+        Apply fills to cash and positions.
+        Returns the fills as actually applied (after clipping) for the trades log.
+        """
+        if isinstance(fills, FillBatch):
+            return self._apply_batch(fills)[0]
+        if not fills:
+            return []
+        applied, kept = self._apply_batch(FillBatch.from_fills(fills, self.symbols))
+        return [
+            fills[k] if q == fills[k].qty else
+            Fill(ts=fills[k].ts, symbol=fills[k].symbol, qty=q, price=fills[k].price, note=fills[k].note)
+            for k, q in zip(kept.tolist(), applied.qty.tolist())
+        ]
+
+    def _apply_batch(self, fills: FillBatch) -> tuple[FillBatch, np.ndarray]:
+        """Apply a batch; returns the applied fills and their row positions in `fills`"""
+        codes = self._codes(fills.table, fills.symbol_id)
+        self._ensure(len(self.symbols))
+        qty = fills.qty.copy()
+        price = fills.price
+        held = self._shares[codes]
+
+        # Sells: clip to the held position unless shorting is allowed
+        sells = np.flatnonzero(qty < 0)
+        if not self.allow_short:
+            if len(np.unique(codes[sells])) == len(sells):
+                qty[sells] = np.maximum(qty[sells], -held[sells])
+            else:
+                # Repeated symbols: each sell sees what the previous ones left
+                remaining: dict[int, int] = {}
+                for i in sells:
+                    left = remaining.get(codes[i], held[i])
+                    qty[i] = max(qty[i], -left)
+                    remaining[codes[i]] = left + qty[i]
+
+        # Buys: the no-leverage check runs on cumulative cost over the whole batch;
+        # only the tail after the first unaffordable buy is clipped one by one
+        buys = np.flatnonzero(qty > 0)
+        cash = self.cash - float(qty[sells] @ price[sells])
+        cost = np.cumsum(qty[buys] * price[buys])
+        affordable = int(np.searchsorted(cost, cash, side="right"))
+        if affordable:
+            cash -= float(cost[affordable - 1])
+        for i in buys[affordable:]:
+            if qty[i] * price[i] > cash:
+                qty[i] = math.floor(cash / price[i])
+            cash -= qty[i] * price[i]
+        self.cash = cash
+
+        # Same order as the record path: sells, then buys
+        keep = np.concatenate([sells, buys])
+        keep = keep[qty[keep] != 0]
+        for i in keep.tolist():
+            self._book(int(codes[i]), int(qty[i]), float(price[i]))
+        return FillBatch(fills.table, fills.ts[keep], fills.symbol_id[keep], qty[keep], price[keep]), keep
+
+    def _book(self, code: int, qty: int, price: float) -> None:
+        """Update one symbol's shares, cost basis and mark for an applied fill"""
+        shares = self._shares[code]
+        # Revalue the existing shares at the fill price, then add the new ones
+        self.holdings_value += shares * (price - self._marks[code]) + qty * price
+        self.gross_value += abs(shares + qty) * price - abs(shares) * self._marks[code]
+        self._marks[code] = price
+
+        new = shares + qty
+        if shares == 0 or (shares > 0) == (qty > 0):
+            # Opening or adding: cost grows by the traded value (negative for shorts)
+            self._cost[code] += qty * price
+        elif (new > 0) == (shares > 0) and new != 0:
+            self._cost[code] *= new / shares
+        else:
+            # Closed or flipped through zero: whatever remains was opened at this price
+            self._cost[code] = new * price
+        shares = new
+        self._shares[code] = shares
+        if shares == 0:
+            self._cost[code] = 0.0
+            self._held.discard(code)
+        else:
+            self._held.add(code)
+
+    ## Mark to market ##
+
+    def _repriced(self, prices_at_ts) -> tuple[np.ndarray, np.ndarray]:
+        """Held codes that have a usable price in prices_at_ts, and those prices"""
+        held = np.fromiter(self._held, dtype=np.int64, count=len(self._held))
+        if isinstance(prices_at_ts, dict):
+            symbols = self.symbols.symbols
+            new = np.fromiter((prices_at_ts.get(symbols[i], np.nan) for i in held.tolist()),
+                              dtype=np.float64, count=len(held))
+        else:
+            prices = np.asarray(prices_at_ts, dtype=np.float64)
+            new = np.full(len(held), np.nan)
+            inside = held < len(prices)
+            new[inside] = prices[held[inside]]
+        ok = np.isfinite(new) & (new > 0)
+        return held[ok], new[ok]
+
+    def mark_to_market(self, ts, prices_at_ts) -> float:
+        """
+        Compute equity at ts and append it to the equity history.
+        prices_at_ts is a {symbol: price} dict or an array indexed by symbol code.
+        Only held names are revalued; missing prices keep the last mark.
+        """
+        if self._held:
+            held, new = self._repriced(prices_at_ts)
+            change = new - self._marks[held]
+            shares = self._shares[held]
+            self.holdings_value += float(shares @ change)
+            self.gross_value += float(np.abs(shares) @ change)
+            self._marks[held] = new
+
+        equity = self.cash + self.holdings_value
+        self._record(ts, equity)
+        return equity
+
+    def exposure(self, prices_at_ts) -> tuple[float, float]:
+        """(equity, gross exposure) at these prices, without marking or recording"""
+        equity, gross = self.cash + self.holdings_value, self.gross_value
+        if self._held:
+            held, new = self._repriced(prices_at_ts)
+            change = new - self._marks[held]
+            shares = self._shares[held]
+            equity += float(shares @ change)
+            gross += float(np.abs(shares) @ change)
+        return equity, gross
+
+    def _record(self, ts, equity: float) -> None:
+        if self._n_equity == len(self._equity):
+            self.reserve(max(1, self._n_equity))
+        stamp = pd.Timestamp(ts)
+        if self._n_equity == 0:
+            self._tz = stamp.tz
+        self._equity_ts[self._n_equity] = stamp.value
+        self._equity[self._n_equity] = equity
+        self._n_equity += 1
+
+    def record_equity_curve(self, index: pd.DatetimeIndex, equity: np.ndarray) -> None:
+        """Replace the equity history with a whole curve (vectorized engine mode)"""
+        self._equity_ts = index.as_unit("ns").asi8.copy()
+        self._equity = np.asarray(equity, dtype=np.float64).copy()
+        self._n_equity = len(self._equity)
+        self._tz = index.tz
+
+    def append_equity_curve(self, index: pd.DatetimeIndex, equity: np.ndarray) -> None:
+        """Append a run of equity points (the next chunk of a chunked vectorized run)"""
+        n = len(equity)
+        self.reserve(n)
+        if self._n_equity == 0:
+            self._tz = index.tz
+        self._equity_ts[self._n_equity:self._n_equity + n] = index.as_unit("ns").asi8
+        self._equity[self._n_equity:self._n_equity + n] = equity
+        self._n_equity += n
+
+    ## Equity history ##
+
+    @property
+    def equity_curve(self) -> tuple[np.ndarray, np.ndarray]:
+        """(ts as int64 ns, equity) views of the recorded history, without building dicts"""
+        return self._equity_ts[:self._n_equity], self._equity[:self._n_equity]
+
+    @property
+    def equity_history(self) -> list[dict]:
+        """The spec's list of {ts, equity} rows, built on demand"""
+        ts, equity = self.equity_curve
+        index = pd.DatetimeIndex(ts.view("datetime64[ns]"))
+        if self._tz is not None:
+            index = index.tz_localize("UTC").tz_convert(self._tz)
+        return [{"ts": t, "equity": e} for t, e in zip(index, equity.tolist())]
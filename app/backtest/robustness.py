@@ -0,0 +1,431 @@
+"""
+Robustness Runner
+-----------------
+Role:
+- Check a vectorized strategy out of sample with walk-forward splits:
+  pick the best parameters on each train window, score them on the test
+  window that follows.
+- Stress it with Monte Carlo paths: block-bootstrap the historical
+  cross-section of returns into new price paths and rerun the strategy on
+  each one.
+- Aggregate the distribution of metrics (app/metrics) across folds / paths.
+
+How (hundreds of backtests over the same bars):
+- The bars are pivoted once and copied into one shared-memory block
+  (sweep.SharedBars); pool workers attach to it once and only receive
+  parameters, window bounds or path seeds per task.
+- Walk-forward: a task is one parameter set with all its windows. Its
+  targets are computed once on the whole matrix (PrecomputedTargets), and
+  every train/test window is a zero-copy BarMatrix.window view that reads
+  its targets as a slice. Windows are warm-started: a signal at the start of
+  a window uses the bars before it, as in chunked engine runs. Each
+  (params, window) is run once; choosing the in-sample best and scoring it
+  out of sample are lookups into those runs, not reruns.
+- Monte Carlo: each worker computes the return matrix once. A path is a
+  moving-block bootstrap of its rows (blocks of consecutive timestamps, the
+  same rows for every symbol, so cross-sectional correlation and short-range
+  autocorrelation survive), compounded from the first close. Paths are
+  rebuilt from (seed, path) inside the workers, each path is shared by every
+  parameter set, and a batch's metrics come from one stacked
+  compute_metrics pass.
+
+Missing data:
+- A missing close stays missing on the path row that reuses it, and a
+  return across a missing bar counts as flat.
+- Paths carry closes only (open/high/low are the same array), which is all
+  the vectorized mode trades on.
+
+CLI:
+    python -m app.backtest.robustness --bars data/bars_1d.parquet walk-forward \\
+        --train 504 --test 126 --lookback-days 20 60 --top-k 2 5
+    python -m app.backtest.robustness --bars data/bars_1d.parquet monte-carlo \\
+        --paths 500 --block 20 --lookback-days 20 --top-k 5 --workers 8
+"""
+
+import argparse
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+from typing import Callable, Iterator, Optional
+
+import numpy as np
+import pandas as pd
+
+from app.alpha.momentum import MomentumStrategy
+from app.core import profiler
+from app.metrics.performance import METRIC_NAMES, compute_metrics, traded_value_per_bar
+from .engine import BacktestEngine, VectorizedStrategy
+from .matrix import BarMatrix
+from .sweep import SharedBars, expand_grid
+
+QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+
+
+## Walk-forward splits ##
+
+@dataclass(frozen=True)
+class Split:
+    """Row bounds [start, stop) of one fold's train and test windows"""
+    fold: int
+    train_start: int
+    train_stop: int
+    test_start: int
+    test_stop: int
+
+
+def walk_forward_splits(n_ts: int, train: int, test: int, step: Optional[int] = None,
+                        anchored: bool = False) -> list[Split]:
+    """
+    Consecutive folds of `train` rows followed by `test` rows, moving `step`
+    rows (default: test) each fold. Anchored folds keep the train window's
+    start at row 0 and grow it instead.
+    """
+    if train < 1 or test < 1:
+        raise ValueError("train and test must be positive")
+    step = step or test
+    splits: list[Split] = []
+    start = 0
+    while start + train + test <= n_ts:
+        train_start = 0 if anchored else start
+        splits.append(Split(len(splits), train_start, start + train, start + train, start + train + test))
+        start += step
+    return splits
+
+
+## Shared precomputation ##
+
+class PrecomputedTargets(VectorizedStrategy):
+    """A strategy's whole-run target matrix, served to any window of the same run by slicing"""
+
+    # Already computed with the full history before every row
+    warmup = 0
+
+    def __init__(self, targets: np.ndarray, index: pd.DatetimeIndex, target_kind: str = "quantity"):
+        self.full = targets
+        self.index_ns = index.as_unit("ns").asi8
+        self.target_kind = target_kind
+
+    @classmethod
+    def compute(cls, strategy: VectorizedStrategy, bars: BarMatrix) -> "PrecomputedTargets":
+        targets = np.asarray(strategy.targets(bars), dtype=np.float64)
+        return cls(targets, bars.index, strategy.target_kind)
+
+    def targets(self, bars: BarMatrix) -> np.ndarray:
+        start = int(self.index_ns.searchsorted(bars.index[0].value)) if len(bars.index) else 0
+        return self.full[start:start + bars.shape[0]]
+
+
+def _params_key(params: dict) -> tuple:
+    return tuple(sorted(params.items()))
+
+
+def _run(bars: BarMatrix, strategy: VectorizedStrategy, initial_cash: float) -> tuple[np.ndarray, np.ndarray, int]:
+    """(equity, traded value per bar, trade count) of one vectorized run"""
+    engine = BacktestEngine(strategy, initial_cash=initial_cash)
+    result = engine.run_matrix(bars)
+    traded = traded_value_per_bar(result.trades_log, bars.index.as_unit("ns").asi8)
+    return engine.portfolio.equity_curve[1], traded, len(result.trades_log)
+
+
+def _stacked_metrics(runs: list[tuple[np.ndarray, np.ndarray, int]], initial_cash: float) -> list[dict]:
+    """Metrics per run, computed in one pass per group of equally long runs"""
+    rows: list[dict] = [{} for _ in runs]
+    by_length: dict[int, list[int]] = {}
+    for i, (equity, _, _) in enumerate(runs):
+        by_length.setdefault(len(equity), []).append(i)
+    for ids in by_length.values():
+        equity = np.stack([runs[i][0] for i in ids])
+        traded = np.stack([runs[i][1] for i in ids])
+        metrics = compute_metrics(equity, traded, initial=initial_cash)
+        for j, i in enumerate(ids):
+            rows[i] = {name: float(values[j]) for name, values in metrics.items()}
+            rows[i]["n_trades"] = runs[i][2]
+    return rows
+
+
+def evaluate_windows(bars: BarMatrix, factory: Callable[..., VectorizedStrategy], params: dict,
+                     windows: list[tuple[int, int]], initial_cash: float) -> list[dict]:
+    """Metrics of one parameter set on each [start, stop) window, from one target computation"""
+    strategy = PrecomputedTargets.compute(factory(**params), bars)
+    runs = [_run(bars.window(start, stop), strategy, initial_cash) for start, stop in windows]
+    return [{**params, "start": start, "stop": stop, **metrics}
+            for (start, stop), metrics in zip(windows, _stacked_metrics(runs, initial_cash))]
+
+
+## Monte Carlo paths ##
+
+def block_bootstrap(n_rows: int, block: int, rng: np.random.Generator) -> np.ndarray:
+    """n_rows row indices made of random blocks of `block` consecutive rows"""
+    if n_rows == 0:
+        return np.empty(0, dtype=np.int64)
+    block = max(1, min(block, n_rows))
+    starts = rng.integers(0, n_rows - block + 1, size=-(-n_rows // block))
+    return (starts[:, None] + np.arange(block)).ravel()[:n_rows]
+
+
+class PathGenerator:
+    """Bootstrap price paths of one BarMatrix; returns and base prices are computed once"""
+
+    def __init__(self, bars: BarMatrix, block: int = 20, seed: int = 0):
+        self.bars = bars
+        self.block = block
+        self.seed = seed
+        close = np.where(bars.tradable(), bars.close, np.nan)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            returns = close[1:] / close[:-1]
+        # Flat across a missing bar
+        self.growth = np.where(np.isfinite(returns), returns, 1.0)
+        self.present = np.isfinite(close)
+        first = np.argmax(self.present, axis=0)
+        self.base = close[first, np.arange(close.shape[1])] if len(close) else np.empty(close.shape[1])
+
+    def rows(self, path: int) -> np.ndarray:
+        """Bootstrapped return rows of a path (deterministic in (seed, path))"""
+        return block_bootstrap(len(self.growth), self.block, np.random.default_rng([self.seed, path]))
+
+    def path(self, path: int) -> BarMatrix:
+        rows = self.rows(path)
+        level = np.empty(self.bars.shape)
+        if len(level):
+            level[0] = self.base
+            np.cumprod(self.growth[rows], axis=0, out=level[1:])
+            level[1:] *= self.base
+        # Row t of the path reuses row rows[t-1] + 1 of history, missing bars included
+        source = np.concatenate([[0], rows + 1])
+        close = np.where(self.present[source], level, np.nan)
+        return BarMatrix(index=self.bars.index, symbols=self.bars.symbols, open=close, high=close, low=close,
+                         close=close, volume=self.bars.volume)
+
+
+def evaluate_paths(bars: BarMatrix, factory: Callable[..., VectorizedStrategy], points: list[dict],
+                   paths: list[int], block: int, seed: int, initial_cash: float,
+                   generator: Optional[PathGenerator] = None) -> list[dict]:
+    """Metrics of every parameter set on each path (one path build shared by all sets)"""
+    generator = generator or PathGenerator(bars, block, seed)
+    runs, keys = [], []
+    for path in paths:
+        matrix = generator.path(path)
+        for params in points:
+            runs.append(_run(matrix, factory(**params), initial_cash))
+            keys.append({"path": path, **params})
+    return [{**key, **metrics} for key, metrics in zip(keys, _stacked_metrics(runs, initial_cash))]
+
+
+## Workers ##
+
+# Per-worker state set up once by the pool initializer
+_worker_bars: Optional[BarMatrix] = None
+_worker_shm: Optional[shared_memory.SharedMemory] = None
+_worker_paths: Optional[PathGenerator] = None
+_worker_options: Optional[dict] = None
+
+
+def _attach(spec: dict, options: Optional[dict] = None) -> None:
+    global _worker_bars, _worker_shm, _worker_paths, _worker_options
+    _worker_bars, _worker_shm = SharedBars.attach(spec)
+    _worker_paths = None
+    _worker_options = options
+
+
+def _evaluate_windows(factory, params: dict, windows: list[tuple[int, int]],
+                      initial_cash: float) -> tuple[list[dict], profiler.Captured]:
+    assert _worker_bars is not None, "worker not attached to the shared bars"
+    with profiler.capture(_worker_options) as captured:
+        rows = evaluate_windows(_worker_bars, factory, params, windows, initial_cash)
+    return rows, captured
+
+
+def _evaluate_paths(factory, points: list[dict], paths: list[int], block: int, seed: int,
+                    initial_cash: float) -> tuple[list[dict], profiler.Captured]:
+    global _worker_paths
+    assert _worker_bars is not None, "worker not attached to the shared bars"
+    with profiler.capture(_worker_options) as captured:
+        if _worker_paths is None or (_worker_paths.block, _worker_paths.seed) != (block, seed):
+            _worker_paths = PathGenerator(_worker_bars, block, seed)
+        rows = evaluate_paths(_worker_bars, factory, points, paths, block, seed, initial_cash, _worker_paths)
+    return rows, captured
+
+
+def _map(matrix: BarMatrix, max_workers: Optional[int], local: Callable, remote: Callable,
+         tasks: list[tuple]) -> Iterator[list[dict]]:
+    """
+    Run tasks in this process (max_workers=1) or on a pool attached to the
+    shared bars, merging each task's timings / profile into the parent's
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    if max_workers == 1:
+        for task in tasks:
+            yield local(matrix, *task)
+        return
+    shared = SharedBars(matrix)
+    try:
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_attach,
+                                 initargs=(shared.spec, profiler.worker_options())) as pool:
+            for rows, captured in pool.map(remote, *zip(*tasks)):
+                profiler.merge(captured)
+                yield rows
+    finally:
+        shared.close()
+
+
+## Walk-forward ##
+
+@dataclass
+class WalkForwardResult:
+    # One row per fold: bounds, chosen params, in-sample objective and out-of-sample (test_*) metrics
+    folds: pd.DataFrame
+    # Every (params, window) run, with its metrics
+    runs: pd.DataFrame
+
+    def summary(self) -> pd.DataFrame:
+        """Distribution of the out-of-sample metrics across folds"""
+        columns = [f"test_{name}" for name in METRIC_NAMES]
+        return summarize(self.folds, columns)
+
+
+def walk_forward(bars, grid: dict[str, list], train: int, test: int, step: Optional[int] = None,
+                 anchored: bool = False, objective: str = "sharpe", factory: Callable = MomentumStrategy,
+                 initial_cash: float = 1_000_000.0, max_workers: Optional[int] = None) -> WalkForwardResult:
+    """
+    Walk-forward validation over a parameter grid: per fold, the grid point
+    with the best in-sample `objective` (ties: grid order) is scored on the
+    test window. Windows are in rows (timestamps) of the pivoted bars.
+    """
+    if objective not in METRIC_NAMES:
+        raise ValueError(f"Unknown objective: {objective} (expected one of {METRIC_NAMES})")
+    matrix = bars if isinstance(bars, BarMatrix) else BarMatrix.from_frame(bars)
+    splits = walk_forward_splits(matrix.shape[0], train, test, step, anchored)
+    if not splits:
+        raise ValueError(f"{matrix.shape[0]} rows are too few for a {train}-row train and {test}-row test window")
+
+    # Every distinct window once (anchored or overlapping folds repeat some)
+    windows = sorted({(s.train_start, s.train_stop) for s in splits} | {(s.test_start, s.test_stop) for s in splits})
+    points = expand_grid(grid)
+    tasks = [(factory, params, windows, initial_cash) for params in points]
+    rows = [row for batch in _map(matrix, max_workers, evaluate_windows, _evaluate_windows, tasks) for row in batch]
+    runs = pd.DataFrame(rows)
+
+    memo = {(_params_key({k: row[k] for k in grid}), row["start"], row["stop"]): row for row in rows}
+    index = matrix.index
+    folds = []
+    for split in splits:
+        scores = [memo[(_params_key(p), split.train_start, split.train_stop)][objective] for p in points]
+        best = points[int(np.nanargmax(scores))] if not np.isnan(scores).all() else points[0]
+        tested = memo[(_params_key(best), split.test_start, split.test_stop)]
+        folds.append({
+            "fold": split.fold,
+            "train_start": index[split.train_start], "train_end": index[split.train_stop - 1],
+            "test_start": index[split.test_start], "test_end": index[split.test_stop - 1],
+            **best,
+            f"train_{objective}": memo[(_params_key(best), split.train_start, split.train_stop)][objective],
+            **{f"test_{name}": tested[name] for name in METRIC_NAMES},
+        })
+    return WalkForwardResult(folds=pd.DataFrame(folds), runs=runs)
+
+
+## Monte Carlo ##
+
+@dataclass
+class MonteCarloResult:
+    # One row per (path, params) run, with its metrics
+    runs: pd.DataFrame
+    params: list[str]
+
+    def summary(self) -> pd.DataFrame:
+        """Distribution of each metric across paths, per parameter set"""
+        return summarize(self.runs, list(METRIC_NAMES), by=self.params)
+
+
+def monte_carlo(bars, grid: dict[str, list], n_paths: int = 500, block: int = 20, seed: int = 0,
+                factory: Callable = MomentumStrategy, initial_cash: float = 1_000_000.0,
+                max_workers: Optional[int] = None, batch_size: Optional[int] = None) -> MonteCarloResult:
+    """Run every grid point on n_paths block-bootstrap paths of the bars"""
+    matrix = bars if isinstance(bars, BarMatrix) else BarMatrix.from_frame(bars)
+    points = expand_grid(grid)
+    workers = max_workers or os.cpu_count() or 1
+    if batch_size is None:
+        # A few batches per worker keeps the pool busy without per-path IPC overhead
+        batch_size = max(1, n_paths // (workers * 4))
+    batches = [list(range(i, min(i + batch_size, n_paths))) for i in range(0, n_paths, batch_size)]
+    tasks = [(factory, points, paths, block, seed, initial_cash) for paths in batches]
+
+    if workers == 1:
+        # One generator for the whole study instead of one per batch
+        generator = PathGenerator(matrix, block, seed)
+        rows = [row for task in tasks for row in evaluate_paths(matrix, *task, generator=generator)]
+    else:
+        rows = [row for batch in _map(matrix, workers, evaluate_paths, _evaluate_paths, tasks) for row in batch]
+    return MonteCarloResult(runs=pd.DataFrame(rows), params=list(grid))
+
+
+## Aggregation ##
+
+def summarize(table: pd.DataFrame, columns: list[str], by: Optional[list[str]] = None,
+              quantiles: tuple = QUANTILES) -> pd.DataFrame:
+    """mean, std and quantiles of each column (per group of `by`), one row per (group, column)"""
+    groups = table.groupby(by, sort=True) if by else [((), table)]
+    rows = []
+    for key, group in groups:
+        key = key if isinstance(key, tuple) else (key,)
+        for column in columns:
+            values = group[column].to_numpy(dtype=np.float64)
+            values = values[~np.isnan(values)]
+            row = dict(zip(by or [], key))
+            row.update({"metric": column, "count": len(values),
+                        "mean": values.mean() if len(values) else np.nan,
+                        "std": values.std(ddof=1) if len(values) > 1 else np.nan})
+            row.update({f"p{round(q * 100):02d}": np.quantile(values, q) if len(values) else np.nan
+                        for q in quantiles})
+            rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Walk-forward and Monte Carlo robustness checks for momentum")
+    parser.add_argument("--bars", required=True, help="Long-format bars parquet file")
+    parser.add_argument("--lookback-days", type=int, nargs="+", default=[20])
+    parser.add_argument("--top-k", type=int, nargs="+", default=[2])
+    parser.add_argument("--dollar-per-position", type=float, nargs="+", default=[50_000.0])
+    parser.add_argument("--initial-cash", type=float, default=1_000_000.0)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--out", default=None, help="Write the per-fold / per-path table to this CSV")
+    profiler.add_arguments(parser)
+    modes = parser.add_subparsers(dest="mode", required=True)
+    wf = modes.add_parser("walk-forward")
+    wf.add_argument("--train", type=int, required=True, help="Train window, in bars")
+    wf.add_argument("--test", type=int, required=True, help="Test window, in bars")
+    wf.add_argument("--step", type=int, default=None, help="Bars between folds (default: --test)")
+    wf.add_argument("--anchored", action="store_true", help="Grow the train window from the first bar")
+    wf.add_argument("--objective", choices=METRIC_NAMES, default="sharpe")
+    mc = modes.add_parser("monte-carlo")
+    mc.add_argument("--paths", type=int, default=500)
+    mc.add_argument("--block", type=int, default=20, help="Bootstrap block length, in bars")
+    mc.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    grid = {
+        "lookback_days": args.lookback_days,
+        "top_k": args.top_k,
+        "dollar_per_position": args.dollar_per_position,
+    }
+    bars = pd.read_parquet(args.bars)
+    result: WalkForwardResult | MonteCarloResult
+    with profiler.from_args(args):
+        if args.mode == "walk-forward":
+            result = walk_forward(bars, grid, args.train, args.test, args.step, args.anchored, args.objective,
+                                  initial_cash=args.initial_cash, max_workers=args.workers)
+            table = result.folds
+        else:
+            result = monte_carlo(bars, grid, args.paths, args.block, args.seed, initial_cash=args.initial_cash,
+                                 max_workers=args.workers)
+            table = result.runs
+    logging.info(f"Summary:\n{result.summary().to_string(float_format='{:.4f}'.format)}")
+    if args.out:
+        table.to_csv(args.out, index=False)
+
+
+if __name__ == "__main__":
+    main()
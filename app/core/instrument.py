@@ -0,0 +1,226 @@
+"""
+Instrumentation
+----------------
+Responsible for:
+- Per-stage counters: calls, rows processed and total latency
+- Per-stage latency histograms (power-of-two nanosecond buckets) with
+  approximate percentiles
+- A process-wide recorder that data and engine code report to when enabled
+
+How:
+- Disabled by default. Hot loops resolve their callables once per run with
+  Recorder.wrap() (or wrap_if_active()), which returns the original
+  function untouched when there is no recorder, so a disabled run pays
+  nothing per call. Less frequent calls (fetch, standardize) use the
+  @instrumented decorator, which costs one global lookup when disabled.
+- Timing uses time.perf_counter_ns; each stage has its own lock, so
+  download threads can record concurrently.
+
+Usage:
+    with instrument.recording() as recorder:
+        catalog.get_data_many(...)
+    print(recorder.summary())
+"""
+
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, Optional
+
+import pandas as pd
+
+# Bucket b counts calls with latency in [2**(b-1), 2**b) ns
+N_BUCKETS = 48
+
+SUMMARY_COLUMNS = ["calls", "rows", "total_ms", "mean_us", "p50_us", "p99_us", "max_us"]
+
+
+class Stage:
+
+    def __init__(self, name: str):
+        self.name = name
+        self.calls = 0
+        self.rows = 0
+        self.total_ns = 0
+        self.max_ns = 0
+        self.histogram = [0] * N_BUCKETS
+        self._lock = threading.Lock()
+
+    # Picklable, so worker processes can send their stages back (locks are per process)
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def record(self, elapsed_ns: int, rows: int = 0) -> None:
+        bucket = min(elapsed_ns.bit_length(), N_BUCKETS - 1)
+        with self._lock:
+            self.calls += 1
+            self.rows += rows
+            self.total_ns += elapsed_ns
+            if elapsed_ns > self.max_ns:
+                self.max_ns = elapsed_ns
+            self.histogram[bucket] += 1
+
+    def merge(self, other: "Stage") -> None:
+        with self._lock:
+            self.calls += other.calls
+            self.rows += other.rows
+            self.total_ns += other.total_ns
+            self.max_ns = max(self.max_ns, other.max_ns)
+            self.histogram = [a + b for a, b in zip(self.histogram, other.histogram)]
+
+    def percentile_ns(self, q: float) -> float:
+        """Upper edge of the bucket holding the q-th percentile (0 < q <= 100)"""
+        if self.calls == 0:
+            return float("nan")
+        rank = q / 100 * self.calls
+        seen = 0
+        for bucket, count in enumerate(self.histogram):
+            seen += count
+            if seen >= rank:
+                return float(min(2 ** bucket, self.max_ns))
+        return float(self.max_ns)
+
+    def summary(self) -> dict:
+        return {
+            "calls": self.calls,
+            "rows": self.rows,
+            "total_ms": self.total_ns / 1e6,
+            "mean_us": self.total_ns / self.calls / 1e3 if self.calls else float("nan"),
+            "p50_us": self.percentile_ns(50) / 1e3,
+            "p99_us": self.percentile_ns(99) / 1e3,
+            "max_us": self.max_ns / 1e3,
+        }
+
+
+class Recorder:
+
+    def __init__(self):
+        self.stages: Dict[str, Stage] = {}
+        self._lock = threading.Lock()
+
+    # Sent back from worker processes with their task results (profiler.capture)
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def stage(self, name: str) -> Stage:
+        stage = self.stages.get(name)
+        if stage is None:
+            with self._lock:
+                stage = self.stages.setdefault(name, Stage(name))
+        return stage
+
+    def record(self, name: str, elapsed_ns: int, rows: int = 0) -> None:
+        self.stage(name).record(elapsed_ns, rows)
+
+    @contextmanager
+    def time(self, name: str, rows: int = 0) -> Iterator[None]:
+        started = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter_ns() - started, rows)
+
+    def wrap(self, name: str, fn: Callable, rows: Optional[Callable] = None) -> Callable:
+        """
+        fn timed under stage `name`. rows(args, result) gives the rows
+        processed per call (e.g. the bar frame's length).
+        """
+        stage = self.stage(name)
+        clock = time.perf_counter_ns
+
+        @functools.wraps(fn)
+        def timed(*args, **kwargs):
+            started = clock()
+            result = fn(*args, **kwargs)
+            stage.record(clock() - started, rows(args, result) if rows is not None else 0)
+            return result
+        return timed
+
+    def merge(self, other: "Recorder") -> None:
+        for name, stage in other.stages.items():
+            self.stage(name).merge(stage)
+
+    def summary(self) -> pd.DataFrame:
+        """One row per stage (SUMMARY_COLUMNS), slowest total first"""
+        rows = {name: stage.summary() for name, stage in self.stages.items()}
+        table = pd.DataFrame.from_dict(rows, orient="index", columns=SUMMARY_COLUMNS)
+        return table.sort_values("total_ms", ascending=False)
+
+    def as_dict(self) -> dict:
+        return {name: stage.summary() for name, stage in self.stages.items()}
+
+
+## Process-wide recorder ##
+
+_active: Optional[Recorder] = None
+
+
+def enable(recorder: Optional[Recorder] = None) -> Recorder:
+    global _active
+    _active = recorder or Recorder()
+    return _active
+
+
+def disable() -> None:
+    global _active
+    _active = None
+
+
+def active() -> Optional[Recorder]:
+    return _active
+
+
+@contextmanager
+def recording(recorder: Optional[Recorder] = None) -> Iterator[Recorder]:
+    """Enable instrumentation for a block, restoring the previous recorder afterwards"""
+    global _active
+    previous = _active
+    current = enable(recorder)
+    try:
+        yield current
+    finally:
+        _active = previous
+
+
+def wrap_if_active(name: str, fn: Callable, rows: Optional[Callable] = None) -> Callable:
+    """fn timed by the active recorder, or fn itself when instrumentation is off"""
+    return fn if _active is None else _active.wrap(name, fn, rows)
+
+
+def instrumented(name: str, rows: Optional[Callable] = None) -> Callable:
+    """Decorator reporting to the active recorder, checked on every call"""
+    def decorate(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def call(*args, **kwargs):
+            recorder = _active
+            if recorder is None:
+                return fn(*args, **kwargs)
+            started = time.perf_counter_ns()
+            result = fn(*args, **kwargs)
+            recorder.record(name, time.perf_counter_ns() - started, rows(args, result) if rows is not None else 0)
+            return result
+        return call
+    return decorate
+
+
+def result_rows(args, result) -> int:
+    """rows callback: length of the returned frame"""
+    return len(result)
+
+
+def frame_rows(args, result) -> int:
+    """rows callback for on_bar(ts, frame): length of the bar frame"""
+    return len(args[1])
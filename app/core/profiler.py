@@ -0,0 +1,233 @@
+"""
+Profiler
+----------------
+Responsible for:
+- Opt-in profiling of a whole run (backtest, sweep, ingest) to a file
+
+Modes:
+- "cprofile": deterministic cProfile; writes pstats data to <path>
+  (open with `python -m pstats`, snakeviz or gprof2dot).
+- "sample": a background thread samples every thread's stack each
+  `interval` seconds and writes folded stacks to <path>, one
+  "thread;outer;...;inner count" line per distinct stack. That is the
+  input format of flamegraph.pl, speedscope and inferno. The overhead is
+  set by the interval, not by how many calls the code makes, and download
+  worker threads show up next to the main thread.
+- cProfile only sees the thread that started it.
+
+CLIs (ingestor, sweep, robustness, paper runtime) take --timings /
+--profile PATH / --profile-mode through add_arguments() and from_args().
+
+Worker processes:
+- A process pool's workers are not seen by the parent's recorder or
+  profiler. The parent passes worker_options() to the pool initializer,
+  each task runs under capture(options), and the parent merge()s the
+  returned Captured (stage timings, stack samples or cProfile stats) into
+  the running recorder and profile.
+
+Usage:
+    with profile("run.folded", mode="sample"):
+        engine.run(bars)
+"""
+
+import argparse
+import cProfile
+import logging
+import multiprocessing
+import pstats
+import sys
+import threading
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from pathlib import Path
+from typing import Iterator, Optional
+
+from . import instrument
+
+PROFILE_MODES = ["cprofile", "sample"]
+
+
+class StackSampler:
+    """Samples Python stacks (one thread, or all but its own) into folded-stack counts"""
+
+    def __init__(self, thread_id: Optional[int] = None, interval: float = 0.001):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def start(self) -> "StackSampler":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own or (self.thread_id is not None and ident != self.thread_id):
+                    continue
+                self.stacks[f"{names.get(ident, ident)};{_fold(frame)}"] += 1
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+def _fold(frame) -> str:
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_filename.rsplit('/', 1)[-1]}:{code.co_name}")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class _Session:
+    """The running profile() block, which worker results are merged into"""
+
+    def __init__(self, mode: str, interval: float, sampler: Optional[StackSampler] = None):
+        self.mode = mode
+        self.interval = interval
+        self.sampler = sampler
+        self.stats: list[dict] = []
+
+
+class _WorkerStats:
+    """A worker's cProfile stats in the shape pstats.Stats loads from"""
+
+    def __init__(self, stats: dict):
+        self.stats = stats
+
+    def create_stats(self) -> None:
+        pass
+
+
+_session: Optional[_Session] = None
+
+
+@contextmanager
+def profile(path, mode: str = "sample", interval: float = 0.001) -> Iterator[None]:
+    """Profile the enclosed block and write the result to path"""
+    global _session
+    if mode not in PROFILE_MODES:
+        raise ValueError(f"Unknown profile mode: {mode} (expected one of {PROFILE_MODES})")
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    previous = _session
+
+    if mode == "cprofile":
+        profiler = cProfile.Profile()
+        session = _session = _Session(mode, interval)
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            _session = previous
+            stats = pstats.Stats(profiler)
+            for worker in session.stats:
+                stats.add(_WorkerStats(worker))  # type: ignore[arg-type]
+            stats.dump_stats(path)
+            logging.info(f"Wrote cProfile stats to {path}")
+        return
+
+    sampler = StackSampler(interval=interval).start()
+    _session = _Session(mode, interval, sampler)
+    try:
+        yield
+    finally:
+        sampler.stop()
+        _session = previous
+        path.write_text(sampler.folded())
+        logging.info(f"Wrote {sum(sampler.stacks.values())} stack samples to {path}")
+
+
+## Worker processes ##
+
+class Captured:
+    """What one worker task recorded, sent back to the parent with its result"""
+
+    def __init__(self) -> None:
+        self.timings: Optional[instrument.Recorder] = None
+        self.stacks: Optional[Counter] = None
+        self.stats: Optional[dict] = None
+
+
+def worker_options() -> dict:
+    """In the parent: what pool workers should capture for the running recorder / profile"""
+    return {
+        "timings": instrument.active() is not None,
+        "profile": _session.mode if _session is not None else None,
+        "interval": _session.interval if _session is not None else None,
+    }
+
+
+@contextmanager
+def capture(options: Optional[dict]) -> Iterator[Captured]:
+    """In a worker: record the enclosed task as worker_options() asked"""
+    captured = Captured()
+    options = options or {}
+    with ExitStack() as stack:
+        if options.get("timings"):
+            captured.timings = stack.enter_context(instrument.recording())
+
+        if options.get("profile") == "cprofile":
+            profiler = cProfile.Profile()
+
+            def stop_cprofile() -> None:
+                profiler.disable()
+                profiler.create_stats()
+                captured.stats = profiler.stats  # type: ignore[attr-defined]
+            stack.callback(stop_cprofile)
+            profiler.enable()
+
+        elif options.get("profile") == "sample":
+            sampler = StackSampler(interval=options["interval"]).start()
+            process = multiprocessing.current_process().name
+
+            def stop_sampler() -> None:
+                sampler.stop()
+                # Keep worker stacks apart from the parent's threads of the same name
+                captured.stacks = Counter({f"{process}/{stack}": n for stack, n in sampler.stacks.items()})
+            stack.callback(stop_sampler)
+
+        yield captured
+
+
+def merge(captured: Captured) -> None:
+    """In the parent: add a worker task's timings and samples to the running recorder / profile"""
+    recorder = instrument.active()
+    if captured.timings is not None and recorder is not None:
+        recorder.merge(captured.timings)
+    if _session is None:
+        return
+    if captured.stacks and _session.sampler is not None:
+        _session.sampler.stacks.update(captured.stacks)
+    if captured.stats:
+        _session.stats.append(captured.stats)
+
+
+## CLI hooks ##
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--timings", action="store_true", help="Log a per-stage timing table when the run ends")
+    parser.add_argument("--profile", default=None, help="Profile the run and write the result to this file")
+    parser.add_argument("--profile-mode", choices=PROFILE_MODES, default="sample",
+                        help="sample: folded stacks for flamegraphs; cprofile: pstats file")
+
+
+@contextmanager
+def from_args(args: argparse.Namespace) -> Iterator[Optional[instrument.Recorder]]:
+    """Apply --timings / --profile around a CLI run"""
+    with ExitStack() as stack:
+        recorder = stack.enter_context(instrument.recording()) if args.timings else None
+        if args.profile:
+            stack.enter_context(profile(args.profile, args.profile_mode))
+        yield recorder
+    if recorder is not None and recorder.stages:
+        logging.info(f"Stage timings:\n{recorder.summary().to_string(float_format='{:.1f}'.format)}")
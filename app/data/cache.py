@@ -0,0 +1,253 @@
+"""
+Bar cache
+----------------
+Responsible for:
+- Persisting standardized bars per (source, symbol, interval) as Parquet
+- Remembering the last cached timestamp and when each entry was refreshed
+- Fetching only the missing tail from the data source and merging it in
+- Keeping the cache under a size bound with LRU eviction
+
+Layout:
+- <cache_dir>/<source>/<interval>/<symbol>.parquet
+- <cache_dir>/index.json holds per-entry metadata (last_ts, period,
+  refreshed_at, last_access, bytes); an entry only serves requests for a
+  period it covers, a longer one refetches it
+- Cache hits only bump last_access in memory; the index is written on put
+  (which may evict) and at most every ACCESS_FLUSH_SECONDS from get(), so a
+  warm run does not rewrite it once per symbol
+- Access times still in memory are written by flush()/close(), or when the
+  cache is garbage collected or the process exits (a weakref finalizer that
+  holds the index, not the cache, so dropped caches are freed)
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+import weakref
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+import pandas as pd
+
+from .sources.base_class import DataSource
+
+# How long an entry is considered fresh, by interval (a new bar cannot exist sooner)
+INTERVAL_SECONDS = {
+    "1m": 60, "5m": 300, "15m": 900, "30m": 1800, "1h": 3600, "4h": 14400,
+    "1d": 86400, "5d": 432000, "1wk": 604800, "1mo": 2592000,
+}
+
+# Lookback periods a source accepts, shortest first, with how many days each covers
+PERIOD_DAYS = {
+    "5d": 5, "1mo": 31, "3mo": 92, "6mo": 183, "1y": 366, "2y": 731, "5y": 1827, "10y": 3653, "max": None,
+}
+
+# How far back intraday history goes (Yahoo serves 1m bars 7 days per request,
+# other minute bars for 60 days, hourly bars for 730 days)
+INTRADAY_MAX_PERIOD = {"1m": "5d", "5m": "1mo", "15m": "1mo", "30m": "1mo", "1h": "1y", "4h": "1y"}
+
+DEFAULT_PERIOD = "1y"
+
+# Longest a cache hit's last_access stays in memory only
+ACCESS_FLUSH_SECONDS = 60.0
+
+TS_COLUMN = "ts"
+
+
+def period_covering(start, interval: str = "1d", now: Optional[pd.Timestamp] = None) -> str:
+    """Shortest lookback period reaching back to start, capped by how much intraday history exists"""
+    if start is None:
+        period = DEFAULT_PERIOD
+    else:
+        now = now if now is not None else pd.Timestamp.now(tz="UTC")
+        start = pd.Timestamp(start)
+        start = start.tz_localize("UTC") if start.tzinfo is None else start
+        days = (now - start).days + 1
+        period = next(name for name, length in PERIOD_DAYS.items() if length is None or length >= days)
+    cap = INTRADAY_MAX_PERIOD.get(interval)
+    return cap if cap is not None and _covers(period, cap) else period
+
+
+def _covers(period: str, other: str) -> bool:
+    """True if period reaches at least as far back as other"""
+    length, other_length = PERIOD_DAYS.get(period, 0), PERIOD_DAYS.get(other, 0)
+    return length is None or (other_length is not None and length >= other_length)
+
+
+def _tmp_path(path: Path) -> Path:
+    """Unique per process and thread, so concurrent writers never replace each other's tmp file"""
+    return path.with_suffix(f"{path.suffix}.{os.getpid()}.{threading.get_ident()}.tmp")
+
+
+def _write_index(index_path: Path, index: Dict[str, dict]) -> None:
+    tmp = _tmp_path(index_path)
+    with open(tmp, "w") as f:
+        json.dump(index, f)
+    os.replace(tmp, index_path)
+
+
+def _flush_index(index_path: Path, index: Dict[str, dict], dirty: threading.Event, lock) -> None:
+    """Write the index if cache hits changed it (also the finalizer, so it must not reference the cache)"""
+    with lock:
+        # Also runs at exit, when a temporary cache dir may already be gone
+        if dirty.is_set() and index_path.parent.is_dir():
+            _write_index(index_path, index)
+            dirty.clear()
+
+
+class BarCache:
+
+    def __init__(self, cache_dir: Union[str, Path], max_bytes: int = 2 * 1024 ** 3):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.index_path = self.cache_dir / "index.json"
+        self._lock = threading.RLock()
+        self._index: Dict[str, dict] = self._load_index()
+        # Set while access times bumped by cache hits are not written yet
+        self._dirty = threading.Event()
+        self._saved_at = time.monotonic()
+        self._finalizer = weakref.finalize(self, _flush_index, self.index_path, self._index, self._dirty, self._lock)
+
+    ## Index ##
+
+    def _load_index(self) -> Dict[str, dict]:
+        if not self.index_path.exists():
+            return {}
+        try:
+            with open(self.index_path) as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logging.warning(f"Ignoring unreadable cache index {self.index_path}: {str(e)}")
+            return {}
+
+    def _save_index(self) -> None:
+        _write_index(self.index_path, self._index)
+        self._dirty.clear()
+        self._saved_at = time.monotonic()
+
+    def flush(self) -> None:
+        """Write access times bumped by cache hits since the last index write"""
+        _flush_index(self.index_path, self._index, self._dirty, self._lock)
+
+    def close(self) -> None:
+        """Flush and stop flushing at garbage collection / exit"""
+        self._finalizer()
+
+    @staticmethod
+    def key(source: str, symbol: str, interval: str) -> str:
+        return f"{source}/{interval}/{symbol}"
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.parquet"
+
+    ## Read / write ##
+
+    def get(self, source: str, symbol: str, interval: str) -> Optional[pd.DataFrame]:
+        """Cached bars or None; marks the entry as recently used"""
+        key = self.key(source, symbol, interval)
+        with self._lock:
+            entry = self._index.get(key)
+            path = self._path(key)
+            if entry is None or not path.exists():
+                self._index.pop(key, None)
+                return None
+            entry["last_access"] = time.time()
+            self._dirty.set()
+            if time.monotonic() - self._saved_at >= ACCESS_FLUSH_SECONDS:
+                self._save_index()
+        data = pd.read_parquet(path)
+        if TS_COLUMN not in data.columns:
+            # Written before sources emitted the contract schema: refetch it
+            return None
+        return data
+
+    def put(self, source: str, symbol: str, interval: str, data: pd.DataFrame,
+            period: str = DEFAULT_PERIOD) -> None:
+        """Write bars for an entry, replacing what was cached, then enforce the size bound"""
+        key = self.key(source, symbol, interval)
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = _tmp_path(path)
+        data.to_parquet(tmp, index=False)
+        os.replace(tmp, path)
+
+        now = time.time()
+        last_ts = data[TS_COLUMN].max() if TS_COLUMN in data.columns and len(data) else None
+        with self._lock:
+            self._index[key] = {
+                "last_ts": last_ts.isoformat() if last_ts is not None else None,
+                "period": period,
+                "refreshed_at": now,
+                "last_access": now,
+                "bytes": path.stat().st_size,
+            }
+            self._evict(keep=key)
+            self._save_index()
+
+    def last_timestamp(self, source: str, symbol: str, interval: str) -> Optional[pd.Timestamp]:
+        entry = self._index.get(self.key(source, symbol, interval))
+        if entry is None or entry["last_ts"] is None:
+            return None
+        return pd.Timestamp(entry["last_ts"])
+
+    def covers(self, source: str, symbol: str, interval: str, period: str) -> bool:
+        """True if the entry was fetched with a lookback reaching at least as far back as period"""
+        entry = self._index.get(self.key(source, symbol, interval))
+        # Entries written before periods were tracked were always fetched for the default period
+        return entry is not None and _covers(entry.get("period", DEFAULT_PERIOD), period)
+
+    def is_fresh(self, source: str, symbol: str, interval: str) -> bool:
+        """True if the entry was refreshed less than one interval ago"""
+        entry = self._index.get(self.key(source, symbol, interval))
+        if entry is None:
+            return False
+        max_age = INTERVAL_SECONDS.get(interval, 86400)
+        return time.time() - entry["refreshed_at"] < max_age
+
+    def size_bytes(self) -> int:
+        return sum(entry["bytes"] for entry in self._index.values())
+
+    def _evict(self, keep: Optional[str] = None) -> None:
+        """Drop least recently used entries until the cache fits in max_bytes"""
+        total = self.size_bytes()
+        for key in sorted(self._index, key=lambda k: self._index[k]["last_access"]):
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            total -= self._index.pop(key)["bytes"]
+            self._path(key).unlink(missing_ok=True)
+            logging.info(f"Evicted {key} from bar cache")
+
+    ## Fetch through the cache ##
+
+    def fetch(self, source: DataSource, symbol: str, period: str = DEFAULT_PERIOD, interval: str = "1d") -> pd.DataFrame:
+        """
+        Return bars for symbol, going to the source only for what is missing:
+        - fresh entry: served from disk, no network call
+        - stale entry: fetch from the last cached timestamp onwards and merge
+        - no entry, or one with a shorter lookback: full fetch for `period`
+        """
+        cached = self.get(source.name, symbol, interval)
+        if cached is not None and not self.covers(source.name, symbol, interval, period):
+            # Cached with a shorter lookback than asked for: refetch it whole
+            cached = None
+        if cached is not None and self.is_fresh(source.name, symbol, interval):
+            return cached
+
+        last_ts = self.last_timestamp(source.name, symbol, interval) if cached is not None else None
+        if last_ts is None:
+            data = source.fetch_data(symbol, period=period, interval=interval)
+        else:
+            tail = source.fetch_data(symbol, period=period, interval=interval, start=last_ts)
+            # The merged entry still reaches as far back as its first fetch did
+            period = self._index.get(self.key(source.name, symbol, interval), {}).get("period", period)
+            # The last cached bar may have been partial, so the refetched copy wins
+            data = pd.concat([cached, tail], ignore_index=True)
+            data = data.drop_duplicates(subset=[TS_COLUMN], keep="last").sort_values(TS_COLUMN, ignore_index=True)
+
+        self.put(source.name, symbol, interval, data, period)
+        return data
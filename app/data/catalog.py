@@ -1,11 +1,23 @@
+import numpy as np
 import pandas as pd
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Dict, Iterator, List, Optional, Tuple
 from pathlib import Path
-from .sources.base_class import DataSource
-from .sources.yahoo_source import YahooSource
+from concurrent.futures import ThreadPoolExecutor
+import queue
+import random
+import time
+from app.core.instrument import instrumented, result_rows
+from .cache import BarCache, period_covering
+from .distributed import RedisBarCache
+from .sources.base_class import DataSource, RateLimitError
+from .sources.rate_limiter import RedisTokenBucket
+from .sources.registry import create_source
 import logging
 
+# Registered by name on every catalog; imported and constructed on first use
+DEFAULT_SOURCES = ["yahoo"]
+
 class DataCatalog:
     """
     DataCatalog class
@@ -14,32 +26,101 @@ class DataCatalog:
     - Listing all available tickers
     - Listing all available timeframes
     - Listing all available data sources
+    - Fetching bars for one symbol (get_data) or many symbols concurrently (get_data_many)
+    - Streaming many symbols one frame at a time (iter_data_many)
+    - Sharing its bar cache and source rate limits with other processes through Redis (attach_redis)
+
+    Sources named in `sources` (default DEFAULT_SOURCES) are only looked up
+    in the source registry (sources/registry.py) and constructed the first
+    time they are used, so a catalog that only serves cached bars never
+    imports a source's client library.
     """
-    def __init__(self, data_dir: str = "data"):
-        self.data_sources: Dict[str, DataSource] = {}
+    def __init__(self, data_dir: str = "data", use_cache: bool = True, cache_max_bytes: int = 2 * 1024 ** 3,
+                 sources: Optional[List[str]] = None):
+        # name -> source, or None while it is registered but not yet constructed
+        self._sources: Dict[str, Optional[DataSource]] = {}
+        self._source_kwargs: Dict[str, dict] = {}
         self.data_dir = Path(data_dir)
         self.data_dir.mkdir(parents=True, exist_ok=True)
 
-        # Automatically register YahooSource as a default
-        yahoo_source = YahooSource()
-        self.add_data_source(yahoo_source)
-        logging.info("YahooSource registered as default data source")
+        # On-disk bar cache in front of every source (None disables it)
+        self.cache = BarCache(self.data_dir / "cache", max_bytes=cache_max_bytes) if use_cache else None
+        # Redis cache shared by every worker, checked before the local one (see attach_redis)
+        self.shared_cache: Optional[RedisBarCache] = None
+        self.redis = None
+
+        for name in DEFAULT_SOURCES if sources is None else sources:
+            self.register_source(name)
 
     def add_data_source(self, source: DataSource):
         """Add a data source to the catalog"""
-        if not isinstance(source, DataSource) or source.name not in self.get_data_sources():
+        if not isinstance(source, DataSource):
             raise ValueError(f"Invalid data source: {source}")
-        self.data_sources[source.name] = source
+        if source.name in self.get_data_sources():
+            raise ValueError(f"Data source {source.name} already registered")
+        self._install(source)
+
+    def register_source(self, name: str, **kwargs) -> None:
+        """Add a registry source by name; it is imported and built (with kwargs) on first use"""
+        if name in self.get_data_sources():
+            raise ValueError(f"Data source {name} already registered")
+        self._sources[name] = None
+        self._source_kwargs[name] = kwargs
+
+    def _install(self, source: DataSource) -> DataSource:
+        if self.redis is not None:
+            self._share_rate_limit(source)
+        self._sources[source.name] = source
+        return source
+
+    def _resolve(self, name: str) -> DataSource:
+        source = self._sources[name]
+        if source is None:
+            # Kept until the source is built, so a failed load fails the same way next time
+            source = create_source(name, **self._source_kwargs.get(name, {}))
+            self._source_kwargs.pop(name, None)
+            logging.info(f"Loaded data source {name} ({type(source).__name__})")
+            # Keep the registered name even if the class names itself differently
+            del self._sources[name]
+            self._install(source)
+            if source.name != name:
+                self._sources[name] = self._sources.pop(source.name)
+        return source
+
+    @property
+    def data_sources(self) -> Dict[str, DataSource]:
+        """All registered sources by name, constructing any that are still pending"""
+        return {name: self._resolve(name) for name in list(self._sources)}
+
+    def attach_redis(self, client, cache_ttl: Optional[int] = None) -> None:
+        """
+        Share fetched bars and source rate limits with every process using the same Redis
+
+        Bars fetched by any worker are cached in Redis (Arrow IPC, TTL of
+        cache_ttl seconds or one bar interval), and each source's token bucket
+        is replaced by a RedisTokenBucket so its requests_per_second holds
+        across the whole fleet rather than per process.
+        """
+        self.redis = client
+        self.shared_cache = RedisBarCache(client, ttl_seconds=cache_ttl)
+        # Pending sources get theirs when they are constructed
+        for source in self._sources.values():
+            if source is not None:
+                self._share_rate_limit(source)
+
+    def _share_rate_limit(self, source: DataSource) -> None:
+        local = source.rate_limiter
+        source.rate_limiter = RedisTokenBucket(self.redis, f"ratelimit:{source.name}", local.rate, local.capacity)
 
     def get_data_sources(self) -> List[str]:
-        """Get all data sources in the catalog"""
-        return list(self.data_sources.keys())
+        """Get all data sources in the catalog (without constructing pending ones)"""
+        return list(self._sources.keys())
     
     def get_data_source(self, name: str) -> DataSource:
         """Get a data source by name"""
         if name not in self.get_data_sources():
             raise ValueError(f"Data source {name} not found")
-        return self.data_sources[name]
+        return self._resolve(name)
     
     def list_symbols(self) -> List[str]:
         """List all available symbols in the catalog"""
@@ -71,9 +152,11 @@ class DataCatalog:
         # 3. Try to fetch data from available sources
         # 4. Return the data or raise an error
 
-        if not self.data_sources:
+        if not self._sources:
             raise ValueError("No data sources available")
-        
+
+        # Fetch enough history to reach start_date, then trim to the requested range
+        period = period_covering(start_date, interval)
         if source_name:
             # Try specific source first
             logging.info(f"Fetching data for {symbol} from {source_name}")
@@ -84,9 +167,9 @@ class DataCatalog:
             logging.info(f"Using data source: {source_name}")
 
             try:
-                data = source.fetch_data(symbol, period = "1y", interval = interval)
+                data = self._fetch(source, symbol, interval, period)
                 logging.info(f"Data fetched successfully for {symbol} from {source_name}")
-                return data
+                return _between(data, start_date, end_date)
             except Exception as e:
                 raise ValueError(f"Error fetching data from {source_name}: {str(e)}")
         
@@ -94,11 +177,9 @@ class DataCatalog:
             # Try all sources in the catalog
             for source_name, source in self.data_sources.items():
                 try:
-                    # Convert date range to period format that YahooSource expects (i.e "1d", "1wk", "1mo", etc.)
-
-                    data = source.fetch_data(symbol, period = "1y", interval = interval)
+                    data = self._fetch(source, symbol, interval, period)
                     logging.info(f"Data fetched successfully for {symbol} from {source_name}")
-                    return data
+                    return _between(data, start_date, end_date)
                 
                 except Exception as e:
                     # If this source fails, try the next one
@@ -109,3 +190,153 @@ class DataCatalog:
             logging.error(f"No data found for {symbol} in any available source")
             raise ValueError(f"No data found for {symbol} in any available source")
 
+    def get_data_many(self, symbols: List[str], start_date: str, end_date: str, interval: str = "1d",
+                      source_name: Optional[str] = None, max_workers: int = 8, max_retries: int = 5,
+                      backoff: float = 0.5) -> pd.DataFrame:
+        """
+        Get data for many symbols concurrently
+
+        Fetches run on a bounded thread pool. Each source's token bucket (see
+        DataSource.check_rate_limit) paces the calls, and a RateLimitError is
+        retried with exponential backoff. Results are merged into one
+        long-format frame keyed by (ts, symbol); symbols that still fail are
+        logged and listed in the frame's attrs["failed_symbols"].
+        """
+        frames = []
+        failed = {}
+        for symbol, data, error in self.iter_data_many(symbols, start_date, end_date, interval, source_name,
+                                                       max_workers, max_retries, backoff):
+            if error is not None:
+                failed[symbol] = str(error)
+            elif data is not None and not data.empty:
+                frames.append(data)
+
+        logging.info(f"Fetched {len(frames)}/{len(frames) + len(failed)} symbols ({len(failed)} failed)")
+        if frames:
+            merged = pd.concat(frames, ignore_index=True)
+            merged = merged.sort_values(["ts", "symbol"], ignore_index=True)
+        else:
+            merged = pd.DataFrame(columns=["ts", "symbol", "open", "high", "low", "close", "volume"])
+        merged.attrs["failed_symbols"] = failed
+        return merged
+
+    def iter_data_many(self, symbols: List[str], start_date: str, end_date: str, interval: str = "1d",
+                       source_name: Optional[str] = None, max_workers: int = 8, max_retries: int = 5,
+                       backoff: float = 0.5, queue_size: Optional[int] = None
+                       ) -> Iterator[Tuple[str, Optional[pd.DataFrame], Optional[Exception]]]:
+        """
+        Stream (symbol, frame, error) as each symbol's fetch completes
+
+        Workers hand finished frames over a bounded queue (queue_size,
+        default max_workers), so at most max_workers + queue_size symbols are
+        held in memory however large the universe is. Frames are long format
+        [ts, symbol, open, high, low, close, volume]; on failure frame is None
+        and error is set. symbol is categorical over all requested symbols.
+        """
+        if not self._sources:
+            raise ValueError("No data sources available")
+        if source_name and source_name not in self.get_data_sources():
+            raise ValueError(f"Data source {source_name} not found")
+
+        sources = [self.get_data_source(source_name)] if source_name else list(self.data_sources.values())
+        todo = list(dict.fromkeys(symbols))
+        results: queue.Queue = queue.Queue(maxsize=queue_size or max_workers)
+        # One categorical dtype for every frame so they concatenate without falling back to object
+        symbol_dtype = pd.CategoricalDtype(sorted(todo))
+        period = period_covering(start_date, interval)
+
+        def work(symbol: str) -> None:
+            item: Tuple[str, Optional[pd.DataFrame], Optional[Exception]]
+            try:
+                data = self._fetch_from_sources(sources, symbol, interval, period, max_retries, backoff)
+                data = _between(data, start_date, end_date)
+                item = (symbol, data.astype({"symbol": symbol_dtype}), None)
+            except Exception as e:
+                logging.error(f"No data found for {symbol}: {str(e)}")
+                item = (symbol, None, e)
+            results.put(item)
+
+        pool = ThreadPoolExecutor(max_workers=max_workers)
+        futures = [pool.submit(work, symbol) for symbol in todo]
+        try:
+            for _ in futures:
+                yield results.get()
+        finally:
+            # Consumer stopped early: drop queued symbols and unblock workers waiting on put()
+            for future in futures:
+                future.cancel()
+            while not all(future.done() for future in futures):
+                try:
+                    results.get(timeout=0.05)
+                except queue.Empty:
+                    pass
+            pool.shutdown()
+
+    def _fetch_from_sources(self, sources: List[DataSource], symbol: str, interval: str, period: str,
+                            max_retries: int, backoff: float) -> pd.DataFrame:
+        """Try each source in order, like get_data does"""
+        errors = []
+        for source in sources:
+            try:
+                data = self._fetch_with_retry(source, symbol, interval, period, max_retries, backoff)
+                data.attrs["source"] = source.name
+                return data
+            except Exception as e:
+                logging.warning(f"Error fetching {symbol} from {source.name}: {str(e)} so moving on to the next source")
+                errors.append(f"{source.name}: {str(e)}")
+        raise ValueError("; ".join(errors) or "no sources tried")
+
+    def _fetch_with_retry(self, source: DataSource, symbol: str, interval: str, period: str,
+                          max_retries: int, backoff: float) -> pd.DataFrame:
+        """Fetch from one source, backing off and retrying on RateLimitError"""
+        attempt = 0
+        while True:
+            try:
+                return self._fetch(source, symbol, interval, period)
+            except RateLimitError as e:
+                # Jitter so threads don't retry in lockstep
+                jitter = random.uniform(1.0, 1.5)
+                if e.retry_after is not None:
+                    # Our own token bucket is empty: this is pacing, not a failed attempt
+                    time.sleep(e.retry_after * jitter)
+                    continue
+                if attempt == max_retries:
+                    raise
+                delay = backoff * 2 ** attempt * jitter
+                attempt += 1
+                logging.debug(f"{source.name} rate limited on {symbol}, retrying in {delay:.2f}s")
+                time.sleep(delay)
+
+    @instrumented("catalog_fetch", rows=result_rows)
+    def _fetch(self, source: DataSource, symbol: str, interval: str, period: str = "1y") -> pd.DataFrame:
+        """Fetch `period` of history through the shared and local bar caches when enabled"""
+        if self.shared_cache is not None:
+            data = self.shared_cache.get(source.name, symbol, interval, period)
+            if data is not None:
+                return data
+        if self.cache is None:
+            data = source.fetch_data(symbol, period=period, interval=interval)
+        else:
+            data = self.cache.fetch(source, symbol, period=period, interval=interval)
+        if self.shared_cache is not None:
+            self.shared_cache.put(source.name, symbol, interval, data, period)
+        return data
+
+
+def _between(data: pd.DataFrame, start_date, end_date) -> pd.DataFrame:
+    """Bars with start_date <= ts <= end_date; a date-only end_date includes that whole day"""
+    if data.empty or "ts" not in data.columns:
+        return data
+    keep = np.ones(len(data), dtype=bool)
+    ts = data["ts"]
+    if start_date is not None:
+        keep &= (ts >= _utc(start_date)).to_numpy()
+    if end_date is not None:
+        end = _utc(end_date)
+        keep &= (ts < end + pd.Timedelta(days=1) if end == end.normalize() else ts <= end).to_numpy()
+    return data if keep.all() else data[keep].reset_index(drop=True)
+
+
+def _utc(value) -> pd.Timestamp:
+    ts = pd.Timestamp(value)
+    return ts.tz_localize("UTC") if ts.tzinfo is None else ts.tz_convert("UTC")
@@ -0,0 +1,210 @@
+"""
+Price database
+----------------
+Responsible for:
+- Loading bars into the Postgres price_data table (schema in init.sql)
+- Reading them back in chunks for backtests and the catalog
+- Recording ingestion runs in ingestion_logs
+
+How:
+- Connections come from a thread-safe pool (ingest writers and readers can
+  share one PriceDatabase).
+- Writes never INSERT row by row: each chunk is packed into an in-memory
+  COPY BINARY buffer with NumPy structured arrays (one fixed-width record
+  layout per symbol, so no per-row Python or text formatting), COPYed into
+  a temporary float8 staging table, then merged with one
+  INSERT ... SELECT ... ON CONFLICT (symbol, interval, timestamp) DO UPDATE.
+  NaN prices/volumes are stored as NULL.
+- Reads use a server-side (named) cursor and fetch chunk_rows rows at a
+  time, so a large query never materialises on the client all at once.
+
+Bars use the repo's long format [ts, symbol, open, high, low, close, volume];
+ts maps to the timestamp column. Every row also carries its bar interval
+(1d, 1h, ...): writes take it per call and reads select one interval.
+"""
+
+import io
+import os
+import struct
+import uuid
+from contextlib import contextmanager
+from typing import Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+BAR_COLUMNS = ["ts", "symbol", "open", "high", "low", "close", "volume"]
+VALUE_COLUMNS = ["open", "high", "low", "close", "volume"]
+
+# COPY BINARY framing; timestamps are microseconds since 2000-01-01 UTC
+COPY_HEADER = b"PGCOPY\n\xff\r\n\x00" + struct.pack(">ii", 0, 0)
+COPY_TRAILER = struct.pack(">h", -1)
+PG_EPOCH_US = 946_684_800_000_000
+
+
+class PriceDatabase:
+
+    def __init__(self, dsn: Optional[str] = None, min_connections: int = 1, max_connections: int = 8,
+                 chunk_rows: int = 500_000):
+        self.dsn = dsn or os.environ.get("DATABASE_URL")
+        if not self.dsn:
+            raise ValueError("No database DSN given and DATABASE_URL is not set")
+        from psycopg2.pool import ThreadedConnectionPool
+        self.pool = ThreadedConnectionPool(min_connections, max_connections, self.dsn)
+        # Rows per COPY buffer / per fetch on reads
+        self.chunk_rows = chunk_rows
+
+    def close(self) -> None:
+        self.pool.closeall()
+
+    @contextmanager
+    def connection(self):
+        """Pooled connection; commits on success, rolls back on error"""
+        conn = self.pool.getconn()
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            self.pool.putconn(conn)
+
+    ## Write path ##
+
+    def write(self, bars: pd.DataFrame, source: str = "yahoo", interval: str = "1d") -> int:
+        """Upsert one interval's bars; the latest row wins for a repeated (symbol, ts). Returns rows loaded."""
+        missing = [col for col in BAR_COLUMNS if col not in bars.columns]
+        if missing:
+            raise ValueError(f"Bars are missing columns: {missing}")
+        if bars.empty:
+            return 0
+
+        # ON CONFLICT cannot touch the same row twice in one statement
+        bars = bars.drop_duplicates(subset=["symbol", "ts"], keep="last")
+        written = 0
+        with self.connection() as conn, conn.cursor() as cur:
+            cur.execute(
+                "CREATE TEMP TABLE price_data_stage (symbol text, timestamp timestamptz, open float8, "
+                "high float8, low float8, close float8, volume float8) ON COMMIT DROP"
+            )
+            for start in range(0, len(bars), self.chunk_rows):
+                chunk = bars.iloc[start:start + self.chunk_rows]
+                cur.copy_expert("COPY price_data_stage FROM STDIN WITH (FORMAT binary)", _binary_buffer(chunk))
+                written += len(chunk)
+            cur.execute(
+                "INSERT INTO price_data (symbol, interval, timestamp, open, high, low, close, volume, source) "
+                "SELECT symbol, %s, timestamp, NULLIF(open, 'NaN'), NULLIF(high, 'NaN'), NULLIF(low, 'NaN'), "
+                "NULLIF(close, 'NaN'), round(NULLIF(volume, 'NaN'))::bigint, %s FROM price_data_stage "
+                "ON CONFLICT (symbol, interval, timestamp) DO UPDATE SET "
+                "open = EXCLUDED.open, high = EXCLUDED.high, low = EXCLUDED.low, close = EXCLUDED.close, "
+                "volume = EXCLUDED.volume, source = EXCLUDED.source, updated_at = now()",
+                (interval, source),
+            )
+        return written
+
+    ## Read path ##
+
+    def iter_read(self, symbols: Optional[List[str]] = None, start=None, end=None,
+                  chunk_rows: Optional[int] = None, interval: str = "1d") -> Iterator[pd.DataFrame]:
+        """Stream one interval's bars ordered by (ts, symbol) as DataFrames of at most chunk_rows rows"""
+        chunk_rows = chunk_rows or self.chunk_rows
+        where: List[str] = ["interval = %s"]
+        params: list = [interval]
+        if symbols is not None:
+            where.append("symbol = ANY(%s)")
+            params.append(list(symbols))
+        if start is not None:
+            where.append("timestamp >= %s")
+            params.append(_to_utc(start).to_pydatetime())
+        if end is not None:
+            where.append("timestamp <= %s")
+            params.append(_to_utc(end).to_pydatetime())
+        query = (
+            "SELECT extract(epoch FROM timestamp)::float8, symbol, open::float8, high::float8, low::float8, "
+            "close::float8, volume::float8 FROM price_data"
+            + f" WHERE {' AND '.join(where)}"
+            + " ORDER BY timestamp, symbol"
+        )
+
+        with self.connection() as conn:
+            # A named cursor lives on the server; rows come over in chunk_rows batches
+            with conn.cursor(name=f"price_data_{uuid.uuid4().hex[:8]}") as cur:
+                cur.itersize = chunk_rows
+                cur.execute(query, params)
+                while True:
+                    rows = cur.fetchmany(chunk_rows)
+                    if not rows:
+                        break
+                    yield _to_frame(rows)
+
+    def read(self, symbols: Optional[List[str]] = None, start=None, end=None,
+             interval: str = "1d") -> pd.DataFrame:
+        frames = list(self.iter_read(symbols, start, end, interval=interval))
+        if not frames:
+            return _to_frame([])
+        return pd.concat(frames, ignore_index=True)
+
+    ## Ingestion log ##
+
+    def start_ingestion_log(self, symbols: List[str], interval: str, source: str = "yahoo") -> int:
+        with self.connection() as conn, conn.cursor() as cur:
+            cur.execute(
+                "INSERT INTO ingestion_logs (source, interval, symbols) VALUES (%s, %s, %s) RETURNING id",
+                (source, interval, list(symbols)),
+            )
+            return cur.fetchone()[0]
+
+    def finish_ingestion_log(self, log_id: int, rows_written: int, status: str = "success",
+                             error: Optional[str] = None) -> None:
+        with self.connection() as conn, conn.cursor() as cur:
+            cur.execute(
+                "UPDATE ingestion_logs SET rows_written = %s, status = %s, error = %s, finished_at = now() "
+                "WHERE id = %s",
+                (rows_written, status, error, log_id),
+            )
+
+
+def _binary_buffer(bars: pd.DataFrame) -> io.BytesIO:
+    """Pack bars as COPY BINARY rows (symbol, timestamp, open, high, low, close, volume)"""
+    ts = pd.DatetimeIndex(pd.to_datetime(bars["ts"], utc=True)).as_unit("us").asi8 - PG_EPOCH_US
+    values = {col: bars[col].to_numpy(dtype=np.float64, na_value=np.nan) for col in VALUE_COLUMNS}
+    codes, symbols = pd.factorize(bars["symbol"].astype(str))
+
+    buffer = io.BytesIO()
+    buffer.write(COPY_HEADER)
+    for code, symbol in enumerate(symbols):
+        rows = np.flatnonzero(codes == code)
+        name = symbol.encode()
+        # Every field is (int32 byte length, big-endian value)
+        layout = [("fields", ">i2"), ("symbol_len", ">i4"), ("symbol", f"S{len(name)}"),
+                  ("ts_len", ">i4"), ("ts", ">i8")]
+        for col in VALUE_COLUMNS:
+            layout += [(f"{col}_len", ">i4"), (col, ">f8")]
+        records = np.empty(len(rows), dtype=np.dtype(layout))
+        records["fields"] = 2 + len(VALUE_COLUMNS)
+        records["symbol_len"] = len(name)
+        records["symbol"] = name
+        records["ts_len"] = 8
+        records["ts"] = ts[rows]
+        for col in VALUE_COLUMNS:
+            records[f"{col}_len"] = 8
+            records[col] = values[col][rows]
+        buffer.write(records.tobytes())
+    buffer.write(COPY_TRAILER)
+    buffer.seek(0)
+    return buffer
+
+
+def _to_frame(rows: list) -> pd.DataFrame:
+    """Fetched row tuples -> long-format bars with a UTC ts"""
+    frame = pd.DataFrame.from_records(rows, columns=["epoch", "symbol", "open", "high", "low", "close", "volume"])
+    epoch = frame.pop("epoch").to_numpy(dtype=np.float64)
+    ts = pd.to_datetime(np.round(epoch * 1e6).astype(np.int64), unit="us", utc=True)
+    frame.insert(0, "ts", ts)
+    return frame
+
+
+def _to_utc(value) -> pd.Timestamp:
+    ts = pd.Timestamp(value)
+    return ts.tz_localize("UTC") if ts.tzinfo is None else ts.tz_convert("UTC")
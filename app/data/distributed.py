@@ -0,0 +1,147 @@
+"""
+Distributed ingestion
+----------------
+Responsible for:
+- A Redis job queue of (symbol, interval) fetch jobs consumed by any number
+  of ingestor workers (processes or containers)
+- A shared Redis cache of recently fetched standardized bars, with TTLs
+- Connecting to Redis ($REDIS_URL)
+
+How:
+- Queue: producers LPUSH jobs onto <prefix>:pending. A worker moves a job
+  atomically into its own <prefix>:processing:<worker> list (BLMOVE) and
+  removes it when done (ack), so a crashed worker's jobs can be put back
+  with recover(). Failed symbols are kept in the <prefix>:failed hash.
+- Cache: bars are stored as one Arrow IPC stream (zstd compressed) per
+  (source, interval, symbol) key with a TTL of one bar interval by default,
+  so every worker and the catalog in any process reuse the same download.
+- Fleet-wide rate limits live in sources/rate_limiter.py (RedisTokenBucket);
+  DataCatalog.attach_redis wires all three up.
+"""
+
+import json
+import os
+import socket
+from dataclasses import asdict, dataclass
+from typing import Iterable, Optional
+
+import pandas as pd
+import pyarrow as pa
+
+from .cache import DEFAULT_PERIOD, INTERVAL_SECONDS
+
+DEFAULT_REDIS_URL = "redis://localhost:6379/0"
+
+
+def connect(url: Optional[str] = None):
+    """Redis client for url (default $REDIS_URL); raw bytes, no response decoding"""
+    import redis
+
+    return redis.Redis.from_url(url or os.environ.get("REDIS_URL", DEFAULT_REDIS_URL))
+
+
+## Shared bar cache ##
+
+def to_ipc(data: pd.DataFrame) -> bytes:
+    """Frame -> compressed Arrow IPC stream bytes"""
+    table = pa.Table.from_pandas(data, preserve_index=False)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema, options=pa.ipc.IpcWriteOptions(compression="zstd")) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def from_ipc(payload: bytes) -> pd.DataFrame:
+    return pa.ipc.open_stream(payload).read_all().to_pandas()
+
+
+class RedisBarCache:
+
+    def __init__(self, client, ttl_seconds: Optional[int] = None, prefix: str = "bars"):
+        self.client = client
+        # None: one bar interval (see INTERVAL_SECONDS)
+        self.ttl_seconds = ttl_seconds
+        self.prefix = prefix
+
+    def key(self, source: str, symbol: str, interval: str, period: str = DEFAULT_PERIOD) -> str:
+        # Keyed by lookback too, so a short fetch never answers a request for more history
+        return f"{self.prefix}:{source}/{interval}/{period}/{symbol}"
+
+    def get(self, source: str, symbol: str, interval: str, period: str = DEFAULT_PERIOD) -> Optional[pd.DataFrame]:
+        payload = self.client.get(self.key(source, symbol, interval, period))
+        return from_ipc(payload) if payload is not None else None
+
+    def put(self, source: str, symbol: str, interval: str, data: pd.DataFrame, period: str = DEFAULT_PERIOD) -> None:
+        ttl = self.ttl_seconds or INTERVAL_SECONDS.get(interval, 86400)
+        self.client.set(self.key(source, symbol, interval, period), to_ipc(data), ex=ttl)
+
+
+## Job queue ##
+
+@dataclass(frozen=True)
+class IngestJob:
+    symbol: str
+    interval: str = "1d"
+    start_date: Optional[str] = None
+    end_date: Optional[str] = None
+
+    def encode(self) -> bytes:
+        return json.dumps(asdict(self), separators=(",", ":")).encode()
+
+    @classmethod
+    def decode(cls, raw: bytes) -> "IngestJob":
+        return cls(**json.loads(raw))
+
+
+class IngestQueue:
+
+    def __init__(self, client, name: str = "ingest", worker_id: Optional[str] = None):
+        self.client = client
+        self.name = name
+        # Stable per host/container so a restarted worker can recover its own jobs;
+        # give each process its own id when running several workers on one host
+        self.worker_id = worker_id or socket.gethostname()
+        self.pending_key = f"{name}:pending"
+        self.processing_key = f"{name}:processing:{self.worker_id}"
+        self.failed_key = f"{name}:failed"
+
+    def enqueue(self, symbols: Iterable[str], interval: str = "1d", start_date: Optional[str] = None,
+                end_date: Optional[str] = None) -> int:
+        """Push one job per symbol; returns the number of jobs queued"""
+        jobs = [IngestJob(symbol, interval, start_date, end_date).encode() for symbol in dict.fromkeys(symbols)]
+        if jobs:
+            self.client.lpush(self.pending_key, *jobs)
+        return len(jobs)
+
+    def pop(self, timeout: float = 1.0) -> Optional[IngestJob]:
+        """Claim the oldest job, waiting up to timeout seconds; None if the queue stayed empty"""
+        raw = self.client.blmove(self.pending_key, self.processing_key, timeout, "RIGHT", "LEFT")
+        return IngestJob.decode(raw) if raw is not None else None
+
+    def ack(self, job: IngestJob, error: Optional[str] = None) -> None:
+        """Mark a claimed job done; an error records the symbol as failed"""
+        pipe = self.client.pipeline()
+        pipe.lrem(self.processing_key, 1, job.encode())
+        if error is None:
+            pipe.hdel(self.failed_key, job.symbol)
+        else:
+            pipe.hset(self.failed_key, job.symbol, error)
+        pipe.execute()
+
+    def recover(self) -> int:
+        """Put jobs left in this worker's processing list (e.g. after a crash) back on the queue"""
+        moved = 0
+        while self.client.lmove(self.processing_key, self.pending_key, "RIGHT", "RIGHT") is not None:
+            moved += 1
+        return moved
+
+    def pending(self) -> int:
+        return self.client.llen(self.pending_key)
+
+    def failed(self) -> dict:
+        return {k.decode(): v.decode() for k, v in self.client.hgetall(self.failed_key).items()}
+
+    def clear(self) -> None:
+        keys = [self.pending_key, self.failed_key] + list(self.client.scan_iter(f"{self.name}:processing:*"))
+        self.client.delete(*keys)
+
@@ -3,6 +3,256 @@ Ingestor module
 ----------------
 Responsbile for:
 - Downloading OHCLV bars for a given list of tickers
-- Merging them into a single dataframe
-- Saving as bars_1d.parquet
-"""
\ No newline at end of file
+- Appending them to the partitioned bar store (see store.py)
+  under data/bars/interval=<interval>/symbol=<symbol>/year=<year>/
+- Optionally upserting them into Postgres price_data (see database.py)
+  and recording the run in ingestion_logs
+
+Pipeline (streaming, nothing is merged across symbols):
+- Download workers -> bounded queue -> validation -> store writer
+- Each symbol's frame is validated (validate.py) and written as soon as it
+  arrives, then dropped, so peak memory is bounded by queue_size symbol
+  frames rather than by the size of the universe.
+- Timestamps are normalized to UTC and bars with missing or negative values
+  are dropped (and logged) before validation; a symbol that still fails
+  validation (missing columns, duplicate or out-of-order timestamps) is not
+  written and is reported as failed.
+- Throughput (rows/sec) is logged every report_every seconds.
+
+Distributed mode (Redis, see distributed.py):
+- `--enqueue` pushes one (symbol, interval) job per symbol onto the Redis
+  queue and exits; `--worker` runs run_worker(), which claims jobs with
+  `--worker-threads` consumer threads and pushes each through the same
+  validate -> store/database path. Add replicas to scale throughput.
+- With a Redis URL the catalog shares its bar cache and per-source rate
+  limits across all workers (DataCatalog.attach_redis).
+- Workers use the Redis cache only. Replicas share the data volume, and the
+  on-disk BarCache keeps a per-process index, so concurrent workers would
+  overwrite each other's index.json and lose track of entries (and of the
+  size bound).
+
+Usage:
+    python -m app.data.ingestor --symbols AAPL MSFT --interval 1d
+    (defaults to $DEFAULT_SYMBOLS; also loads Postgres when $DATABASE_URL is set)
+    python -m app.data.ingestor --enqueue --symbols AAPL MSFT
+    python -m app.data.ingestor --worker
+"""
+
+import argparse
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from app.core import profiler
+from .catalog import DataCatalog
+from .database import PriceDatabase
+from .distributed import IngestQueue, connect
+from .store import BarStore
+from .validate import validate_bars
+
+# Row-level checks whose rows are dropped rather than failing the symbol
+VALUE_CHECKS = ["missing_values", "all_null_rows", "negative_values"]
+
+DEFAULT_SYMBOLS = "AAPL,GOOGL,MSFT,TSLA,SPY,QQQ"
+
+
+class Throughput:
+    """Running rows/sec counter that logs at most every `every` seconds"""
+
+    def __init__(self, every: float = 5.0):
+        self.every = every
+        self.rows = 0
+        self.symbols = 0
+        self.started = time.perf_counter()
+        self._last_report = self.started
+        # Worker threads share one counter in distributed mode
+        self._lock = threading.Lock()
+
+    @property
+    def rows_per_sec(self) -> float:
+        elapsed = time.perf_counter() - self.started
+        return self.rows / elapsed if elapsed > 0 else 0.0
+
+    def add(self, rows: int) -> None:
+        with self._lock:
+            self.rows += rows
+            self.symbols += 1
+            now = time.perf_counter()
+            if now - self._last_report < self.every:
+                return
+            self._last_report = now
+        logging.info(f"Ingested {self.rows} rows / {self.symbols} symbols ({self.rows_per_sec:,.0f} rows/sec)")
+
+
+def ingest(symbols: List[str], start_date: str, end_date: str, interval: str = "1d",
+           catalog: Optional[DataCatalog] = None, store: Optional[BarStore] = None,
+           max_workers: int = 8, queue_size: Optional[int] = None, report_every: float = 5.0,
+           database: Optional[PriceDatabase] = None) -> int:
+    """Stream bars for symbols into the store (and the database if given). Returns rows written."""
+    catalog = catalog or DataCatalog()
+    store = store or BarStore(catalog.data_dir / "bars")
+    throughput = Throughput(report_every)
+    failed: Dict[str, str] = {}
+    log_id = database.start_ingestion_log(symbols, interval, source="catalog") if database else None
+
+    try:
+        _ingest_stream(catalog, store, database, symbols, start_date, end_date, interval, max_workers,
+                       queue_size, throughput, failed)
+    except Exception as e:
+        if database and log_id is not None:
+            database.finish_ingestion_log(log_id, throughput.rows, status="failed", error=str(e))
+        raise
+
+    if failed:
+        logging.warning(f"Failed to ingest {len(failed)} symbols: {sorted(failed)}")
+    if database and log_id is not None:
+        database.finish_ingestion_log(log_id, throughput.rows, status="partial" if failed else "success",
+                                      error=f"failed symbols: {sorted(failed)}" if failed else None)
+    logging.info(f"Ingested {throughput.rows} rows for {throughput.symbols} symbols into {store.root} "
+                 f"({throughput.rows_per_sec:,.0f} rows/sec)")
+    return throughput.rows
+
+
+def _ingest_stream(catalog, store, database, symbols, start_date, end_date, interval, max_workers, queue_size,
+                   throughput: Throughput, failed: dict) -> None:
+    for symbol, bars, error in catalog.iter_data_many(symbols, start_date, end_date, interval=interval,
+                                                      max_workers=max_workers, queue_size=queue_size):
+        if error is not None:
+            failed[symbol] = str(error)
+            continue
+        if bars.empty:
+            failed[symbol] = "no data"
+            continue
+        bars, dropped = _drop_bad_rows(bars)
+        if dropped:
+            logging.warning(f"Dropped {dropped} bars with missing or negative values from {symbol}")
+        if bars.empty:
+            failed[symbol] = "no valid bars"
+            continue
+        report = validate_bars(bars)
+        if not report.passed:
+            logging.warning(f"Skipping {symbol}: validation failed {report.summary()}")
+            failed[symbol] = "validation failed"
+            continue
+        written = store.write(bars, interval=interval)
+        if database:
+            database.write(bars, source=bars.attrs.get("source", "unknown"), interval=interval)
+        throughput.add(written)
+
+
+def _drop_bad_rows(bars: pd.DataFrame) -> tuple[pd.DataFrame, int]:
+    """bars with ts in UTC and without the rows failing a value check; returns (bars, rows dropped)"""
+    attrs = bars.attrs
+    if "ts" in bars.columns and str(getattr(bars["ts"].dt, "tz", None)) != "UTC":
+        bars = bars.assign(ts=pd.to_datetime(bars["ts"], utc=True))
+    report = validate_bars(bars, max_rows_per_check=len(bars))
+    bad = sorted({row for name in VALUE_CHECKS for row in report.checks[name].rows})
+    if bad:
+        bars = bars.drop(index=bars.index[bad]).reset_index(drop=True)
+    bars.attrs = attrs
+    return bars, len(bad)
+
+
+def run_worker(queue: IngestQueue, catalog: DataCatalog, store: Optional[BarStore] = None,
+               database: Optional[PriceDatabase] = None, threads: int = 4, idle_timeout: Optional[float] = None,
+               report_every: float = 5.0) -> int:
+    """
+    Consume ingest jobs from the Redis queue until it has been empty for
+    idle_timeout seconds (None: run forever). Returns rows written.
+    """
+    store = store or BarStore(catalog.data_dir / "bars")
+    throughput = Throughput(report_every)
+    recovered = queue.recover()
+    if recovered:
+        logging.info(f"Requeued {recovered} unfinished jobs from worker {queue.worker_id}")
+    log_id = database.start_ingestion_log([], "queue", source=f"worker:{queue.worker_id}") if database else None
+
+    def consume() -> None:
+        idle_since = time.monotonic()
+        while True:
+            job = queue.pop(timeout=1.0)
+            if job is None:
+                if idle_timeout is not None and time.monotonic() - idle_since >= idle_timeout:
+                    return
+                continue
+            failed: Dict[str, str] = {}
+            try:
+                _ingest_stream(catalog, store, database, [job.symbol], job.start_date, job.end_date, job.interval,
+                               1, None, throughput, failed)
+            except Exception as e:
+                failed[job.symbol] = str(e)
+            queue.ack(job, error=failed.get(job.symbol))
+            idle_since = time.monotonic()
+
+    consumers = [threading.Thread(target=consume, name=f"ingest-{i}", daemon=True) for i in range(threads)]
+    try:
+        for consumer in consumers:
+            consumer.start()
+        for consumer in consumers:
+            consumer.join()
+    finally:
+        if database and log_id is not None:
+            database.finish_ingestion_log(log_id, throughput.rows)
+    logging.info(f"Worker {queue.worker_id} ingested {throughput.rows} rows for {throughput.symbols} symbols "
+                 f"({throughput.rows_per_sec:,.0f} rows/sec)")
+    return throughput.rows
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Download bars into the partitioned bar store")
+    parser.add_argument("--symbols", nargs="+",
+                        default=os.environ.get("DEFAULT_SYMBOLS", DEFAULT_SYMBOLS).split(","))
+    parser.add_argument("--start-date", default="2018-01-01")
+    parser.add_argument("--end-date", default=None)
+    parser.add_argument("--interval", default="1d")
+    parser.add_argument("--data-dir", default="data")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--queue-size", type=int, default=None,
+                        help="Max downloaded symbols waiting for the writer (default: --workers)")
+    parser.add_argument("--database-url", default=os.environ.get("DATABASE_URL"),
+                        help="Also upsert into Postgres price_data (default: $DATABASE_URL)")
+    parser.add_argument("--redis-url", default=os.environ.get("REDIS_URL"),
+                        help="Share the bar cache and rate limits through Redis (default: $REDIS_URL)")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--enqueue", action="store_true", help="Queue one job per symbol on Redis and exit")
+    mode.add_argument("--worker", action="store_true", help="Consume queued jobs from Redis")
+    parser.add_argument("--worker-threads", type=int, default=4)
+    parser.add_argument("--worker-id", default=None, help="Processing list name (default: hostname)")
+    parser.add_argument("--idle-exit", type=float, default=None,
+                        help="Worker exits after the queue has been empty this many seconds (default: never)")
+    profiler.add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    if (args.enqueue or args.worker) and not args.redis_url:
+        parser.error("--enqueue/--worker need --redis-url or $REDIS_URL")
+    redis = connect(args.redis_url) if args.redis_url else None
+    if args.enqueue:
+        queued = IngestQueue(redis).enqueue(args.symbols, args.interval, args.start_date, args.end_date)
+        logging.info(f"Queued {queued} ingest jobs")
+        return
+
+    # Replicas share data_dir: workers leave the on-disk cache to Redis (see above)
+    catalog = DataCatalog(args.data_dir, use_cache=not args.worker)
+    if redis is not None:
+        catalog.attach_redis(redis)
+    database = PriceDatabase(args.database_url) if args.database_url else None
+    try:
+        with profiler.from_args(args):
+            if args.worker:
+                run_worker(IngestQueue(redis, worker_id=args.worker_id), catalog, database=database,
+                           threads=args.worker_threads, idle_timeout=args.idle_exit)
+            else:
+                ingest(args.symbols, args.start_date, args.end_date, args.interval, catalog=catalog,
+                       max_workers=args.workers, queue_size=args.queue_size, database=database)
+    finally:
+        if database:
+            database.close()
+
+
+if __name__ == "__main__":
+    main()
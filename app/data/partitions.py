@@ -0,0 +1,40 @@
+"""
+Bar store partitions
+--------------------
+Responsible for:
+- Reading the bar store's hive layout
+  (<root>/interval=<interval>/symbol=<symbol>/year=<year>/part-*.parquet)
+  the same way everywhere: BarStore's read path and the store validator
+  (validate.py) both use these helpers, so they see the same rows
+
+Rules:
+- Only year=<int> directories are partitions (e.g. not __HIVE_DEFAULT_PARTITION__).
+- Part names sort by write time; a partition's parts are read in that order
+  and the latest copy of a duplicated (ts, symbol) wins.
+"""
+
+from pathlib import Path
+from typing import List, Optional
+
+import pandas as pd
+
+
+def partition_year(path: Path) -> Optional[int]:
+    """Year of a year=YYYY partition dir; None for anything else (e.g. __HIVE_DEFAULT_PARTITION__)"""
+    key, _, value = path.name.partition("=")
+    if key != "year" or not path.is_dir():
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        return None
+
+
+def part_files(year_dir: Path) -> List[Path]:
+    """A partition's part files in write order (their names sort by write time)"""
+    return sorted(year_dir.glob("part-*.parquet"))
+
+
+def latest_copies(frame: pd.DataFrame) -> pd.DataFrame:
+    """Rows read in part-file order with superseded duplicates dropped: the later part file wins on (ts, symbol)"""
+    return frame.drop_duplicates(subset=["ts", "symbol"], keep="last")
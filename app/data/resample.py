@@ -0,0 +1,168 @@
+"""
+Bar resampler
+----------------
+Responsible for:
+- Aggregating long-format bars [ts, symbol, open, high, low, close, volume]
+  to a coarser interval (1m -> 5m, 1h, 1d, 1wk, 1mo), so only the finest
+  interval we ingest has to be stored
+
+How:
+- Every bar gets a bucket start. Intraday intervals floor the int64 ns
+  timestamp to a multiple of the interval (in UTC, so DST never merges two
+  hours); 1d and longer are cut at local midnight in `tz`, 1wk on Mondays
+  and 1mo on the 1st.
+- Rows are ordered by (symbol, bucket, ts): a stable sort by symbol when
+  the input is already in time order (the usual (ts, symbol) frame), no sort
+  at all for a single symbol, one lexsort otherwise. Group boundaries are
+  where symbol or bucket changes; open/close are the first/last row of each
+  group and high/low/volume come from np.fmax/fmin/add.reduceat over the
+  group starts. No groupby, no Python loop per group.
+- Bars without a finite close (no trade) are dropped before aggregating.
+- A bucket is labelled with its start time in UTC, and the output is sorted
+  by (ts, symbol) like every other bar frame.
+"""
+
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+MINUTE_NS = 60 * 1_000_000_000
+DAY_NS = 1440 * MINUTE_NS
+
+# Fixed-length intervals, in nanoseconds
+INTERVAL_NS = {
+    "1m": MINUTE_NS, "2m": 2 * MINUTE_NS, "5m": 5 * MINUTE_NS, "15m": 15 * MINUTE_NS, "30m": 30 * MINUTE_NS,
+    "1h": 60 * MINUTE_NS, "60m": 60 * MINUTE_NS, "90m": 90 * MINUTE_NS, "4h": 240 * MINUTE_NS, "1d": DAY_NS,
+}
+
+# Calendar intervals, with their nominal length for ordering
+CALENDAR_NS = {"1wk": 7 * DAY_NS, "1mo": 31 * DAY_NS}
+
+FIELDS = ["open", "high", "low", "close", "volume"]
+
+
+def interval_length(interval: str) -> int:
+    """Nominal length of an interval in ns (calendar intervals at their longest)"""
+    length = INTERVAL_NS.get(interval) or CALENDAR_NS.get(interval)
+    if length is None:
+        raise ValueError(f"Cannot resample to or from interval {interval} "
+                         f"(supported: {list(INTERVAL_NS) + list(CALENDAR_NS)})")
+    return length
+
+
+def can_resample(source: str, target: str) -> bool:
+    """True if bars of `source` aggregate exactly into `target` buckets"""
+    if source not in INTERVAL_NS or (target not in INTERVAL_NS and target not in CALENDAR_NS):
+        return False
+    if target in CALENDAR_NS:
+        return DAY_NS % INTERVAL_NS[source] == 0
+    return INTERVAL_NS[target] % INTERVAL_NS[source] == 0 and INTERVAL_NS[target] >= INTERVAL_NS[source]
+
+
+def bucket_starts(ts_ns: np.ndarray, interval: str, tz: str = "UTC") -> np.ndarray:
+    """Bucket start (int64 ns, UTC) of every timestamp (int64 ns, UTC)"""
+    length = interval_length(interval)
+    if interval not in CALENDAR_NS and length < DAY_NS:
+        return ts_ns - ts_ns % length
+
+    # Day and longer: cut on the local calendar, then label in UTC
+    local = ts_ns if tz == "UTC" else _to_local(ts_ns, tz)
+    days = local // DAY_NS
+    if interval == "1wk":
+        # 1970-01-01 was a Thursday: shift so weeks start on Monday
+        days = (days + 3) // 7 * 7 - 3
+    elif interval == "1mo":
+        days = days.astype("datetime64[D]").astype("datetime64[M]").astype("datetime64[D]").astype(np.int64)
+    starts = days * DAY_NS
+    return starts if tz == "UTC" else _from_local(starts, tz)
+
+
+def _to_local(ts_ns: np.ndarray, tz: str) -> np.ndarray:
+    index = pd.DatetimeIndex(ts_ns.view("datetime64[ns]")).tz_localize("UTC").tz_convert(tz)
+    return index.tz_localize(None).asi8
+
+
+def _from_local(local_ns: np.ndarray, tz: str) -> np.ndarray:
+    """Local wall-clock bucket starts back to UTC (only the distinct ones are converted)"""
+    unique, inverse = np.unique(local_ns, return_inverse=True)
+    index = pd.DatetimeIndex(unique.view("datetime64[ns]"))
+    utc = index.tz_localize(tz, ambiguous=False, nonexistent="shift_forward").tz_convert("UTC")
+    return utc.asi8[inverse]
+
+
+def resample_bars(bars: pd.DataFrame, interval: str, tz: str = "UTC") -> pd.DataFrame:
+    """
+    Aggregate long-format bars into `interval` buckets: first open, max high,
+    min low, last close, summed volume per (bucket, symbol). Buckets of 1d
+    and longer follow the calendar of `tz`.
+    """
+    missing = [col for col in ["ts", "symbol", "close"] if col not in bars.columns]
+    if missing:
+        raise ValueError(f"Bars are missing columns: {missing}")
+    interval_length(interval)
+
+    close = bars["close"].to_numpy(dtype=np.float64, na_value=np.nan)
+    traded = np.isfinite(close)
+    index = pd.DatetimeIndex(bars["ts"])
+    ts_ns = (index.tz_localize("UTC") if index.tz is None else index).as_unit("ns").asi8
+    symbols = bars["symbol"]
+    if isinstance(symbols.dtype, pd.CategoricalDtype):
+        codes, categories = symbols.cat.codes.to_numpy(), symbols.cat.categories
+    else:
+        codes, categories = pd.factorize(symbols, sort=True)
+
+    keep = np.flatnonzero(traded)
+    if len(keep) < len(close):
+        ts_ns, codes = ts_ns[keep], codes[keep]
+    buckets = bucket_starts(ts_ns, interval, tz)
+
+    # Group rows by (symbol, bucket), in time order within each group. Buckets
+    # follow ts, so time-ordered input only needs a stable sort by symbol
+    in_time_order = bool((np.diff(ts_ns) >= 0).all())
+    if in_time_order and (len(codes) == 0 or (codes == codes[0]).all()):
+        order = keep
+    else:
+        sort = np.argsort(codes, kind="stable") if in_time_order else np.lexsort((ts_ns, buckets, codes))
+        order, codes, buckets = keep[sort], codes[sort], buckets[sort]
+    changed = np.empty(len(order), dtype=bool)
+    changed[:1] = True
+    changed[1:] = (codes[1:] != codes[:-1]) | (buckets[1:] != buckets[:-1])
+    starts = np.flatnonzero(changed)
+    ends = np.append(starts[1:], len(order)) - 1 if len(starts) else starts
+
+    def column(field: str) -> np.ndarray:
+        return bars[field].to_numpy(dtype=np.float64, na_value=np.nan)
+
+    # open/close only need one row per group; high/low/volume are gathered
+    # into group order once and reduced
+    out = {"ts": buckets[starts], "symbol": codes[starts]}
+    reduce = {"high": np.fmax, "low": np.fmin, "volume": np.add}
+    for field in FIELDS:
+        if field not in bars.columns:
+            continue
+        if field in ("open", "close"):
+            out[field] = column(field)[order[starts if field == "open" else ends]]
+        elif not len(starts):
+            out[field] = np.empty(0)
+        else:
+            values = column(field)[order]
+            out[field] = reduce[field].reduceat(np.nan_to_num(values) if field == "volume" else values, starts)
+
+    # Back to the (ts, symbol) order of the contract
+    final = np.lexsort((out["symbol"], out["ts"]))
+    frame = {
+        "ts": pd.DatetimeIndex(out["ts"][final].view("datetime64[ns]")).tz_localize("UTC"),
+        "symbol": pd.Categorical.from_codes(out["symbol"][final], categories=categories),
+    }
+    for field in FIELDS:
+        if field in out:
+            # As a Series so extension dtypes of the input (e.g. Float64) cast too
+            frame[field] = pd.Series(out[field][final]).astype(bars[field].dtype)
+    return pd.DataFrame(frame)
+
+
+def coarsest_source(available: list[str], target: str) -> Optional[str]:
+    """The coarsest of `available` intervals that aggregates exactly into target"""
+    candidates = [interval for interval in available if can_resample(interval, target)]
+    return max(candidates, key=interval_length) if candidates else None
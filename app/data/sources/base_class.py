@@ -6,17 +6,37 @@ Base class for data sources
 This script is responsible for:
 - Defining the base class for data sources
 - Defining the interface for data sources
+- Standardizing raw frames to the data contract schema (shared by every source)
 """
 
 from abc import ABC, abstractmethod
-from concurrent.futures import ProcessPoolExecutor
+import asyncio
+import threading
+from datetime import datetime
+from typing import Optional, Union
+import numpy as np
 import pandas as pd
+from app.core.instrument import instrumented, result_rows
+from .rate_limiter import RedisTokenBucket, TokenBucket
+
+## Standardized schema (docs/data_contract.md) ##
+
+BAR_COLUMNS = ["ts", "symbol", "open", "high", "low", "close", "volume"]
+PRICE_COLUMNS = ["open", "high", "low", "close"]
+# Raw column names (lowercased) tried for ts before falling back to the index
+TS_ALIASES = ["ts", "timestamp", "datetime", "date"]
+# pandas 2 copies in astype/set_axis unless told not to; pandas 3 (copy-on-write)
+# never copies there and deprecates the keyword
+NO_COPY = {"copy": False} if int(pd.__version__.split(".")[0]) < 3 else {}
 
 ## Custom Exceptions ##
 
 # Rate Limit Error for api calls that exceed the rate limit
 class RateLimitError(Exception):
-    pass
+    def __init__(self, message: str = "Rate limit exceeded", retry_after: Optional[float] = None):
+        super().__init__(message)
+        # Seconds the caller should wait before retrying (if known)
+        self.retry_after = retry_after
 
 # Invalid Symbol Error for api calls that receive an invalid symbol
 class InvalidSymbolError(Exception):
@@ -34,7 +54,16 @@ class DataSource(ABC):
         self.api_key = api_key
         self.kwargs = kwargs
         self.request_count = 0
-        self.last_request = None
+        self.last_request: Optional[datetime] = None
+        # Token bucket driven by check_rate_limit (None means unlimited); a
+        # RedisTokenBucket replaces it when the catalog shares limits through Redis
+        self.rate_limiter: Union[TokenBucket, RedisTokenBucket] = TokenBucket(
+            rate=kwargs.get("requests_per_second", self.default_requests_per_second),
+            capacity=kwargs.get("burst"),
+        )
+        self._request_lock = threading.Lock()
+        # OHLC dtype of standardized frames (float32 halves memory; volume stays float64)
+        self.price_dtype = np.dtype(kwargs.get("price_dtype", np.float64))
 
     ## Properties ##
 
@@ -49,6 +78,11 @@ class DataSource(ABC):
     @property
     def supported_intervals(self) -> list[str]:
         return ["1m", "5m", "15m", "30m", "1h", "4h", "1d"]
+
+    @property
+    def default_requests_per_second(self) -> Optional[float]:
+        """Default token bucket rate; None means no client-side limit"""
+        return None
     
     ## Methods ##
 
@@ -58,15 +92,66 @@ class DataSource(ABC):
         raise NotImplementedError("validate_symbol method not implemented")
     
     def check_rate_limit(self) -> bool:
-        """Check if the data source is rate limited"""
-        # This will be implemented in the child class
-        raise NotImplementedError("check_rate_limit method not implemented")
-    
-    def _standardize_data(self, raw_data) -> pd.DataFrame:
-        """Convert raw data to a standardized format of a DataFrame"""
-        # This will be implemented in the child class
-        raise NotImplementedError("_standardize_data method not implemented")
+        """Take a token from the rate limiter or raise RateLimitError"""
+        if not self.rate_limiter.try_acquire():
+            raise RateLimitError(
+                f"{self.name} rate limit reached",
+                retry_after=self.rate_limiter.wait_time(),
+            )
+        return True
+
+    async def fetch_data_async(self, symbol: str, period="1y", interval="1d", start=None) -> pd.DataFrame:
+        """
+        Async fetch_data for the paper-trading runtime.
+        Sources with a native async client override this; by default the
+        blocking call runs on a worker thread so the event loop keeps going.
+        """
+        return await asyncio.to_thread(self.fetch_data, symbol, period, interval, start)
+
+    def _record_request(self) -> None:
+        """Update request tracking (safe to call from worker threads)"""
+        with self._request_lock:
+            self.request_count += 1
+            self.last_request = datetime.now()
     
+    @instrumented("standardize_data", rows=result_rows)
+    def _standardize_data(self, raw_data: pd.DataFrame, symbol: str) -> pd.DataFrame:
+        """
+        Raw OHLCV frame -> contract bars [ts, symbol, open, high, low, close, volume]
+
+        One pass with no intermediate frames: columns are matched
+        case-insensitively and wrapped as they are (no copy when the dtype
+        already matches; on pandas 2, without copy-on-write, the result then
+        shares the raw frame's buffers), ts comes from a
+        ts/timestamp/datetime/date column or else the index and is converted
+        to UTC, and symbol is a single category. Missing prices are NaN (validation rejects them), missing
+        volume is 0. The result concatenates without dtype upcasts and maps
+        straight onto the bar store's Arrow schema.
+        """
+        columns = {str(col).lower(): col for col in raw_data.columns}
+        rows = pd.RangeIndex(len(raw_data))
+        ts_col = next((columns[name] for name in TS_ALIASES if name in columns), None)
+        ts = pd.DatetimeIndex(raw_data.index if ts_col is None else raw_data[ts_col])
+        ts = (ts.tz_localize("UTC") if ts.tz is None else ts.tz_convert("UTC")).as_unit("ns")
+
+        def column(name: str, dtype, fill: float) -> pd.Series:
+            if name not in columns:
+                return pd.Series(np.full(len(rows), fill, dtype=dtype), index=rows)
+            # NO_COPY is {} on pandas 3, where copy= is deprecated, so it is splatted, not passed as a bool
+            series = raw_data[columns[name]].astype(dtype, **NO_COPY)  # type: ignore[call-overload]
+            return series.set_axis(rows, **NO_COPY)
+
+        data = {
+            "ts": pd.Series(ts, index=rows),
+            "symbol": pd.Series(pd.Categorical.from_codes(np.zeros(len(rows), dtype=np.int8),
+                                                          categories=pd.Index([symbol])),
+                                index=rows),
+        }
+        for name in PRICE_COLUMNS:
+            data[name] = column(name, self.price_dtype, np.nan)
+        data["volume"] = column("volume", np.float64, 0.0)
+        return pd.DataFrame(data, copy=False)
+
     def get_rate_limit_info(self) -> dict:
         """Get current rate limit informaiton"""
         return {
@@ -77,8 +162,8 @@ class DataSource(ABC):
     ## Abstract Methods ##
 
     @abstractmethod
-    def fetch_data(self, symbol: str, period = "1y", interval = "1d") -> pd.DataFrame:
-        """Fetch data for a given symbol and date range"""
+    def fetch_data(self, symbol: str, period = "1y", interval = "1d", start = None) -> pd.DataFrame:
+        """Fetch data for a given symbol and date range (from `start` onwards if given, else `period`)"""
         pass
     
     @abstractmethod
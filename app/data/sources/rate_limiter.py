@@ -0,0 +1,116 @@
+"""
+Token bucket rate limiter
+
+---------------------------
+
+This script is responsible for:
+- Limiting how fast a data source can be called
+- Allowing short bursts up to the bucket capacity
+- Telling callers how long to wait for the next token
+- Sharing one bucket across processes/containers through Redis
+  (RedisTokenBucket), so a per-source limit holds for the whole fleet
+"""
+
+import threading
+import time
+from typing import Optional
+
+
+class TokenBucket:
+
+    def __init__(self, rate: Optional[float] = None, capacity: Optional[float] = None):
+        # rate: tokens added per second (None means unlimited)
+        # capacity: maximum burst size (defaults to one second worth of tokens)
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate or 1.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    @property
+    def unlimited(self) -> bool:
+        return self.rate is None
+
+    def _refill(self, now: float, rate: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * rate)
+        self.updated = now
+
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        """Take tokens if available without blocking"""
+        rate = self.rate
+        if rate is None:
+            return True
+        with self._lock:
+            self._refill(time.monotonic(), rate)
+            if self.tokens >= tokens:
+                self.tokens -= tokens
+                return True
+            return False
+
+    def wait_time(self, tokens: float = 1.0) -> float:
+        """Seconds until `tokens` would be available"""
+        rate = self.rate
+        if rate is None:
+            return 0.0
+        with self._lock:
+            self._refill(time.monotonic(), rate)
+            return max(0.0, (tokens - self.tokens) / rate)
+
+
+# Refill-and-take in one atomic step on the Redis server, using the server clock
+# so every worker sees the same time. Returns the seconds to wait (0 = granted).
+_TAKE_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local requested = tonumber(ARGV[3])
+local consume = ARGV[4] == '1'
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1]) or capacity
+local updated = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+local wait = 0
+if tokens >= requested then
+  if consume then tokens = tokens - requested end
+else
+  wait = (requested - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return tostring(wait)
+"""
+
+
+class RedisTokenBucket:
+    """
+    TokenBucket with its state in a Redis hash, shared by every process
+    that uses the same key. Same interface as TokenBucket, so it can replace
+    a source's rate_limiter directly.
+    """
+
+    def __init__(self, client, key: str, rate: Optional[float] = None, capacity: Optional[float] = None):
+        self.client = client
+        self.key = key
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate or 1.0)
+        self._take = client.register_script(_TAKE_SCRIPT) if rate is not None else None
+
+    @property
+    def unlimited(self) -> bool:
+        return self.rate is None
+
+    def _call(self, tokens: float, consume: bool) -> float:
+        assert self._take is not None, "unlimited buckets never call Redis"
+        wait = self._take(keys=[self.key], args=[self.rate, self.capacity, tokens, int(consume)])
+        return float(wait)
+
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        if self.unlimited:
+            return True
+        return self._call(tokens, consume=True) == 0.0
+
+    def wait_time(self, tokens: float = 1.0) -> float:
+        if self.unlimited:
+            return 0.0
+        return self._call(tokens, consume=False)
@@ -0,0 +1,50 @@
+"""
+Data source registry
+
+---------------------------
+
+This script is responsible for:
+- Mapping source names to their classes without importing them
+- Resolving a name to a DataSource instance on first use, so a process
+  only imports the client libraries (yfinance, ...) of sources it calls
+- Picking up third-party sources from the "trading_platform.data_sources"
+  entry point group
+"""
+
+import importlib
+from importlib.metadata import entry_points
+from typing import Dict
+
+# name -> "module:Class"
+SOURCES: Dict[str, str] = {
+    "yahoo": "app.data.sources.yahoo_source:YahooSource",
+}
+
+ENTRY_POINT_GROUP = "trading_platform.data_sources"
+
+
+def register_source(name: str, target: str) -> None:
+    """Register a source class by its "module:Class" path"""
+    if ":" not in target:
+        raise ValueError(f"Source target must look like 'module:Class', got {target}")
+    SOURCES[name] = target
+
+
+def available_sources() -> list[str]:
+    return sorted(set(SOURCES) | {ep.name for ep in entry_points(group=ENTRY_POINT_GROUP)})
+
+
+def load_source_class(name: str) -> type:
+    target = SOURCES.get(name)
+    if target is None:
+        found = [ep for ep in entry_points(group=ENTRY_POINT_GROUP) if ep.name == name]
+        if not found:
+            raise ValueError(f"Unknown data source: {name} (available: {available_sources()})")
+        return found[0].load()
+    module, cls = target.split(":", 1)
+    return getattr(importlib.import_module(module), cls)
+
+
+def create_source(name: str, **kwargs):
+    """Import and instantiate the source registered as name"""
+    return load_source_class(name)(**kwargs)
@@ -3,15 +3,22 @@ Yahoo Finance Data Source
 
 This script is responsible for:
 - Fetching data from Yahoo Finance
-- Standardizing the Yahoo Finance data to a common format
+- Standardizing the Yahoo Finance data to the contract schema (via DataSource._standardize_data)
 - Handling Yahoo Finance specific errors (such as rate limits etc.)'
 """
 
-import yfinance as yf
 import pandas as pd
-from datetime import datetime
+from typing import Optional
+from app.core.instrument import instrumented, result_rows
 from .base_class import DataSource, RateLimitError, InvalidSymbolError, DataSourceError
 
+
+def _is_rate_limited(error: Exception) -> bool:
+    """Spot an HTTP 429 from yfinance releases without YFRateLimitError"""
+    message = str(error).lower()
+    return "429" in message or "too many requests" in message or "rate limit" in message
+
+
 class YahooSource(DataSource):
 
     def __init__(self, api_key: str = None, **kwargs):
@@ -33,6 +40,11 @@ class YahooSource(DataSource):
     @property
     def supported_intervals(self) -> list[str]:
         return ["1m", "5m", "15m", "30m", "1h", "4h", "1d", "5d", "1wk", "1mo"]
+
+    @property
+    def default_requests_per_second(self) -> Optional[float]:
+        # Yahoo has no published limit but throttles bursts; stay well below it
+        return 2.0
     
     ## Methods ##
 
@@ -45,37 +57,8 @@ class YahooSource(DataSource):
             raise InvalidSymbolError("Symbol is not a valid string")
         return True
 
-    def check_rate_limit(self) -> bool:
-        """Check if the data source is rate limited"""
-        # Yahoo finance doesn't have a rate limit
-        return True
-    
-    def _standardize_data(self, raw_data) -> pd.DataFrame:
-        """Standardize the raw data to a common format"""
-        if raw_data.empty:
-            return pd.DataFrame()
-        
-        # Rename the columns to a standard format
-        data = raw_data.copy()
-        data.columns = [col.lower() for col in data.columns]
-
-        # Ensure required columns are present
-        required_columns = ['open', 'high', 'low', 'close', 'volume']
-        for col in required_columns:
-            if col not in data.columns:
-                data[col] = 0
-
-        # Convert to datetime if not already
-        data = data.reset_index()
-        if 'date' in data.columns:
-            data = data.rename(columns={"date": "timestamp"})
-        elif 'index' in data.columns:
-            data = data.rename(columns={"index": "timestamp"})
-
-        return data[['timestamp', 'open', 'high', 'low', 'close', 'volume']]
-    
-
-    def fetch_data(self, symbol: str, period = "1y", interval = "1d") -> pd.DataFrame:
+    @instrumented("fetch_data", rows=result_rows)
+    def fetch_data(self, symbol: str, period = "1y", interval = "1d", start = None) -> pd.DataFrame:
         """Fetch data for a given symbol and date range"""
         try:
 
@@ -84,28 +67,46 @@ class YahooSource(DataSource):
             self.check_rate_limit()
 
             # Fetch raw data
-            raw_data = self._fetch_raw_data(symbol, period, interval)
+            raw_data = self._fetch_raw_data(symbol, period, interval, start)
 
-            # Standardize the data
-            standardized_data = self._standardize_data(raw_data)
+            # Standardize the data (shared DataSource path: UTC ts, categorical symbol)
+            standardized_data = self._standardize_data(raw_data, symbol)
 
             # Update request tracking
-            self.request_count += 1
-            self.last_request = datetime.now()
+            self._record_request()
 
             return standardized_data
         
+        except RateLimitError:
+            # Let callers back off and retry instead of treating it as a failure
+            raise
         except Exception as e:
             raise DataSourceError(f"Error fetching data from Yahoo Finance: {str(e)}")
     
     
-    def _fetch_raw_data(self, symbol: str, period = str, interval = str) -> pd.DataFrame:
+    def _fetch_raw_data(self, symbol: str, period = str, interval = str, start = None) -> pd.DataFrame:
         """Fetch raw data for a given symbol and date range"""
+        # Imported here so registering the source (or loading this module) stays cheap
+        import yfinance as yf
+        try:
+            from yfinance.exceptions import YFRateLimitError
+            rate_limit_errors: tuple[type[Exception], ...] = (YFRateLimitError,)
+        except ImportError:
+            # Older yfinance releases raise a plain exception on HTTP 429
+            rate_limit_errors = ()
         try:
             # Download data from Yahoo Finance
             historic  = yf.Ticker(symbol)
-            data = historic.history(period=period, interval=interval)
+            if start is not None:
+                # Incremental refresh: only bars from `start` onwards
+                data = historic.history(start=start, interval=interval)
+            else:
+                data = historic.history(period=period, interval=interval)
             return data
 
+        except rate_limit_errors as e:
+            raise RateLimitError(f"Yahoo Finance rate limit: {str(e)}")
         except Exception as e:
+            if _is_rate_limited(e):
+                raise RateLimitError(f"Yahoo Finance rate limit: {str(e)}")
             raise DataSourceError(f"Error fetching raw data from Yahoo Finance: {str(e)}")
\ No newline at end of file
@@ -0,0 +1,288 @@
+"""
+Bar store
+----------------
+Responsible for:
+- Storing bars as a partitioned Parquet dataset instead of one big file
+- Appending new bars without rewriting existing files
+- Reading back only the partitions, row groups and columns a query needs
+- Serving coarser intervals than the ones stored by resampling the finest
+  stored interval (resample.py), with the aggregates cached on disk
+
+Layout (hive-style partitions):
+- <root>/interval=<interval>/symbol=<symbol>/year=<year>/part-<ns>-<id>.parquet
+- Every write adds new part files; compact() merges a partition's parts.
+- Part names sort by write time, so on read the latest copy of a
+  duplicated (ts, symbol) wins.
+
+Derived intervals:
+- read(interval=X) with no interval=X partitions aggregates the coarsest
+  stored interval that divides X (e.g. 1m -> 5m, 1h, 1d, 1wk).
+- Each symbol's aggregate is cached in
+  <root>/_aggregates/tz=<tz>/interval=<X>/<symbol>.parquet, tagged with a
+  fingerprint of the base part files it was built from. Any new part file
+  (an append, a compaction) changes the fingerprint and the aggregate is
+  rebuilt on the next read.
+- 1wk and 1mo are built from the cached 1d aggregate, not from the base bars.
+
+Schema:
+- ts: timestamp[ns, UTC]
+- symbol: categorical (taken from the partition path, not stored in files)
+- open, high, low, close: float32
+- volume: float64
+"""
+
+import hashlib
+import logging
+import os
+import time
+import uuid
+from pathlib import Path
+from typing import Iterable, List, Optional, Union
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from .partitions import latest_copies, part_files, partition_year
+from .resample import CALENDAR_NS, DAY_NS, can_resample, coarsest_source, interval_length, resample_bars
+
+PRICE_COLUMNS = ["open", "high", "low", "close"]
+BAR_COLUMNS = ["ts", "symbol"] + PRICE_COLUMNS + ["volume"]
+
+# Schema of the part files (partition keys live in the path)
+FILE_SCHEMA = pa.schema([
+    ("ts", pa.timestamp("ns", tz="UTC")),
+    ("open", pa.float32()),
+    ("high", pa.float32()),
+    ("low", pa.float32()),
+    ("close", pa.float32()),
+    ("volume", pa.float64()),
+])
+
+PARTITIONING = ds.partitioning(
+    pa.schema([("interval", pa.string()), ("symbol", pa.string()), ("year", pa.int32())]),
+    flavor="hive",
+)
+
+# ~1 year of minute bars per row group keeps ts statistics selective for intraday data
+ROW_GROUP_SIZE = 128 * 1024
+
+AGGREGATES_DIR = "_aggregates"
+
+# Parquet schema metadata key holding an aggregate's base-part fingerprint
+FINGERPRINT_KEY = b"base_parts"
+
+
+class BarStore:
+
+    def __init__(self, root: Union[str, Path] = "data/bars"):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    ## Write path ##
+
+    def write(self, bars: pd.DataFrame, interval: str = "1d") -> int:
+        """
+        Append long-format bars [ts, symbol, open, high, low, close, volume].
+        Returns the number of rows written.
+        """
+        missing = [col for col in BAR_COLUMNS if col not in bars.columns]
+        if missing:
+            raise ValueError(f"Bars are missing columns: {missing}")
+        if bars.empty:
+            return 0
+
+        ts = pd.to_datetime(bars["ts"], utc=True)
+        frame = bars.assign(ts=ts, year=ts.dt.year)
+        written = 0
+        for (symbol, year), part in frame.groupby(["symbol", "year"], sort=False, observed=True):
+            self._write_part(part.sort_values("ts"), interval, str(symbol), int(str(year)))
+            written += len(part)
+        return written
+
+    def _write_part(self, part: pd.DataFrame, interval: str, symbol: str, year: int) -> Path:
+        table = pa.Table.from_pandas(part[FILE_SCHEMA.names], schema=FILE_SCHEMA, preserve_index=False)
+        directory = self._partition_dir(interval, symbol, year)
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f"part-{time.time_ns()}-{uuid.uuid4().hex[:8]}.parquet"
+        pq.write_table(table, path, row_group_size=ROW_GROUP_SIZE)
+        return path
+
+    def _partition_dir(self, interval: str, symbol: str, year: int) -> Path:
+        return self.root / f"interval={interval}" / f"symbol={symbol}" / f"year={year}"
+
+    def compact(self, interval: str, symbol: str, year: int) -> None:
+        """Merge a partition's part files into one, dropping superseded duplicates"""
+        directory = self._partition_dir(interval, symbol, year)
+        parts = part_files(directory)
+        if len(parts) <= 1:
+            return
+        data = self.read([symbol], start=f"{year}-01-01", end=f"{year}-12-31 23:59:59.999999999", interval=interval)
+        self._write_part(data, interval, symbol, year)
+        for path in parts:
+            path.unlink()
+        logging.info(f"Compacted {len(parts)} parts in {directory}")
+
+    ## Read path ##
+
+    def intervals(self) -> List[str]:
+        """Intervals with stored partitions"""
+        return sorted(p.name.split("=", 1)[1] for p in self.root.glob("interval=*") if p.is_dir())
+
+    def years(self, symbols: Optional[List[str]] = None, interval: str = "1d") -> List[int]:
+        """Years with stored partitions (of the base interval, for a derived interval)"""
+        if not (self.root / f"interval={interval}").exists():
+            interval = coarsest_source(self.intervals(), interval) or interval
+        symbols = self.list_symbols(interval) if symbols is None else symbols
+        found = set()
+        for symbol in symbols:
+            for year_dir in (self.root / f"interval={interval}" / f"symbol={symbol}").glob("year=*"):
+                year = partition_year(year_dir)
+                if year is not None:
+                    found.add(year)
+        return sorted(found)
+
+    def list_symbols(self, interval: str = "1d") -> List[str]:
+        base = self.root / f"interval={interval}"
+        if not base.exists():
+            return []
+        return sorted(p.name.split("=", 1)[1] for p in base.iterdir() if p.name.startswith("symbol="))
+
+    def _files(self, interval: str, symbols: Iterable[str], start: Optional[pd.Timestamp],
+               end: Optional[pd.Timestamp]) -> List[str]:
+        """Prune partitions from the path layout alone, without scanning the dataset"""
+        files: List[str] = []
+        for symbol in symbols:
+            symbol_dir = self.root / f"interval={interval}" / f"symbol={symbol}"
+            if not symbol_dir.exists():
+                continue
+            for year_dir in symbol_dir.iterdir():
+                year = partition_year(year_dir)
+                if year is None:
+                    continue
+                if start is not None and year < start.year:
+                    continue
+                if end is not None and year > end.year:
+                    continue
+                files.extend(str(p) for p in part_files(year_dir))
+        return files
+
+    def read(self, symbols: Optional[List[str]] = None, start=None, end=None,
+             columns: Optional[List[str]] = None, interval: str = "1d") -> pd.DataFrame:
+        """
+        Load bars for symbols within [start, end] (inclusive, UTC).
+        Symbol and year filters prune partitions by path; the ts filter is
+        pushed down to Parquet row-group statistics; only `columns` are read.
+        """
+        if not (self.root / f"interval={interval}").exists():
+            base = coarsest_source(self.intervals(), interval)
+            if base is not None:
+                return self.read_resampled(symbols, start, end, columns, interval, base)
+
+        start, end = _to_utc(start), _to_utc(end)
+        symbols = self.list_symbols(interval) if symbols is None else list(dict.fromkeys(symbols))
+        columns = _check_columns(columns)
+
+        files = self._files(interval, symbols, start, end)
+        if not files:
+            return self._empty(columns)
+
+        dataset = ds.dataset(files, schema=FILE_SCHEMA.append(pa.field("symbol", pa.string())),
+                             format="parquet", partitioning=PARTITIONING, partition_base_dir=str(self.root))
+        predicate = None
+        if start is not None:
+            predicate = ds.field("ts") >= pa.scalar(start.value, pa.timestamp("ns", tz="UTC"))
+        if end is not None:
+            upper = ds.field("ts") <= pa.scalar(end.value, pa.timestamp("ns", tz="UTC"))
+            predicate = upper if predicate is None else predicate & upper
+
+        table = dataset.to_table(columns=columns, filter=predicate)
+        table = table.set_column(table.schema.get_field_index("symbol"), "symbol",
+                                 pc.dictionary_encode(table.column("symbol")))
+        frame = table.to_pandas()
+
+        frame = latest_copies(frame)
+        return frame.sort_values(["ts", "symbol"], ignore_index=True)[columns]
+
+    ## Derived intervals ##
+
+    def read_resampled(self, symbols: Optional[List[str]] = None, start=None, end=None,
+                       columns: Optional[List[str]] = None, interval: str = "1d",
+                       base_interval: Optional[str] = None, tz: str = "UTC") -> pd.DataFrame:
+        """
+        Bars of `interval` aggregated from the stored base_interval (default:
+        the coarsest stored interval that divides it). Buckets of 1d and
+        longer follow the calendar of tz. Served from the per-symbol
+        aggregate cache while the base parts are unchanged.
+        """
+        base_interval = base_interval or coarsest_source(self.intervals(), interval)
+        if base_interval is None or not can_resample(base_interval, interval):
+            raise ValueError(f"No stored interval can be resampled to {interval} (stored: {self.intervals()})")
+        start, end = _to_utc(start), _to_utc(end)
+        symbols = self.list_symbols(base_interval) if symbols is None else list(dict.fromkeys(symbols))
+        columns = _check_columns(columns)
+
+        frames = []
+        for symbol in symbols:
+            data = self._aggregate(symbol, interval, base_interval, tz)
+            if start is not None:
+                data = data[data["ts"] >= start]
+            if end is not None:
+                data = data[data["ts"] <= end]
+            if len(data):
+                frames.append(data.assign(symbol=symbol))
+        if not frames:
+            return self._empty(columns)
+
+        frame = pd.concat(frames, ignore_index=True)
+        frame["symbol"] = frame["symbol"].astype(pd.CategoricalDtype(sorted(frame["symbol"].unique())))
+        return frame.sort_values(["ts", "symbol"], ignore_index=True)[columns]
+
+    def _aggregate(self, symbol: str, interval: str, base_interval: str, tz: str) -> pd.DataFrame:
+        """One symbol's full history at interval [ts, open, high, low, close, volume], cached"""
+        parts = self._files(base_interval, [symbol], None, None)
+        fingerprint = hashlib.sha1("\n".join(parts).encode()).hexdigest().encode()
+        path = self.root / AGGREGATES_DIR / f"tz={tz.replace('/', '_')}" / f"interval={interval}" / f"{symbol}.parquet"
+        if path.exists() and (pq.read_schema(path).metadata or {}).get(FINGERPRINT_KEY) == fingerprint:
+            return pq.read_table(path).to_pandas()
+
+        coarse = interval in CALENDAR_NS or interval_length(interval) > DAY_NS
+        if coarse and interval_length(base_interval) < DAY_NS and can_resample(base_interval, "1d"):
+            # Weeks and months from the (cached) daily bars instead of the intraday ones
+            finer = self._aggregate(symbol, "1d", base_interval, tz).assign(symbol=symbol)
+        else:
+            finer = self.read([symbol], columns=FILE_SCHEMA.names, interval=base_interval)
+        data = resample_bars(finer, interval, tz)[FILE_SCHEMA.names]
+
+        table = pa.Table.from_pandas(data, schema=FILE_SCHEMA, preserve_index=False)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{uuid.uuid4().hex[:8]}.tmp")
+        pq.write_table(table.replace_schema_metadata({FINGERPRINT_KEY: fingerprint}), tmp,
+                       row_group_size=ROW_GROUP_SIZE)
+        # Concurrent readers may build the same aggregate; the last rename wins and both are identical
+        os.replace(tmp, path)
+        logging.debug(f"Built {interval} aggregate for {symbol} from {len(parts)} {base_interval} parts")
+        return data
+
+    @staticmethod
+    def _empty(columns: List[str]) -> pd.DataFrame:
+        table = FILE_SCHEMA.append(pa.field("symbol", pa.dictionary(pa.int32(), pa.string()))).empty_table()
+        return table.to_pandas()[columns]
+
+
+def _check_columns(columns: Optional[List[str]]) -> List[str]:
+    columns = BAR_COLUMNS if columns is None else list(dict.fromkeys(["ts", "symbol"] + list(columns)))
+    unknown = [col for col in columns if col not in BAR_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown bar columns: {unknown}")
+    return columns
+
+
+def _to_utc(value) -> Optional[pd.Timestamp]:
+    """Parse a bound as a UTC timestamp (naive values are taken as UTC)"""
+    if value is None:
+        return None
+    ts = pd.Timestamp(value)
+    return ts.tz_localize("UTC") if ts.tzinfo is None else ts.tz_convert("UTC")
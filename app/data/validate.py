@@ -8,4 +8,249 @@ Responsbile for:
 - Checking column presence: open, high, low, close, volume
 - Checking for missing or negative values
 - Checking that the first timestamp is the start date and the last timestamp is the most recent market day
-"""
\ No newline at end of file
+
+How:
+- Every check is a vectorized NumPy pass over the whole frame; nothing
+  raises on the first failure. The result is a ValidationReport with a
+  count and the offending row indices (capped) per check.
+- BarValidator.update() can be fed chunk by chunk (validate_dataset reads a
+  Parquet file in record batches, or a bar store one (symbol, year)
+  partition at a time), carrying only the first/last ts per symbol between
+  chunks so memory stays bounded.
+- In chunked mode a duplicate or out-of-order row is caught against the
+  previous row of the same symbol; data stored sorted per symbol (as the
+  bar store writes it) is therefore checked exactly.
+- A bar store is validated one interval at a time, as BarStore.read sees
+  it: a partition's part files are merged with the later file winning on
+  (ts, symbol), so re-ingested bars are not reported as duplicates.
+"""
+
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from .partitions import latest_copies, part_files, partition_year
+
+REQUIRED_COLUMNS = ["ts", "symbol", "open", "high", "low", "close", "volume"]
+VALUE_COLUMNS = ["open", "high", "low", "close", "volume"]
+
+# Row-level checks, in report order
+ROW_CHECKS = ["duplicate_keys", "non_monotonic_ts", "missing_values", "all_null_rows", "negative_values"]
+
+
+@dataclass
+class CheckResult:
+    count: int = 0
+    rows: List[int] = field(default_factory=list)
+
+    def add(self, rows: np.ndarray, limit: int) -> None:
+        self.count += len(rows)
+        room = limit - len(self.rows)
+        if room > 0:
+            self.rows.extend(rows[:room].tolist())
+
+
+@dataclass
+class ValidationReport:
+    row_count: int = 0
+    missing_columns: List[str] = field(default_factory=list)
+    non_utc_ts: bool = False
+    checks: Dict[str, CheckResult] = field(default_factory=lambda: {name: CheckResult() for name in ROW_CHECKS})
+    # symbol -> (first_ts, last_ts) for symbols outside the expected date range
+    coverage_gaps: Dict[str, tuple] = field(default_factory=dict)
+
+    @property
+    def passed(self) -> bool:
+        return (
+            self.row_count > 0
+            and not self.missing_columns
+            and not self.non_utc_ts
+            and all(check.count == 0 for check in self.checks.values())
+            and not self.coverage_gaps
+        )
+
+    def summary(self) -> dict:
+        return {
+            "passed": self.passed,
+            "row_count": self.row_count,
+            "missing_columns": self.missing_columns,
+            "non_utc_ts": self.non_utc_ts,
+            **{name: check.count for name, check in self.checks.items()},
+            "coverage_gaps": len(self.coverage_gaps),
+        }
+
+
+class BarValidator:
+
+    def __init__(self, start_date=None, end_date=None, tolerance_days: int = 4, max_rows_per_check: int = 1000):
+        # Coverage bounds; None skips that side, "latest" means the most recent market day
+        self.start = _utc(start_date)
+        self.end = _latest_market_day() if end_date == "latest" else _utc(end_date)
+        self.tolerance = pd.Timedelta(days=tolerance_days)
+        self.max_rows = max_rows_per_check
+        self.report = ValidationReport()
+        # Carried between chunks (int64 ns per symbol): earliest, latest and last-seen ts
+        self._first: Dict[str, int] = {}
+        self._max: Dict[str, int] = {}
+        self._last: Dict[str, int] = {}
+
+    def update(self, bars: pd.DataFrame) -> "BarValidator":
+        """Validate one chunk; row indices continue from the previous chunks"""
+        report = self.report
+        offset = report.row_count
+        report.row_count += len(bars)
+
+        missing = [col for col in REQUIRED_COLUMNS if col not in bars.columns]
+        for col in missing:
+            if col not in report.missing_columns:
+                report.missing_columns.append(col)
+        if len(bars) == 0:
+            return self
+
+        present = [col for col in VALUE_COLUMNS if col in bars.columns]
+        if present:
+            values = np.column_stack([bars[col].to_numpy(dtype=np.float64, na_value=np.nan) for col in present])
+            nan = np.isnan(values)
+            self._add("missing_values", np.flatnonzero(nan.any(axis=1)), offset)
+            self._add("all_null_rows", np.flatnonzero(nan.all(axis=1)), offset)
+            with np.errstate(invalid="ignore"):
+                self._add("negative_values", np.flatnonzero((values < 0).any(axis=1)), offset)
+
+        if "ts" in bars.columns and "symbol" in bars.columns:
+            self._check_keys(bars, offset)
+        return self
+
+    def _add(self, name: str, rows: np.ndarray, offset: int) -> None:
+        if len(rows):
+            self.report.checks[name].add(rows + offset, self.max_rows)
+
+    def _check_keys(self, bars: pd.DataFrame, offset: int) -> None:
+        ts_col = bars["ts"]
+        if not isinstance(ts_col.dtype, pd.DatetimeTZDtype) or str(ts_col.dt.tz) != "UTC":
+            self.report.non_utc_ts = True
+        ts = pd.DatetimeIndex(pd.to_datetime(ts_col, utc=True)).as_unit("ns").asi8
+        codes, uniques = pd.factorize(bars["symbol"])
+
+        # Rows grouped by symbol, original order kept within each symbol
+        order = np.argsort(codes, kind="stable")
+        sym, t = codes[order], ts[order]
+        same = sym[1:] == sym[:-1]
+        step = t[1:] - t[:-1]
+        self._add("non_monotonic_ts", order[1:][same & (step < 0)], offset)
+
+        # Duplicates: equal neighbours once sorted by (symbol, ts)
+        key_order = np.lexsort((ts, codes))
+        ks, kt = codes[key_order], ts[key_order]
+        self._add("duplicate_keys", key_order[1:][(ks[1:] == ks[:-1]) & (kt[1:] == kt[:-1])], offset)
+
+        # Boundaries against the previous chunk, plus the per-symbol carry
+        starts = np.flatnonzero(np.r_[True, ~same])
+        ends = np.r_[starts[1:] - 1, len(sym) - 1]
+        for code, start, end in zip(sym[starts].tolist(), starts.tolist(), ends.tolist()):
+            symbol = uniques[code]
+            previous = self._last.get(symbol)
+            if previous is not None:
+                if t[start] == previous:
+                    self._add("duplicate_keys", order[start:start + 1], offset)
+                elif t[start] < previous:
+                    self._add("non_monotonic_ts", order[start:start + 1], offset)
+            span = t[start:end + 1]
+            chunk_first, chunk_max = int(span.min()), int(span.max())
+            self._first[symbol] = min(self._first.get(symbol, chunk_first), chunk_first)
+            self._max[symbol] = max(self._max.get(symbol, chunk_max), chunk_max)
+            self._last[symbol] = int(t[end])
+
+    def finish(self) -> ValidationReport:
+        """Run the whole-dataset checks (date coverage) and return the report"""
+        gaps = {}
+        for symbol, first in self._first.items():
+            first_ts = pd.Timestamp(first, tz="UTC")
+            last_ts = pd.Timestamp(self._max[symbol], tz="UTC")
+            late_start = self.start is not None and first_ts > self.start + self.tolerance
+            stale = self.end is not None and last_ts < self.end - self.tolerance
+            if late_start or stale:
+                gaps[symbol] = (first_ts, last_ts)
+        self.report.coverage_gaps = gaps
+        return self.report
+
+
+def validate_bars(bars: pd.DataFrame, start_date=None, end_date=None, **kwargs) -> ValidationReport:
+    """Validate a whole bars frame in one vectorized pass"""
+    return BarValidator(start_date, end_date, **kwargs).update(bars).finish()
+
+
+def validate_dataset(path: str, start_date=None, end_date=None, chunk_size: int = 1_000_000,
+                     interval: Optional[str] = None, **kwargs) -> ValidationReport:
+    """
+    Validate a Parquet file, or one interval of a partitioned bar store,
+    chunk by chunk. `path` is a file, a store root (then `interval` picks
+    the interval=<X> partition; it may be omitted if only one is stored) or
+    an interval=<X> directory.
+    """
+    import pyarrow.dataset as ds
+
+    root = Path(path)
+    if root.is_dir() and not root.name.startswith("interval="):
+        stored = sorted(p.name.split("=", 1)[1] for p in root.glob("interval=*") if p.is_dir())
+        if interval is None and len(stored) > 1:
+            raise ValueError(f"{path} holds several intervals {stored}: pass interval=")
+        interval = interval or (stored[0] if stored else None)
+        if interval is not None:
+            root = root / f"interval={interval}"
+            if not root.is_dir():
+                raise ValueError(f"No interval={interval} partition under {path} (stored: {stored})")
+
+    validator = BarValidator(start_date, end_date, **kwargs)
+    if root.is_dir() and any(root.glob("symbol=*")):
+        for frame in _store_partitions(root):
+            for start in range(0, len(frame), chunk_size):
+                validator.update(frame.iloc[start:start + chunk_size])
+        return validator.finish()
+
+    dataset = ds.dataset(str(root), format="parquet", partitioning="hive")
+    columns = [col for col in REQUIRED_COLUMNS if col in dataset.schema.names]
+    for batch in dataset.to_batches(columns=columns, batch_size=chunk_size):
+        frame = batch.to_pandas()
+        if "symbol" in frame.columns:
+            frame["symbol"] = frame["symbol"].astype(str)
+        validator.update(frame)
+    return validator.finish()
+
+
+def _store_partitions(interval_dir: Path) -> Iterator[pd.DataFrame]:
+    """
+    One frame per (symbol, year) partition of a bar store interval, in
+    symbol then year order, with its part files merged the way
+    BarStore.read does
+    """
+    import pyarrow.parquet as pq
+
+    for symbol_dir in sorted(interval_dir.glob("symbol=*")):
+        symbol = symbol_dir.name.split("=", 1)[1]
+        years = []
+        for year_dir in symbol_dir.glob("year=*"):
+            year = partition_year(year_dir)
+            if year is not None:
+                years.append((year, year_dir))
+        for _, year_dir in sorted(years):
+            parts = part_files(year_dir)
+            if not parts:
+                continue
+            frame = pd.concat([pq.read_table(part).to_pandas() for part in parts], ignore_index=True)
+            frame["symbol"] = symbol
+            yield latest_copies(frame).sort_values("ts", kind="stable", ignore_index=True)
+
+
+def _utc(value) -> Optional[pd.Timestamp]:
+    if value is None:
+        return None
+    ts = pd.Timestamp(value)
+    return ts.tz_localize("UTC") if ts.tzinfo is None else ts.tz_convert("UTC")
+
+
+def _latest_market_day() -> pd.Timestamp:
+    """Most recent weekday strictly before today (UTC)"""
+    return (pd.Timestamp.now(tz="UTC").normalize() - pd.offsets.BDay(1))
@@ -0,0 +1,160 @@
+"""
+Performance Metrics
+-------------------
+Role:
+- Summarize a run's equity curve and trades for the performance report,
+  the sweep results table, the dashboard and the paper trader.
+
+Metrics (returns r_t = equity_t / equity_{t-1} - 1, periods_per_year = 252):
+- final_equity
+- total_return: final / base - 1 (base = initial equity, else the first point)
+- cagr: (final / base) ** (periods_per_year / n_returns) - 1
+- volatility: std(r, ddof=1) * sqrt(periods_per_year)
+- sharpe: mean(r) / std(r, ddof=1) * sqrt(periods_per_year)  (risk-free rate 0)
+- max_drawdown: min(equity / running peak - 1)  (<= 0)
+- turnover: traded value / average equity, per year
+- hit_rate: share of the bars with a non-zero return that made money
+
+Modes:
+- Batch: compute_metrics(equity, traded) takes one curve (n,) or many runs
+  of the same length stacked as (runs, n) and computes every metric with
+  array operations along the last axis.
+- Streaming: StreamingMetrics.update(equity, traded) is O(1) per bar:
+  Welford's algorithm for the return mean/variance, a running peak for
+  drawdown and running sums for the rest, so live views never rescan the
+  history. Both modes agree to floating-point tolerance.
+"""
+
+import math
+from typing import Optional
+
+import numpy as np
+
+METRIC_NAMES = ("final_equity", "total_return", "cagr", "volatility", "sharpe", "max_drawdown", "turnover",
+                "hit_rate")
+
+PERIODS_PER_YEAR = 252
+
+
+## Batch mode ##
+
+def compute_metrics(equity, traded=None, initial: Optional[float] = None,
+                    periods_per_year: int = PERIODS_PER_YEAR) -> dict:
+    """
+    All metrics for an equity curve (n,) or a stack of runs (runs, n).
+    traded is the traded value (sum of |qty * price|) per bar, same shape.
+    Values are floats for one curve and (runs,) arrays for a stack.
+    """
+    equity = np.asarray(equity, dtype=np.float64)
+    single = equity.ndim == 1
+    equity = np.atleast_2d(equity)
+    runs, n = equity.shape
+    traded = np.zeros_like(equity) if traded is None else np.atleast_2d(np.asarray(traded, dtype=np.float64))
+
+    if initial is not None:
+        levels = np.hstack([np.full((runs, 1), float(initial)), equity])
+    else:
+        levels = equity
+    n_returns = levels.shape[1] - 1
+    base = levels[:, 0] if levels.shape[1] else np.full(runs, np.nan)
+    final = equity[:, -1] if n else base
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns = levels[:, 1:] / levels[:, :-1] - 1
+        growth = final / base
+        years = n_returns / periods_per_year
+        cagr = np.where(growth > 0, growth ** (1 / years) - 1, np.nan) if years else np.full(runs, np.nan)
+        mean = returns.mean(axis=1) if n_returns else np.full(runs, np.nan)
+        std = returns.std(axis=1, ddof=1) if n_returns > 1 else np.full(runs, np.nan)
+        sharpe = mean / std * math.sqrt(periods_per_year)
+        peak = np.maximum.accumulate(levels, axis=1)
+        drawdown = (levels / peak - 1).min(axis=1) if levels.shape[1] else np.full(runs, np.nan)
+        turnover = traded.sum(axis=1) / equity.mean(axis=1) / years if years else np.full(runs, np.nan)
+        moved = (returns != 0).sum(axis=1)
+        hit_rate = (returns > 0).sum(axis=1) / moved
+
+    metrics = {
+        "final_equity": final,
+        "total_return": growth - 1,
+        "cagr": cagr,
+        "volatility": std * math.sqrt(periods_per_year),
+        "sharpe": np.where(std > 0, sharpe, np.nan),
+        "max_drawdown": drawdown,
+        "turnover": turnover,
+        "hit_rate": np.where(moved > 0, hit_rate, np.nan),
+    }
+    if single:
+        return {name: float(values[0]) for name, values in metrics.items()}
+    return metrics
+
+
+def traded_value_per_bar(trades_log, index_ns: np.ndarray) -> np.ndarray:
+    """Sum of |qty * price| per bar of index_ns (int64 ns), from a TradesLog"""
+    cols = trades_log.columns()
+    bar = np.searchsorted(index_ns, cols.ts)
+    return np.bincount(bar, weights=np.abs(cols.qty * cols.price), minlength=len(index_ns))[:len(index_ns)]
+
+
+def backtest_metrics(portfolio, trades_log, periods_per_year: int = PERIODS_PER_YEAR) -> dict:
+    """Metrics for a finished backtest from its Portfolio and TradesLog"""
+    ts, equity = portfolio.equity_curve
+    return compute_metrics(equity, traded_value_per_bar(trades_log, ts), portfolio.initial_cash, periods_per_year)
+
+
+## Streaming mode ##
+
+class StreamingMetrics:
+
+    def __init__(self, initial: Optional[float] = None, periods_per_year: int = PERIODS_PER_YEAR):
+        self.periods_per_year = periods_per_year
+        self.base = initial
+        self.last = initial
+        self.peak = initial if initial is not None else -math.inf
+        self.max_drawdown = 0.0 if initial is not None else math.nan
+        self.n_points = 0
+        self.equity_sum = 0.0
+        self.traded = 0.0
+        # Welford state over the returns
+        self.n_returns = 0
+        self._mean = 0.0
+        self._m2 = 0.0
+        self._up = 0
+        self._moved = 0
+
+    def update(self, equity: float, traded: float = 0.0) -> None:
+        """Add one bar's equity and traded value"""
+        if self.last is not None:
+            r = equity / self.last - 1
+            self.n_returns += 1
+            delta = r - self._mean
+            self._mean += delta / self.n_returns
+            self._m2 += delta * (r - self._mean)
+            self._up += r > 0
+            self._moved += r != 0
+        else:
+            self.base = equity
+        self.last = equity
+
+        self.peak = max(self.peak, equity)
+        drawdown = equity / self.peak - 1
+        self.max_drawdown = drawdown if math.isnan(self.max_drawdown) else min(self.max_drawdown, drawdown)
+        self.n_points += 1
+        self.equity_sum += equity
+        self.traded += traded
+
+    def snapshot(self) -> dict:
+        """Current value of every metric (same keys as compute_metrics)"""
+        nan = math.nan
+        years = self.n_returns / self.periods_per_year
+        growth = self.last / self.base if self.last is not None and self.base else nan
+        std = math.sqrt(self._m2 / (self.n_returns - 1)) if self.n_returns > 1 else nan
+        return {
+            "final_equity": self.last if self.last is not None else nan,
+            "total_return": growth - 1,
+            "cagr": growth ** (1 / years) - 1 if years and growth > 0 else nan,
+            "volatility": std * math.sqrt(self.periods_per_year),
+            "sharpe": self._mean / std * math.sqrt(self.periods_per_year) if std > 0 else nan,
+            "max_drawdown": self.max_drawdown,
+            "turnover": self.traded / (self.equity_sum / self.n_points) / years if years else nan,
+            "hit_rate": self._up / self._moved if self._moved else nan,
+        }
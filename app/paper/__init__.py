@@ -0,0 +1 @@
+# This file makes the paper directory a Python package
@@ -0,0 +1,144 @@
+"""
+Bar Feeds (paper trading)
+-------------------------
+Role:
+- Deliver bars to the paper-trading runtime one cross-section (ts) at a time
+  as BarEvents, stamped with their arrival time for latency tracking.
+
+Feeds:
+- ReplayFeed: plays back Parquet bars (a file, or one interval of the
+  partitioned bar store read through BarStore so re-ingested bars appear
+  once) or a bars frame, at `speed` x real time (None = as fast as
+  possible). Used to run paper trading offline and in tests.
+- PollingFeed: polls a DataSource through its async extension
+  (DataSource.fetch_data_async) for all symbols concurrently and emits the
+  bars it has not seen yet. The newest bar of each poll may still be
+  forming, so it is held back until a later bar exists. Fetches wait on
+  the source's token bucket instead of failing, and a poll where any
+  symbol failed emits nothing, so the next poll asks again from the same
+  bar; a symbol that fails `max_failures` polls in a row is dropped.
+"""
+
+import asyncio
+import logging
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from pathlib import Path
+from typing import AsyncIterator, Optional
+
+import pandas as pd
+
+from app.data.sources.base_class import DataSource, RateLimitError
+from app.data.store import BAR_COLUMNS, BarStore
+
+
+@dataclass(slots=True)
+class BarEvent:
+    ts: pd.Timestamp
+    frame: pd.DataFrame
+    # time.perf_counter_ns() when the bar reached the runtime
+    received_ns: int
+
+
+class BarFeed(ABC):
+    """Async iterator of BarEvents in ts order"""
+
+    @abstractmethod
+    def __aiter__(self) -> AsyncIterator[BarEvent]:
+        pass
+
+
+class ReplayFeed(BarFeed):
+
+    def __init__(self, bars, speed: Optional[float] = None, interval: str = "1d"):
+        if isinstance(bars, (str, Path)) and Path(bars).is_dir():
+            bars = BarStore(bars).read(interval=interval)
+        elif not isinstance(bars, pd.DataFrame):
+            bars = pd.read_parquet(bars, columns=BAR_COLUMNS)
+        self.bars = bars.sort_values(["ts", "symbol"], ignore_index=True)
+        # Replay speed as a multiple of real time (3600 = one hour of bars per second)
+        self.speed = speed
+
+    async def __aiter__(self) -> AsyncIterator[BarEvent]:
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        first = None
+        for ts, frame in self.bars.groupby("ts", sort=True):
+            if self.speed:
+                # Schedule against the start time so sleeps don't accumulate drift
+                first = ts if first is None else first
+                delay = started + (ts - first).total_seconds() / self.speed - loop.time()
+                await asyncio.sleep(max(delay, 0.0))
+            else:
+                await asyncio.sleep(0)
+            yield BarEvent(ts, frame, time.perf_counter_ns())
+
+
+class PollingFeed(BarFeed):
+
+    def __init__(self, source: DataSource, symbols: list[str], interval: str = "1m",
+                 poll_seconds: float = 60.0, period: str = "1d", max_polls: Optional[int] = None,
+                 max_failures: int = 3):
+        self.source = source
+        self.symbols = list(dict.fromkeys(symbols))
+        # Shared so per-symbol frames concatenate as one categorical
+        self.symbol_dtype = pd.CategoricalDtype(sorted(self.symbols))
+        self.interval = interval
+        self.poll_seconds = poll_seconds
+        # History requested on the first poll; later polls ask from the last emitted bar
+        self.period = period
+        self.max_polls = max_polls
+        self.last_ts: Optional[pd.Timestamp] = None
+        # Consecutive failed polls per symbol
+        self.max_failures = max_failures
+        self.failures: dict[str, int] = {}
+
+    async def _fetch(self, symbol: str) -> pd.DataFrame:
+        while True:
+            try:
+                data = await self.source.fetch_data_async(symbol, period=self.period, interval=self.interval,
+                                                          start=self.last_ts)
+                return data.astype({"symbol": self.symbol_dtype})
+            except RateLimitError as e:
+                if e.retry_after is None:
+                    raise
+                # Our own token bucket is empty: wait for a token rather than drop the symbol
+                await asyncio.sleep(e.retry_after)
+
+    async def __aiter__(self) -> AsyncIterator[BarEvent]:
+        polls = 0
+        while self.max_polls is None or polls < self.max_polls:
+            results = await asyncio.gather(*(self._fetch(s) for s in self.symbols), return_exceptions=True)
+            frames = []
+            failed = []
+            for symbol, result in zip(self.symbols, results):
+                if isinstance(result, BaseException):
+                    logging.warning(f"Polling {symbol} from {self.source.name} failed: {result}")
+                    failed.append(symbol)
+                else:
+                    self.failures.pop(symbol, None)
+                    if not result.empty:
+                        frames.append(result)
+
+            for symbol in failed:
+                self.failures[symbol] = self.failures.get(symbol, 0) + 1
+                if self.failures[symbol] >= self.max_failures:
+                    logging.error(f"Dropping {symbol} after {self.failures[symbol]} failed polls")
+                    self.symbols.remove(symbol)
+                    del self.failures[symbol]
+
+            # Hold the poll back so last_ts doesn't move past a symbol's missing bars
+            if frames and not failed:
+                bars = pd.concat(frames, ignore_index=True)
+                newest = bars["ts"].max()
+                ready = bars["ts"] < newest
+                if self.last_ts is not None:
+                    ready &= bars["ts"] > self.last_ts
+                for ts, frame in bars[ready].sort_values(["ts", "symbol"]).groupby("ts", sort=True):
+                    self.last_ts = ts
+                    yield BarEvent(ts, frame, time.perf_counter_ns())
+
+            polls += 1
+            if self.max_polls is None or polls < self.max_polls:
+                await asyncio.sleep(self.poll_seconds)
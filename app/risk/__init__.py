@@ -0,0 +1 @@
+# This file makes the risk directory a Python package
@@ -0,0 +1,206 @@
+"""
+Risk Engine (Sprint 2)
+----------------------
+Role:
+- Enforce docs/risk_policy.md before orders reach the Broker:
+    - Per-position cap: |position value| <= 2% of equity
+    - Max gross exposure: sum of |position values| <= 100% of equity
+    - Daily loss stop: once equity is down 5% from start-of-day, no new
+      or larger positions for the rest of that day
+- Sits between Strategy.on_bar and Broker.simulate; it only needs the
+  Portfolio and the prices at ts, so paper trading can call it unchanged.
+
+Rules:
+- Orders that reduce a position are never limited.
+- An order that flips a position to the other side is a new position on
+  that side: it is capped like one, and stops at flat while halted.
+- Orders that grow a position are clipped (not rejected) to the largest
+  whole number of shares within the limits; fully clipped orders are dropped.
+- Gross room is shared in order sequence after crediting the batch's
+  reductions, like buys share cash in Portfolio.apply_fills: an order that
+  does not fit gets what is left, and later orders that still fit pass.
+- A repeated symbol is checked against the position the earlier orders of
+  the same batch leave after their own clipping, so such batches are
+  checked order by order.
+- Orders without a usable price pass through (the Broker skips them).
+
+How:
+- The whole batch is checked with array operations; equity and gross
+  exposure come from the Portfolio's running totals revalued at ts for held
+  names only (Portfolio.exposure), and start-of-day equity is captured once
+  per day, so the per-ts cost does not depend on the universe or history.
+"""
+
+import logging
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from app.backtest.order import Order, OrderBatch
+from app.backtest.portfolio import Portfolio
+
+
+@dataclass(frozen=True)
+class RiskLimits:
+    max_position_pct: float = 0.02
+    max_gross_pct: float = 1.0
+    daily_loss_pct: float = 0.05
+
+
+class RiskEngine:
+
+    def __init__(self, limits: Optional[RiskLimits] = None):
+        self.limits = limits or RiskLimits()
+        self.day: Optional[pd.Timestamp] = None
+        self.day_start_equity: Optional[float] = None
+        # Number of orders clipped by each limit
+        self.breaches = {"position": 0, "gross": 0, "daily_loss": 0}
+
+    def check(self, ts, orders, portfolio: Portfolio, prices_at_ts) -> list[Order] | OrderBatch:
+        """Return the orders clipped to the limits (a list or an OrderBatch, like the input)"""
+        if isinstance(orders, OrderBatch):
+            return self.check_batch(ts, orders, portfolio, prices_at_ts)
+        if not orders:
+            return []
+        batch = OrderBatch.from_orders(orders, portfolio.symbols)
+        qty = self._limit(ts, batch, portfolio, prices_at_ts)
+        return [
+            order if q == order.qty else Order(ts=order.ts, symbol=order.symbol, qty=q, note=order.note)
+            for order, q in zip(orders, qty.tolist()) if q != 0
+        ]
+
+    def check_batch(self, ts, orders: OrderBatch, portfolio: Portfolio, prices_at_ts) -> OrderBatch:
+        """Vectorized check of a whole OrderBatch"""
+        qty = self._limit(ts, orders, portfolio, prices_at_ts)
+        keep = qty != 0
+        return OrderBatch(orders.table, orders.ts[keep], orders.symbol_id[keep], qty[keep], orders.note)
+
+    def halted(self, equity: float) -> bool:
+        """True once equity has fallen daily_loss_pct below the start-of-day equity"""
+        if self.day_start_equity is None or self.day_start_equity <= 0:
+            return False
+        return equity <= self.day_start_equity * (1 - self.limits.daily_loss_pct)
+
+    def _start_day(self, ts, portfolio: Portfolio) -> None:
+        day = pd.Timestamp(ts).normalize()
+        if day != self.day:
+            # Equity as of the last mark, i.e. before this ts' prices move it
+            self.day = day
+            self.day_start_equity = portfolio.cash + portfolio.holdings_value
+
+    def _limit(self, ts, orders: OrderBatch, portfolio: Portfolio, prices_at_ts) -> np.ndarray:
+        """Clipped quantities, aligned with the batch rows"""
+        self._start_day(ts, portfolio)
+        qty = orders.qty.copy()
+        if len(qty) == 0:
+            return qty
+        price = _order_prices(orders, prices_at_ts)
+        priced = np.isfinite(price) & (price > 0)
+        equity, gross = portfolio.exposure(prices_at_ts)
+        before = portfolio.shares(orders.table, orders.symbol_id).astype(np.float64)
+
+        # Per-position cap (zero once the daily loss stop has triggered)
+        if self.halted(equity):
+            cap = np.zeros(len(qty))
+            limit = "daily_loss"
+        else:
+            with np.errstate(divide="ignore", invalid="ignore"):
+                cap = np.floor(max(equity, 0.0) * self.limits.max_position_pct / price)
+            limit = "position"
+        cap = np.nan_to_num(cap)
+        room = max(equity, 0.0) * self.limits.max_gross_pct - gross
+
+        repeated = _repeated(orders.symbol_id)
+        if repeated.any():
+            return self._limit_in_sequence(ts, orders.symbol_id, qty, before, price, priced, cap, limit,
+                                           room, repeated)
+
+        after = before + qty
+        # An order that flips the side opens a new position, which only the cap bounds
+        flipped = np.sign(after) * np.sign(before) < 0
+        bound = np.where(priced, np.where(flipped, cap, np.maximum(np.abs(before), cap)), np.inf)
+        capped = np.clip(after, -bound, bound)
+        self.breaches[limit] += int((capped != after).sum())
+        after = capped
+
+        # Gross exposure: reductions free room first, then increases share it in order
+        growth = np.where(priced, (np.abs(after) - np.abs(before)) * price, 0.0)
+        room -= growth[growth < 0].sum()
+        rows = np.flatnonzero(growth > 0)
+        used = np.cumsum(growth[rows])
+        allowed = int(np.searchsorted(used, room + 1e-9, side="right"))
+        if allowed < len(rows):
+            # Only the tail after the first order that does not fit is clipped one by one,
+            # so smaller later orders still use what is left
+            left = room - (used[allowed - 1] if allowed else 0.0)
+            clipped = 0
+            for i in rows[allowed:].tolist():
+                if growth[i] > left + 1e-9:
+                    extra = max(np.floor(left / price[i]), 0.0)
+                    after[i] = np.sign(after[i]) * (np.abs(before[i]) + extra)
+                    growth[i] = extra * price[i]
+                    clipped += 1
+                left -= growth[i]
+            self.breaches["gross"] += clipped
+            logging.debug(f"Gross exposure limit clipped {clipped} orders at {ts}")
+
+        return (after - before).astype(np.int64)
+
+    def _limit_in_sequence(self, ts, ids: np.ndarray, qty: np.ndarray, before: np.ndarray, price: np.ndarray,
+                           priced: np.ndarray, cap: np.ndarray, limit: str, room: float,
+                           repeated: np.ndarray) -> np.ndarray:
+        """
+        Order-by-order check for batches that repeat a symbol
+
+        Each order starts from the position the earlier orders left after
+        their own clipping. Reductions of symbols that appear once free gross
+        room up front, as in the vectorized path; a repeated symbol's
+        reduction only frees room from its place in the sequence on.
+        """
+        growth = np.where(priced & ~repeated, (np.abs(before + qty) - np.abs(before)) * price, 0.0)
+        left = room - growth[growth < 0].sum()
+        position: dict[int, float] = {}
+        clipped = 0
+        for i in range(len(qty)):
+            start = position.get(ids[i], before[i])
+            after = start + qty[i]
+            if priced[i]:
+                bound = cap[i] if after * start < 0 else max(abs(start), cap[i])
+                if abs(after) > bound:
+                    after = np.sign(after) * bound
+                    self.breaches[limit] += 1
+                grown = (abs(after) - abs(start)) * price[i]
+                if grown > 0 and grown > left + 1e-9:
+                    extra = max(np.floor(left / price[i]), 0.0)
+                    after = np.sign(after) * (abs(start) + extra)
+                    grown = extra * price[i]
+                    clipped += 1
+                if grown > 0 or repeated[i]:
+                    left -= grown
+            qty[i] = after - start
+            position[ids[i]] = after
+        if clipped:
+            self.breaches["gross"] += clipped
+            logging.debug(f"Gross exposure limit clipped {clipped} orders at {ts}")
+        return qty
+
+
+def _order_prices(orders: OrderBatch, prices_at_ts) -> np.ndarray:
+    """Price per order row from a {symbol: price} dict or an array indexed by symbol code"""
+    if isinstance(prices_at_ts, dict):
+        symbols = orders.table.symbols
+        return np.fromiter((prices_at_ts.get(symbols[i], np.nan) for i in orders.symbol_id.tolist()),
+                           dtype=np.float64, count=len(orders))
+    prices = np.asarray(prices_at_ts, dtype=np.float64)
+    price = np.full(len(orders), np.nan)
+    known = orders.symbol_id < len(prices)
+    price[known] = prices[orders.symbol_id[known]]
+    return price
+
+
+def _repeated(ids: np.ndarray) -> np.ndarray:
+    """True for rows whose symbol appears more than once in the batch"""
+    _, inverse, counts = np.unique(ids, return_inverse=True, return_counts=True)
+    return counts[inverse] > 1
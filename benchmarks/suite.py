@@ -0,0 +1,299 @@
+"""
+Benchmark suite
+----------------
+Responsible for:
+- Timing the data, signal and backtest hot paths on synthetic bars
+  (synthetic.py) of a chosen universe size x history length
+- Recording best/median wall time and peak traced memory per benchmark
+- Saving results as a JSON baseline and failing when a later run regresses
+  past a threshold
+
+How:
+- Each benchmark's setup builds its inputs outside the timed region and
+  returns the callable to time. The callable runs once to warm up, then
+  `repeat` timed runs; regressions are judged on the best run, which is
+  the least noisy on shared CI machines.
+- Peak memory comes from one extra run under tracemalloc (Python and NumPy
+  allocations; Arrow's own memory pool is not traced).
+- A baseline only compares against results for the same size; times under
+  min_seconds are ignored as noise.
+- Benchmarks that need a service (postgres_load: $DATABASE_URL) are
+  skipped when it is not configured, and then not judged against the
+  baseline.
+
+Usage:
+    python -m benchmarks.suite --size small --save-baseline benchmarks/baselines/small.json
+    python -m benchmarks.suite --size small --baseline benchmarks/baselines/small.json --threshold 0.25
+    (exits 1 on a regression, so it can gate CI)
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Callable, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from app.alpha.momentum import MomentumStrategy
+from app.alpha.signals import MomentumSignal, top_k_mask
+from app.backtest.engine import BacktestEngine
+from app.backtest.matrix import BarMatrix
+from app.data.database import PriceDatabase, _binary_buffer
+from app.data.resample import resample_bars
+from app.data.sources.yahoo_source import YahooSource
+from app.data.store import BarStore
+from app.data.validate import validate_bars
+from .synthetic import symbol_names, synthetic_bars, synthetic_raw
+
+# (symbols, days)
+SIZES = {
+    "tiny": (10, 60),
+    "small": (50, 500),
+    "medium": (500, 2520),
+    "large": (3000, 2520),
+}
+
+
+@dataclass
+class BenchResult:
+    name: str
+    best_seconds: float
+    median_seconds: float
+    peak_mb: float
+    repeat: int
+
+
+## Benchmarks ##
+# Each setup(bars, workdir) prepares its inputs and returns the callable to time,
+# or (callable, cleanup) when it leaves state outside workdir, or None to skip
+
+Setup = Callable[[pd.DataFrame, Path], Union[None, Callable, tuple[Callable, Callable]]]
+
+def _standardize(bars: pd.DataFrame, workdir: Path) -> Callable:
+    source = YahooSource()
+    symbols = list(bars["symbol"].cat.categories)
+    raws = [synthetic_raw(bars["ts"].nunique(), seed=i) for i in range(len(symbols))]
+    return lambda: [source._standardize_data(raw, symbol) for raw, symbol in zip(raws, symbols)]
+
+
+def _validate(bars: pd.DataFrame, workdir: Path) -> Callable:
+    return lambda: validate_bars(bars)
+
+
+def _parquet_write(bars: pd.DataFrame, workdir: Path) -> Callable:
+    runs = iter(range(sys.maxsize))
+    return lambda: BarStore(workdir / f"write-{next(runs)}").write(bars)
+
+
+def _parquet_read(bars: pd.DataFrame, workdir: Path) -> Callable:
+    store = BarStore(workdir / "read")
+    store.write(bars)
+    return lambda: store.read()
+
+
+def _resample(bars: pd.DataFrame, workdir: Path) -> Callable:
+    return lambda: resample_bars(bars, "1wk")
+
+
+def _copy_pack(bars: pd.DataFrame, workdir: Path) -> Callable:
+    return lambda: _binary_buffer(bars)
+
+
+def _postgres_load(bars: pd.DataFrame, workdir: Path) -> Optional[tuple[Callable, Callable]]:
+    if not os.environ.get("DATABASE_URL"):
+        return None
+    db = PriceDatabase()
+    # The warm-up run inserts; the timed runs re-load the same keys through the upsert
+    prefix = f"BENCH{uuid.uuid4().hex[:6].upper()}"
+    rows = bars.assign(symbol=prefix + bars["symbol"].astype(str))
+
+    def cleanup():
+        with db.connection() as conn, conn.cursor() as cur:
+            cur.execute("DELETE FROM price_data WHERE symbol LIKE %s", (f"{prefix}%",))
+        db.close()
+    return (lambda: db.write(rows)), cleanup
+
+
+def _momentum_batch(bars: pd.DataFrame, workdir: Path) -> Callable:
+    close = BarMatrix.from_frame(bars).close
+    return lambda: top_k_mask(MomentumSignal(20).compute(close), 5)
+
+
+def _momentum_stream(bars: pd.DataFrame, workdir: Path) -> Callable:
+    matrix = BarMatrix.from_frame(bars)
+
+    def run():
+        signal = MomentumSignal(20, capacity=len(matrix.symbols))
+        for row in matrix.close:
+            signal.top_k(5, signal.update(matrix.symbols, row))
+    return run
+
+
+def _backtest_event(bars: pd.DataFrame, workdir: Path) -> Callable:
+    return lambda: BacktestEngine(MomentumStrategy(20, 5)).run(bars)
+
+
+def _backtest_vectorized(bars: pd.DataFrame, workdir: Path) -> Callable:
+    return lambda: BacktestEngine(MomentumStrategy(20, 5)).run(bars, mode="vectorized")
+
+
+def _backtest_chunked(bars: pd.DataFrame, workdir: Path) -> Callable:
+    matrix = BarMatrix.load(BarMatrix.from_frame(bars).save(workdir / "matrix"))
+    return lambda: BacktestEngine(MomentumStrategy(20, 5)).run_matrix(matrix, chunk_rows=64)
+
+
+BENCHMARKS: dict[str, Setup] = {
+    "standardize": _standardize,
+    "validate": _validate,
+    "parquet_write": _parquet_write,
+    "parquet_read": _parquet_read,
+    "copy_pack": _copy_pack,
+    "postgres_load": _postgres_load,
+    "resample": _resample,
+    "momentum_batch": _momentum_batch,
+    "momentum_stream": _momentum_stream,
+    "backtest_event": _backtest_event,
+    "backtest_vectorized": _backtest_vectorized,
+    "backtest_chunked": _backtest_chunked,
+}
+
+
+## Runner ##
+
+def measure(name: str, fn: Callable, repeat: int = 5) -> BenchResult:
+    fn()
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - started)
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return BenchResult(name, min(times), statistics.median(times), peak / 1024 ** 2, repeat)
+
+
+def run_suite(n_symbols: int, n_days: int, repeat: int = 5, names: Optional[list[str]] = None,
+              seed: int = 0) -> dict[str, BenchResult]:
+    names = names or list(BENCHMARKS)
+    unknown = sorted(set(names) - set(BENCHMARKS))
+    if unknown:
+        raise ValueError(f"Unknown benchmarks: {unknown}")
+
+    bars = synthetic_bars(n_symbols, n_days, seed=seed, symbols=symbol_names(n_symbols))
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in names:
+            workdir = Path(tmp) / name
+            workdir.mkdir()
+            prepared = BENCHMARKS[name](bars, workdir)
+            if prepared is None:
+                continue
+            fn, cleanup = prepared if isinstance(prepared, tuple) else (prepared, None)
+            try:
+                results[name] = measure(name, fn, repeat)
+            finally:
+                if cleanup is not None:
+                    cleanup()
+    return results
+
+
+## Baselines ##
+
+def to_json(results: dict[str, BenchResult], n_symbols: int, n_days: int) -> dict:
+    return {
+        "config": {"symbols": n_symbols, "days": n_days},
+        "environment": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "machine": platform.machine(),
+        },
+        "results": {name: asdict(result) for name, result in results.items()},
+    }
+
+
+def compare(current: dict, baseline: dict, threshold: float = 0.25, memory_threshold: float = 0.25,
+            min_seconds: float = 0.001) -> list[str]:
+    """Regressions of current vs baseline (both to_json dicts), as readable messages"""
+    if current["config"] != baseline["config"]:
+        raise ValueError(f"Baseline is for {baseline['config']}, this run is {current['config']}")
+
+    regressions = []
+    for name, result in current["results"].items():
+        base = baseline["results"].get(name)
+        if base is None:
+            continue
+        best, base_best = result["best_seconds"], base["best_seconds"]
+        if best > min_seconds and best > base_best * (1 + threshold):
+            regressions.append(f"{name}: {best * 1e3:.1f}ms vs baseline {base_best * 1e3:.1f}ms "
+                               f"(+{best / base_best - 1:.0%})")
+        peak, base_peak = result["peak_mb"], base["peak_mb"]
+        if base_peak > 0 and peak > base_peak * (1 + memory_threshold):
+            regressions.append(f"{name}: peak {peak:.1f}MB vs baseline {base_peak:.1f}MB "
+                               f"(+{peak / base_peak - 1:.0%})")
+    return regressions
+
+
+def format_table(results: dict[str, BenchResult], baseline: Optional[dict] = None) -> str:
+    lines = [f"{'benchmark':<22}{'best ms':>10}{'median ms':>11}{'peak MB':>10}{'vs base':>9}"]
+    for name, result in results.items():
+        base = (baseline or {}).get("results", {}).get(name)
+        change = f"{result.best_seconds / base['best_seconds'] - 1:+.0%}" if base else ""
+        lines.append(f"{name:<22}{result.best_seconds * 1e3:>10.2f}{result.median_seconds * 1e3:>11.2f}"
+                     f"{result.peak_mb:>10.1f}{change:>9}")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark data, signal and backtest hot paths")
+    parser.add_argument("--size", choices=sorted(SIZES), default="small")
+    parser.add_argument("--symbols", type=int, default=None, help="Override the universe size of --size")
+    parser.add_argument("--days", type=int, default=None, help="Override the history length of --size")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--only", nargs="+", default=None, choices=list(BENCHMARKS))
+    parser.add_argument("--baseline", default=None, help="JSON baseline to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed slowdown (0.25 = +25%%)")
+    parser.add_argument("--memory-threshold", type=float, default=0.25, help="Allowed peak memory growth")
+    parser.add_argument("--save-baseline", default=None, help="Write this run's results as a baseline")
+    args = parser.parse_args(argv)
+
+    n_symbols, n_days = SIZES[args.size]
+    n_symbols, n_days = args.symbols or n_symbols, args.days or n_days
+    results = run_suite(n_symbols, n_days, args.repeat, args.only)
+    current = to_json(results, n_symbols, n_days)
+    baseline = json.loads(Path(args.baseline).read_text()) if args.baseline else None
+
+    print(f"{n_symbols} symbols x {n_days} days, best of {args.repeat}")
+    print(format_table(results, baseline))
+    if args.save_baseline:
+        Path(args.save_baseline).write_text(json.dumps(current, indent=2) + "\n")
+        print(f"Saved baseline to {args.save_baseline}")
+    if baseline is None:
+        return 0
+
+    regressions = compare(current, baseline, args.threshold, args.memory_threshold)
+    for message in regressions:
+        print(f"REGRESSION {message}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,64 @@
+"""
+Synthetic bars
+----------------
+Responsible for:
+- Generating deterministic OHLCV data for any universe size x history
+  length, so benchmarks (and tests) need no network or fixtures
+
+How:
+- Closes are geometric random walks (one seeded generator per call);
+  open/high/low are drawn around them so high >= max(open, close) and
+  low <= min(open, close), and volume is a positive integer count.
+- synthetic_bars returns the long-format contract frame
+  [ts, symbol, open, high, low, close, volume] sorted by (ts, symbol).
+- synthetic_raw returns what a source downloads for one symbol: a
+  yfinance-style frame (capitalised columns, exchange-local 'Date' index).
+"""
+
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+
+def symbol_names(n_symbols: int) -> list[str]:
+    return [f"S{i:05d}" for i in range(n_symbols)]
+
+
+def _walk(rng: np.random.Generator, n_days: int, n_symbols: int) -> dict[str, np.ndarray]:
+    """(days x symbols) OHLCV arrays"""
+    returns = rng.normal(0.0003, 0.02, size=(n_days, n_symbols))
+    close = 100.0 * np.exp(np.cumsum(returns, axis=0))
+    open_ = close * np.exp(rng.normal(0.0, 0.005, size=close.shape))
+    spread = np.abs(rng.normal(0.0, 0.01, size=close.shape))
+    return {
+        "open": open_,
+        "high": np.maximum(open_, close) * (1 + spread),
+        "low": np.minimum(open_, close) * (1 - spread),
+        "close": close,
+        "volume": rng.integers(1_000, 1_000_000, size=close.shape).astype(np.float64),
+    }
+
+
+def synthetic_bars(n_symbols: int, n_days: int, start: str = "2018-01-01", freq: str = "B",
+                   seed: int = 0, symbols: Optional[list[str]] = None) -> pd.DataFrame:
+    """Long-format bars for n_symbols x n_days, sorted by (ts, symbol)"""
+    symbols = symbols or symbol_names(n_symbols)
+    ts = pd.date_range(start, periods=n_days, freq=freq, tz="UTC").as_unit("ns")
+    fields = _walk(np.random.default_rng(seed), n_days, len(symbols))
+    return pd.DataFrame({
+        "ts": np.repeat(ts, len(symbols)),
+        "symbol": pd.Categorical(np.tile(symbols, n_days), categories=symbols),
+        **{name: values.ravel() for name, values in fields.items()},
+    })
+
+
+def synthetic_raw(n_days: int, start: str = "2018-01-01", seed: int = 0,
+                  tz: str = "America/New_York") -> pd.DataFrame:
+    """One symbol's download as yfinance returns it"""
+    fields = _walk(np.random.default_rng(seed), n_days, 1)
+    index = pd.date_range(start, periods=n_days, freq="B", tz=tz, name="Date").as_unit("ns")
+    raw = pd.DataFrame({name.capitalize(): values[:, 0] for name, values in fields.items()}, index=index)
+    raw["Dividends"] = 0.0
+    raw["Stock Splits"] = 0.0
+    return raw
@@ -0,0 +1,51 @@
+-- Database initialization (mounted into the postgres container by docker-compose)
+
+CREATE TABLE IF NOT EXISTS symbols (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    symbol VARCHAR(20) UNIQUE NOT NULL,
+    name VARCHAR(255),
+    exchange VARCHAR(50),
+    asset_type VARCHAR(50),
+    is_active BOOLEAN DEFAULT TRUE
+);
+
+CREATE TABLE IF NOT EXISTS price_data (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    symbol VARCHAR(20) NOT NULL,
+    -- Bar interval (1d, 1h, 1m, ...): daily and intraday series of a symbol are kept apart
+    interval VARCHAR(10) NOT NULL DEFAULT '1d',
+    timestamp TIMESTAMP WITH TIME ZONE NOT NULL,
+    open DECIMAL(15,6),
+    high DECIMAL(15,6),
+    low DECIMAL(15,6),
+    close DECIMAL(15,6),
+    volume BIGINT,
+    source VARCHAR(50),
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT now(),
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT now(),
+    -- Upsert key for the bulk loader; also serves symbol + interval + time range reads
+    CONSTRAINT price_data_symbol_interval_timestamp_key UNIQUE (symbol, interval, timestamp)
+);
+
+-- Databases created before price_data had an interval: existing rows are daily bars
+ALTER TABLE price_data ADD COLUMN IF NOT EXISTS interval VARCHAR(10) NOT NULL DEFAULT '1d';
+ALTER TABLE price_data DROP CONSTRAINT IF EXISTS price_data_symbol_timestamp_key;
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'price_data_symbol_interval_timestamp_key') THEN
+        ALTER TABLE price_data ADD CONSTRAINT price_data_symbol_interval_timestamp_key
+            UNIQUE (symbol, interval, timestamp);
+    END IF;
+END $$;
+
+CREATE TABLE IF NOT EXISTS ingestion_logs (
+    id BIGSERIAL PRIMARY KEY,
+    source VARCHAR(50),
+    interval VARCHAR(10),
+    symbols TEXT[],
+    rows_written BIGINT DEFAULT 0,
+    status VARCHAR(20) DEFAULT 'running',
+    error TEXT,
+    started_at TIMESTAMP WITH TIME ZONE DEFAULT now(),
+    finished_at TIMESTAMP WITH TIME ZONE
+);
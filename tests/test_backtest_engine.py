@@ -0,0 +1,272 @@
+"""
+Test the backtest engine
+
+This script is responsible for:
+- Testing the event-loop backtest against the Sprint 1 scenarios
+- Checking that the vectorized mode matches the event loop
+- Checking that chunked runs over memory-mapped matrices match whole runs
+"""
+
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from app.alpha.momentum import MomentumStrategy
+from app.backtest.engine import BacktestEngine, Strategy, VectorizedStrategy
+from app.backtest.matrix import BarMatrix
+from app.backtest.order import Order, OrderBatch, SymbolTable
+from app.backtest.portfolio import Portfolio
+from app.data.store import BarStore
+from benchmarks.synthetic import synthetic_bars
+
+
+def make_bars(closes: dict, start: str = "2024-01-01") -> pd.DataFrame:
+    """Long-format bars from {symbol: [close, ...]}; None drops the row"""
+    rows = []
+    for symbol, series in closes.items():
+        for i, close in enumerate(series):
+            if close is None:
+                continue
+            ts = pd.Timestamp(start, tz="UTC") + pd.Timedelta(days=i)
+            rows.append({"ts": ts, "symbol": symbol, "open": close, "high": close,
+                         "low": close, "close": close, "volume": 1000.0})
+    return pd.DataFrame(rows)
+
+
+class TargetStrategy(Strategy, VectorizedStrategy):
+    """Trades towards a fixed (ts x symbol) target-quantity table in both modes"""
+
+    def __init__(self, targets: pd.DataFrame):
+        super().__init__()
+        self.table = targets
+
+    def on_bar(self, ts, frame):
+        if ts not in self.table.index:
+            return []
+        row = self.table.loc[ts]
+        orders = []
+        for symbol in sorted(frame["symbol"]):
+            target = row.get(symbol, np.nan)
+            if np.isnan(target):
+                continue
+            qty = int(target) - self.positions.get(symbol, 0)
+            if qty != 0:
+                orders.append(Order(ts=ts, symbol=symbol, qty=qty))
+        return orders
+
+    def targets(self, bars):
+        return self.table.reindex(index=bars.index, columns=bars.symbols).to_numpy(dtype=float)
+
+
+class BatchTargetStrategy(TargetStrategy):
+    """Same targets, but emits a columnar OrderBatch per bar"""
+
+    symbol_table = SymbolTable()
+
+    def on_bar(self, ts, frame):
+        orders = super().on_bar(ts, frame)
+        return OrderBatch.from_orders(orders, self.symbol_table)
+
+
+class TestEventLoop(unittest.TestCase):
+
+    def test_buy_and_hold(self):
+        """S1: equity moves with shares * delta(close)"""
+        bars = make_bars({"AAA": [100, 101, 102, 103, 104]})
+        ts = sorted(bars["ts"].unique())
+        strategy = TargetStrategy(pd.DataFrame({"AAA": [10.0]}, index=ts[:1]))
+        result = BacktestEngine(strategy, initial_cash=1_000_000).run(bars)
+
+        equity = [row["equity"] for row in result.equity_timeseries]
+        self.assertEqual(len(equity), 5)
+        self.assertEqual(np.diff(equity).tolist(), [10.0] * 4)
+        self.assertEqual(len(result.trades_log), 1)
+
+    def test_missing_dates_carry_positions(self):
+        """S3: a missing bar does not crash and the position is marked at its last price"""
+        bars = make_bars({"AAA": [100, 101, None, 103, 104], "BBB": [50, 50, 50, 50, 50]})
+        ts = sorted(bars["ts"].unique())
+        strategy = TargetStrategy(pd.DataFrame({"AAA": [10.0], "BBB": [10.0]}, index=ts[:1]))
+        result = BacktestEngine(strategy, initial_cash=10_000).run(bars)
+
+        equity = [row["equity"] for row in result.equity_timeseries]
+        self.assertEqual(equity[2], equity[1])
+        self.assertEqual(equity[-1], 10_000 + 10 * 4)
+
+    def test_no_leverage_clips_buys(self):
+        """S4: a buy beyond available cash is clipped and cash never goes negative"""
+        bars = make_bars({"AAA": [100, 100]})
+        ts = sorted(bars["ts"].unique())
+        strategy = TargetStrategy(pd.DataFrame({"AAA": [20.0]}, index=ts[:1]))
+        engine = BacktestEngine(strategy, portfolio=Portfolio(1000))
+        result = engine.run(bars)
+
+        self.assertEqual(result.trades_log[0]["qty"], 10)
+        self.assertGreaterEqual(engine.portfolio.cash, 0)
+
+    def test_nan_price_skips_orders(self):
+        """S5: orders for a symbol with a NaN close are ignored"""
+        bars = make_bars({"AAA": [100, 101]})
+        bars.loc[0, "close"] = np.nan
+        ts = sorted(bars["ts"].unique())
+        strategy = TargetStrategy(pd.DataFrame({"AAA": [5.0, np.nan]}, index=ts))
+        result = BacktestEngine(strategy).run(bars)
+
+        self.assertEqual(result.trades_log, [])
+        self.assertEqual(len(result.equity_timeseries), 2)
+
+
+class TestVectorizedParity(unittest.TestCase):
+
+    def assert_parity(self, bars, table, cash, holdings=None, allow_short=False):
+        def portfolio():
+            seeded = Portfolio(cash, allow_short=allow_short)
+            if holdings:
+                seeded.set_positions(holdings, marks={symbol: 10.0 for symbol in holdings})
+            return seeded
+
+        event_engine = BacktestEngine(TargetStrategy(table), portfolio=portfolio())
+        vector_engine = BacktestEngine(TargetStrategy(table), portfolio=portfolio())
+        event = event_engine.run(bars, mode="event")
+        vector = vector_engine.run(bars, mode="vectorized")
+        self.assertEqual(event_engine.portfolio.positions, vector_engine.portfolio.positions)
+
+        self.assertEqual([r["ts"] for r in event.equity_timeseries], [r["ts"] for r in vector.equity_timeseries])
+        np.testing.assert_allclose([r["equity"] for r in event.equity_timeseries],
+                                   [r["equity"] for r in vector.equity_timeseries], rtol=1e-12)
+
+        event_trades, vector_trades = list(event.trades_log), list(vector.trades_log)
+        self.assertEqual([(t["ts"], t["symbol"], t["qty"]) for t in event_trades],
+                         [(t["ts"], t["symbol"], t["qty"]) for t in vector_trades])
+        np.testing.assert_allclose([t["price"] for t in event_trades], [t["price"] for t in vector_trades])
+
+    def random_case(self, seed, n_ts=60, n_sym=8):
+        rng = np.random.default_rng(seed)
+        symbols = [f"S{i:02d}" for i in range(n_sym)]
+        closes = {}
+        for symbol in symbols:
+            path = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, n_ts)))
+            series = [float(p) for p in path]
+            for i in rng.choice(n_ts, 5, replace=False):
+                series[i] = None
+            closes[symbol] = series
+        bars = make_bars(closes)
+        bars.loc[rng.choice(len(bars), 5, replace=False), "close"] = np.nan
+        ts = sorted(bars["ts"].unique())
+        table = pd.DataFrame(rng.integers(0, 200, (n_ts, n_sym)).astype(float), index=ts, columns=symbols)
+        table = table.mask(rng.random(table.shape) < 0.3)
+        return bars, table
+
+    def test_parity_unconstrained(self):
+        """Cash never binds: vectorized fast path"""
+        bars, table = self.random_case(1)
+        self.assert_parity(bars, table, cash=10_000_000)
+
+    def test_parity_with_cash_clipping(self):
+        """Cash binds: row-by-row path with sequential clipping"""
+        bars, table = self.random_case(2)
+        self.assert_parity(bars, table, cash=20_000)
+
+    def test_parity_with_seeded_portfolio(self):
+        """A Portfolio passed in with holdings keeps them in both modes"""
+        bars = make_bars({"A": [11, 12, 13]})
+        table = pd.DataFrame({"A": [np.nan] * 3}, index=sorted(bars["ts"].unique()))
+        self.assert_parity(bars, table, cash=1000, holdings={"A": 10})
+
+        bars, table = self.random_case(4)
+        self.assert_parity(bars, table, cash=20_000, holdings={"S00": 50, "S03": 20})
+
+    def test_parity_with_shorts(self):
+        """Negative targets short in both modes when the Portfolio allows it"""
+        bars, table = self.random_case(5)
+        table = table - 100
+        self.assert_parity(bars, table, cash=10_000_000, allow_short=True)
+        self.assert_parity(bars, table, cash=20_000, allow_short=True)
+        self.assert_parity(bars, table, cash=20_000)
+
+    def test_vectorized_rejects_holdings_outside_bars(self):
+        portfolio = Portfolio(1000)
+        portfolio.set_positions({"ZZZ": 10}, marks={"ZZZ": 10.0})
+        bars = make_bars({"A": [11, 12]})
+        table = pd.DataFrame({"A": [np.nan] * 2}, index=sorted(bars["ts"].unique()))
+        with self.assertRaises(ValueError):
+            BacktestEngine(TargetStrategy(table), portfolio=portfolio).run(bars, mode="vectorized")
+
+    def test_order_batches_match_records(self):
+        """A strategy emitting OrderBatch goes through the batch Broker/Portfolio paths"""
+        bars, table = self.random_case(3)
+        records = BacktestEngine(TargetStrategy(table), initial_cash=20_000).run(bars)
+        batches = BacktestEngine(BatchTargetStrategy(table), initial_cash=20_000).run(bars)
+
+        self.assertEqual(list(records.trades_log), list(batches.trades_log))
+        np.testing.assert_allclose([r["equity"] for r in records.equity_timeseries],
+                                   [r["equity"] for r in batches.equity_timeseries])
+
+    def test_weight_targets(self):
+        """Weight targets are sized from equity and never use leverage"""
+        bars = make_bars({"AAA": [100, 110, 120], "BBB": [50, 40, 60]})
+
+        class HalfHalf(VectorizedStrategy):
+            target_kind = "weight"
+
+            def targets(self, matrix):
+                return np.full(matrix.shape, 0.5)
+
+        engine = BacktestEngine(HalfHalf(), initial_cash=10_000)
+        result = engine.run(bars, mode="vectorized")
+        self.assertEqual(result.trades_log[0]["qty"], 50)
+        self.assertEqual(result.trades_log[1]["qty"], 100)
+        self.assertGreaterEqual(engine.portfolio.cash, 0)
+
+    def test_vectorized_requires_vectorized_strategy(self):
+        class EventOnly(Strategy):
+            def on_bar(self, ts, frame):
+                return []
+
+        with self.assertRaises(ValueError):
+            BacktestEngine(EventOnly()).run(make_bars({"AAA": [1, 2]}), mode="vectorized")
+
+
+class TestChunkedRuns(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.bars = synthetic_bars(12, 400, freq="h")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def assert_same_run(self, expected, result):
+        np.testing.assert_allclose([r["equity"] for r in expected.equity_timeseries],
+                                   [r["equity"] for r in result.equity_timeseries])
+        self.assertEqual(list(expected.trades_log), list(result.trades_log))
+
+    def test_chunked_matrix_matches_whole_run(self):
+        matrix = BarMatrix.from_frame(self.bars)
+        for cash in [1_000_000, 100_000]:
+            whole = BacktestEngine(MomentumStrategy(10, 3), initial_cash=cash).run_matrix(matrix)
+            for chunk_rows in [1, 37, 1000]:
+                engine = BacktestEngine(MomentumStrategy(10, 3), initial_cash=cash)
+                self.assert_same_run(whole, engine.run_matrix(matrix, chunk_rows=chunk_rows))
+                self.assertGreaterEqual(engine.portfolio.cash, 0)
+
+    def test_memory_mapped_matrix_from_store(self):
+        store = BarStore(f"{self.tmp.name}/bars")
+        store.write(self.bars, interval="1h")
+        mapped = BarMatrix.from_store(store, f"{self.tmp.name}/matrix", interval="1h")
+        self.assertIsInstance(mapped.close, np.memmap)
+
+        whole = BacktestEngine(MomentumStrategy(10, 3)).run(store.read(interval="1h"), mode="vectorized")
+        self.assert_same_run(whole, BacktestEngine(MomentumStrategy(10, 3)).run_matrix(mapped, chunk_rows=50))
+        self.assert_same_run(whole, BacktestEngine(MomentumStrategy(10, 3)).run_frames(mapped.iter_frames(50)))
+
+    def test_strategy_without_warmup_runs_whole(self):
+        bars, table = TestVectorizedParity().random_case(4)
+        matrix = BarMatrix.from_frame(bars)
+        whole = BacktestEngine(TargetStrategy(table), initial_cash=20_000).run_matrix(matrix)
+        self.assert_same_run(whole, BacktestEngine(TargetStrategy(table), initial_cash=20_000)
+                             .run_matrix(matrix, chunk_rows=5))
+
+
+if __name__ == '__main__':
+    unittest.main()
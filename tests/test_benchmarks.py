@@ -0,0 +1,79 @@
+"""
+Test the benchmark harness
+
+This script is responsible for:
+- Testing that synthetic bars are deterministic and pass validation
+- Testing baseline comparison and the CLI exit code on a regression
+- Testing that benchmarks needing an unconfigured service are skipped
+"""
+
+import json
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+from benchmarks.suite import compare, main, run_suite, to_json
+from benchmarks.synthetic import synthetic_bars, synthetic_raw
+from app.data.validate import validate_bars
+
+
+class TestSynthetic(unittest.TestCase):
+
+    def test_bars_are_deterministic_and_valid(self):
+        bars = synthetic_bars(5, 30, seed=1)
+
+        self.assertEqual(len(bars), 150)
+        self.assertTrue(bars.equals(synthetic_bars(5, 30, seed=1)))
+        self.assertTrue(validate_bars(bars).passed)
+        self.assertTrue((bars["high"] >= bars[["open", "close"]].max(axis=1)).all())
+        self.assertTrue((bars["low"] <= bars[["open", "close"]].min(axis=1)).all())
+
+    def test_raw_looks_like_yfinance(self):
+        raw = synthetic_raw(10)
+        self.assertEqual(raw.index.name, "Date")
+        self.assertEqual(str(raw.index.tz), "America/New_York")
+        self.assertIn("Close", raw.columns)
+
+
+class TestHarness(unittest.TestCase):
+
+    def setUp(self):
+        results = run_suite(4, 30, repeat=1, names=["validate", "momentum_batch"])
+        self.current = to_json(results, 4, 30)
+
+    def test_compare(self):
+        baseline = json.loads(json.dumps(self.current))
+        self.assertEqual(compare(self.current, baseline), [])
+
+        baseline["results"]["validate"]["best_seconds"] = self.current["results"]["validate"]["best_seconds"] * 2
+        self.assertEqual(compare(self.current, baseline), [])
+        baseline["results"]["validate"]["best_seconds"] = 0.0005
+        self.current["results"]["validate"]["best_seconds"] = 0.002
+        self.assertEqual(len(compare(self.current, baseline)), 1)
+        # Below min_seconds differences are noise
+        self.assertEqual(compare(self.current, baseline, min_seconds=0.01), [])
+
+        with self.assertRaises(ValueError):
+            compare(to_json({}, 5, 30), baseline)
+
+    def test_cli_fails_on_regression(self):
+        for result in self.current["results"].values():
+            result["best_seconds"] = 1e-9
+            result["peak_mb"] = 1e-6
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "baseline.json"
+            path.write_text(json.dumps(self.current))
+            argv = ["--symbols", "4", "--days", "30", "--repeat", "1", "--only", "validate", "--baseline", str(path)]
+            self.assertEqual(main(argv), 1)
+            self.assertEqual(main(argv + ["--threshold", "1e12", "--memory-threshold", "1e12"]), 0)
+
+    def test_service_benchmark_skipped_without_service(self):
+        env = {key: value for key, value in os.environ.items() if key != "DATABASE_URL"}
+        with patch.dict(os.environ, env, clear=True):
+            results = run_suite(4, 30, repeat=1, names=["copy_pack", "postgres_load"])
+        self.assertEqual(list(results), ["copy_pack"])
+
+
+if __name__ == '__main__':
+    unittest.main()
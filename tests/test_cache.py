@@ -0,0 +1,152 @@
+"""
+Test the bar cache
+
+This script is responsible for:
+- Testing that warm reads make no calls to the data source
+- Testing incremental tail refreshes and LRU eviction
+- Testing that cache hits do not rewrite the index until it is flushed
+- Testing that a dropped cache is freed and flushes its access times
+- Testing concurrent writes of the same entry
+- Testing that a request for a longer lookback refetches a shorter entry
+"""
+
+import gc
+import tempfile
+import time
+import unittest
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+from app.data.cache import BarCache, period_covering
+from app.data.sources.base_class import DataSource
+
+
+class CountingSource(DataSource):
+    """Offline source serving a fixed daily history and recording each call"""
+
+    def __init__(self, days: int = 10, **kwargs):
+        super().__init__(**kwargs)
+        self.days = days
+        self.calls = []
+
+    def fetch_data(self, symbol: str, period="1y", interval="1d", start=None) -> pd.DataFrame:
+        self.calls.append((symbol, start))
+        data = self._standardize_data(self._fetch_raw_data(symbol, period, interval), symbol)
+        if start is not None:
+            data = data[data["ts"] >= start]
+        return data.reset_index(drop=True)
+
+    def _fetch_raw_data(self, symbol: str, period=str, interval=str) -> pd.DataFrame:
+        ts = pd.date_range("2024-01-01", periods=self.days, freq="D", tz="UTC")
+        close = [100.0 + i for i in range(self.days)]
+        return pd.DataFrame({"timestamp": ts, "open": close, "high": close, "low": close,
+                             "close": close, "volume": 1000})
+
+
+class TestBarCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = BarCache(self.tmp.name)
+        self.source = CountingSource()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_warm_read_makes_no_calls(self):
+        cold = self.cache.fetch(self.source, "AAPL")
+        warm = self.cache.fetch(self.source, "AAPL")
+
+        self.assertEqual(len(self.source.calls), 1)
+        pd.testing.assert_frame_equal(cold, warm)
+
+    def test_index_survives_restart(self):
+        self.cache.fetch(self.source, "AAPL")
+        reopened = BarCache(self.tmp.name)
+        reopened.fetch(self.source, "AAPL")
+
+        self.assertEqual(len(self.source.calls), 1)
+        self.assertEqual(reopened.last_timestamp("counting", "AAPL", "1d"), pd.Timestamp("2024-01-10", tz="UTC"))
+
+    def test_stale_entry_fetches_only_tail(self):
+        self.cache.fetch(self.source, "AAPL")
+        self.cache._index[BarCache.key("counting", "AAPL", "1d")]["refreshed_at"] = time.time() - 2 * 86400
+
+        self.source.days = 12
+        data = self.cache.fetch(self.source, "AAPL")
+
+        self.assertEqual(self.source.calls[-1], ("AAPL", pd.Timestamp("2024-01-10", tz="UTC")))
+        self.assertEqual(len(data), 12)
+        self.assertFalse(data["ts"].duplicated().any())
+
+    def test_longer_period_refetches(self):
+        self.cache.fetch(self.source, "AAPL", period="1mo")
+        self.cache.fetch(self.source, "AAPL", period="5d")
+        self.assertEqual(len(self.source.calls), 1)
+
+        self.cache.fetch(self.source, "AAPL", period="5y")
+        self.assertEqual(len(self.source.calls), 2)
+        self.assertTrue(self.cache.covers("counting", "AAPL", "1d", "1y"))
+
+    def test_period_covering(self):
+        now = pd.Timestamp("2024-06-30", tz="UTC")
+        self.assertEqual(period_covering("2024-06-01", "1d", now), "1mo")
+        self.assertEqual(period_covering("2020-01-01", "1d", now), "5y")
+        self.assertEqual(period_covering("2000-01-01", "1d", now), "max")
+        # Intraday history is capped by what the source keeps
+        self.assertEqual(period_covering("2020-01-01", "1m", now), "5d")
+        self.assertEqual(period_covering(None, "1d", now), "1y")
+
+    def test_hits_do_not_rewrite_index(self):
+        self.cache.fetch(self.source, "AAPL")
+        written = self.cache.index_path.stat().st_mtime_ns
+        self.cache.get("counting", "AAPL", "1d")
+        self.cache.get("counting", "AAPL", "1d")
+        self.assertEqual(self.cache.index_path.stat().st_mtime_ns, written)
+
+        accessed = self.cache._index[BarCache.key("counting", "AAPL", "1d")]["last_access"]
+        self.cache.flush()
+        reopened = BarCache(self.tmp.name)
+        self.assertEqual(reopened._index[BarCache.key("counting", "AAPL", "1d")]["last_access"], accessed)
+        self.assertEqual(list(self.cache.cache_dir.glob("*.tmp")), [])
+
+    def test_dropped_cache_is_freed_and_flushed(self):
+        self.cache.fetch(self.source, "AAPL")
+        cache = BarCache(self.tmp.name)
+        cache.get("counting", "AAPL", "1d")
+        accessed = cache._index[BarCache.key("counting", "AAPL", "1d")]["last_access"]
+
+        ref = weakref.ref(cache)
+        del cache
+        gc.collect()
+        self.assertIsNone(ref())
+        reopened = BarCache(self.tmp.name)
+        self.assertEqual(reopened._index[BarCache.key("counting", "AAPL", "1d")]["last_access"], accessed)
+
+    def test_concurrent_puts_of_one_entry(self):
+        data = self.source.fetch_data("AAPL")
+
+        def put(_):
+            self.cache.put("counting", "AAPL", "1d", data)
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            list(pool.map(put, range(32)))
+
+        pd.testing.assert_frame_equal(self.cache.get("counting", "AAPL", "1d"), data)
+        self.assertEqual(list(self.cache.cache_dir.rglob("*.tmp")), [])
+
+    def test_lru_eviction(self):
+        self.cache.fetch(self.source, "AAA")
+        entry_bytes = self.cache.size_bytes()
+        self.cache.max_bytes = int(entry_bytes * 2.5)
+
+        self.cache.fetch(self.source, "BBB")
+        self.cache.get("counting", "AAA", "1d")
+        self.cache.fetch(self.source, "CCC")
+
+        self.assertIsNotNone(self.cache.get("counting", "AAA", "1d"))
+        self.assertIsNone(self.cache.get("counting", "BBB", "1d"))
+        self.assertLessEqual(self.cache.size_bytes(), self.cache.max_bytes)
+
+
+if __name__ == '__main__':
+    unittest.main()
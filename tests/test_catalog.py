@@ -0,0 +1,124 @@
+"""
+Test the data catalog
+
+This script is responsible for:
+- Testing source registration in the DataCatalog, including lazily resolved sources
+- Testing concurrent bulk fetches with rate limiting and retries
+"""
+
+import tempfile
+import threading
+import time
+import unittest
+import pandas as pd
+from app.data.catalog import DataCatalog
+from app.data.sources.base_class import DataSource, RateLimitError
+from app.data.sources.rate_limiter import TokenBucket
+
+
+class FakeSource(DataSource):
+    """Offline source that can fail a few calls per symbol with a server-side rate limit"""
+
+    def __init__(self, throttle: dict = None, **kwargs):
+        super().__init__(**kwargs)
+        self.throttle = dict(throttle or {})
+        self.lock = threading.Lock()
+
+    def fetch_data(self, symbol: str, period="1y", interval="1d", start=None) -> pd.DataFrame:
+        self.check_rate_limit()
+        with self.lock:
+            if self.throttle.get(symbol, 0) > 0:
+                self.throttle[symbol] -= 1
+                raise RateLimitError("429 from server")
+        if symbol == "BAD":
+            raise ValueError("unknown symbol")
+        data = self._standardize_data(self._fetch_raw_data(symbol, period, interval), symbol)
+        self._record_request()
+        return data
+
+    def _fetch_raw_data(self, symbol: str, period=str, interval=str) -> pd.DataFrame:
+        ts = pd.date_range("2024-01-01", periods=3, freq="D", tz="UTC")
+        return pd.DataFrame({"timestamp": ts, "open": 1.0, "high": 1.0, "low": 1.0, "close": 1.0, "volume": 10})
+
+
+class TestTokenBucket(unittest.TestCase):
+
+    def test_unlimited(self):
+        bucket = TokenBucket()
+        self.assertTrue(all(bucket.try_acquire() for _ in range(1000)))
+        self.assertEqual(bucket.wait_time(), 0.0)
+
+    def test_burst_then_wait(self):
+        bucket = TokenBucket(rate=10.0, capacity=2)
+        self.assertTrue(bucket.try_acquire())
+        self.assertTrue(bucket.try_acquire())
+        self.assertFalse(bucket.try_acquire())
+        self.assertGreater(bucket.wait_time(), 0.0)
+        time.sleep(0.15)
+        self.assertTrue(bucket.try_acquire())
+
+
+class TestDataCatalog(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.catalog = DataCatalog(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_default_source_registered(self):
+        self.assertIn("yahoo", self.catalog.get_data_sources())
+        with self.assertRaises(ValueError):
+            self.catalog.add_data_source(self.catalog.get_data_source("yahoo"))
+
+    def test_sources_resolve_on_first_use(self):
+        catalog = DataCatalog(self.tmp.name, sources=["yahoo"])
+        self.assertEqual(catalog._sources, {"yahoo": None})
+        self.assertEqual(catalog.get_data_sources(), ["yahoo"])
+
+        source = catalog.get_data_source("yahoo")
+        self.assertIs(catalog.data_sources["yahoo"], source)
+        with self.assertRaises(ValueError):
+            catalog.register_source("yahoo")
+        broken = DataCatalog(self.tmp.name, sources=["nope"])
+        # A source that failed to load fails the same way on every lookup
+        for _ in range(2):
+            with self.assertRaises(ValueError):
+                broken.get_data_source("nope")
+
+    def test_get_data_many_merges_long_format(self):
+        self.catalog.add_data_source(FakeSource())
+        data = self.catalog.get_data_many(["MSFT", "AAPL", "MSFT"], "2024-01-01", "2024-01-03", source_name="fake")
+
+        self.assertEqual(len(data), 6)
+        self.assertFalse(data.duplicated(["ts", "symbol"]).any())
+        self.assertEqual(list(data["symbol"][:2]), ["AAPL", "MSFT"])
+        self.assertEqual(data.attrs["failed_symbols"], {})
+
+    def test_get_data_trims_to_range(self):
+        self.catalog.add_data_source(FakeSource())
+        data = self.catalog.get_data("AAPL", "2024-01-02", "2024-01-02", source_name="fake")
+        self.assertEqual(list(data["ts"]), [pd.Timestamp("2024-01-02", tz="UTC")])
+
+    def test_get_data_many_retries_and_paces(self):
+        source = FakeSource(throttle={"AAPL": 2}, requests_per_second=50.0, burst=2)
+        self.catalog.add_data_source(source)
+        symbols = ["AAPL", "MSFT", "GOOG", "AMZN", "KO", "PEP"]
+        data = self.catalog.get_data_many(symbols, "2024-01-01", "2024-01-03", source_name="fake",
+                                          max_workers=4, backoff=0.001)
+
+        self.assertEqual(sorted(data["symbol"].unique()), sorted(symbols))
+        self.assertEqual(source.request_count, len(symbols))
+
+    def test_get_data_many_reports_failures(self):
+        self.catalog.add_data_source(FakeSource(throttle={"MSFT": 10}))
+        data = self.catalog.get_data_many(["AAPL", "MSFT", "BAD"], "2024-01-01", "2024-01-03",
+                                          source_name="fake", max_retries=1, backoff=0.001)
+
+        self.assertEqual(set(data["symbol"]), {"AAPL"})
+        self.assertEqual(set(data.attrs["failed_symbols"]), {"MSFT", "BAD"})
+
+
+if __name__ == '__main__':
+    unittest.main()
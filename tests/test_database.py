@@ -0,0 +1,103 @@
+"""
+Test the Postgres price database
+
+This script is responsible for:
+- Testing the COPY BINARY packing used for loads (runs offline)
+- Testing COPY loads, upserts and chunked reads against a live Postgres
+  (skipped unless $DATABASE_URL points at one with init.sql applied)
+- Packing and load throughput are measured by the benchmark suite
+  (copy_pack, postgres_load in benchmarks/suite.py), not here
+"""
+
+import os
+import struct
+import unittest
+import uuid
+import numpy as np
+import pandas as pd
+from app.data.database import COPY_HEADER, COPY_TRAILER, PG_EPOCH_US, PriceDatabase, _binary_buffer
+
+
+def make_bars(symbols, periods: int, start: str = "2024-01-01") -> pd.DataFrame:
+    ts = pd.date_range(start, periods=periods, freq="min", tz="UTC")
+    frames = [pd.DataFrame({"ts": ts, "symbol": symbol, "open": 1.5, "high": 2.0, "low": 1.0, "close": 1.25,
+                            "volume": np.arange(periods, dtype=float)}) for symbol in symbols]
+    return pd.concat(frames, ignore_index=True)
+
+
+def connect():
+    if not os.environ.get("DATABASE_URL"):
+        return None
+    try:
+        return PriceDatabase(max_connections=2, chunk_rows=50_000)
+    except Exception:
+        return None
+
+
+class TestBinaryBuffer(unittest.TestCase):
+
+    def test_rows_in_stage_column_order(self):
+        bars = make_bars(["AAA", "BBBB"], 2)
+        bars.loc[1, "close"] = np.nan
+        raw = _binary_buffer(bars).read()
+
+        self.assertTrue(raw.startswith(COPY_HEADER))
+        self.assertTrue(raw.endswith(COPY_TRAILER))
+        # fields, then (length, value) for symbol, ts and the five float8 columns
+        row = ">hi3siq" + "id" * 5
+        first = struct.unpack_from(row, raw, len(COPY_HEADER))
+        self.assertEqual(first[:5], (7, 3, b"AAA", 8, 1_704_067_200_000_000 - PG_EPOCH_US))
+        self.assertEqual(first[6::2], (1.5, 2.0, 1.0, 1.25, 0.0))
+        second = struct.unpack_from(row, raw, len(COPY_HEADER) + struct.calcsize(row))
+        self.assertTrue(np.isnan(second[12]))
+        # Rows are grouped per symbol; the longer symbol gets its own record layout
+        self.assertEqual(len(raw), len(COPY_HEADER) + 2 * struct.calcsize(row)
+                         + 2 * struct.calcsize(">hi4siq" + "id" * 5) + len(COPY_TRAILER))
+
+
+class TestPriceDatabase(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.db = connect()
+        if cls.db is None:
+            raise unittest.SkipTest("DATABASE_URL not set or Postgres not reachable")
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.db.close()
+
+    def setUp(self):
+        self.prefix = f"T{uuid.uuid4().hex[:6].upper()}"
+
+    def tearDown(self):
+        with self.db.connection() as conn, conn.cursor() as cur:
+            cur.execute("DELETE FROM price_data WHERE symbol LIKE %s", (f"{self.prefix}%",))
+
+    def test_upsert_and_chunked_read(self):
+        symbols = [f"{self.prefix}A", f"{self.prefix}B"]
+        self.db.write(make_bars(symbols, 100))
+        update = make_bars(symbols[:1], 10).assign(close=9.0)
+        self.db.write(update)
+
+        chunks = list(self.db.iter_read(symbols, chunk_rows=30))
+        data = pd.concat(chunks, ignore_index=True)
+        self.assertEqual(len(chunks), 7)
+        self.assertEqual(len(data), 200)
+        self.assertEqual(str(data["ts"].dt.tz), "UTC")
+        first = data[data["symbol"] == symbols[0]].head(10)
+        self.assertTrue((first["close"] == 9.0).all())
+
+    def test_intervals_are_separate_series(self):
+        symbol = f"{self.prefix}A"
+        self.db.write(make_bars([symbol], 5))
+        self.db.write(make_bars([symbol], 5).assign(close=7.0), interval="1m")
+
+        self.assertTrue((self.db.read([symbol])["close"] == 1.25).all())
+        minutes = self.db.read([symbol], interval="1m")
+        self.assertEqual(len(minutes), 5)
+        self.assertTrue((minutes["close"] == 7.0).all())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+"""
+Test distributed ingestion
+
+This script is responsible for:
+- Testing the Arrow IPC encoding of cached bars and the job encoding (run offline)
+- Testing the Redis job queue, shared bar cache and fleet-wide rate limit
+  against a live Redis (skipped unless $REDIS_URL points at one)
+"""
+
+import os
+import tempfile
+import time
+import unittest
+import uuid
+import pandas as pd
+from app.data.catalog import DataCatalog
+from app.data.distributed import IngestJob, IngestQueue, RedisBarCache, connect, from_ipc, to_ipc
+from app.data.ingestor import run_worker
+from app.data.sources.rate_limiter import RedisTokenBucket
+from app.data.store import BarStore
+from tests.test_ingestor import StreamSource
+
+
+def redis_client():
+    if not os.environ.get("REDIS_URL"):
+        return None
+    try:
+        client = connect()
+        client.ping()
+        return client
+    except Exception:
+        return None
+
+
+class TestEncoding(unittest.TestCase):
+
+    def test_ipc_round_trip(self):
+        ts = pd.date_range("2024-01-01", periods=3, freq="D", tz="UTC")
+        data = pd.DataFrame({"ts": ts, "symbol": pd.Categorical(["AAA"] * 3), "open": [1.0, 2.0, 3.0],
+                             "high": 3.0, "low": 0.5, "close": 2.0, "volume": [10.0, None, 30.0]})
+        pd.testing.assert_frame_equal(from_ipc(to_ipc(data)), data)
+
+    def test_job_round_trip(self):
+        job = IngestJob("AAPL", "1h", "2024-01-01")
+        self.assertEqual(IngestJob.decode(job.encode()), job)
+
+
+class TestRedis(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.client = redis_client()
+        if cls.client is None:
+            raise unittest.SkipTest("REDIS_URL not set or Redis not reachable")
+
+    def setUp(self):
+        self.name = f"test-{uuid.uuid4().hex[:8]}"
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        IngestQueue(self.client, self.name).clear()
+        for key in self.client.scan_iter(f"{self.name}*"):
+            self.client.delete(key)
+        self.tmp.cleanup()
+
+    def test_workers_share_queue(self):
+        producer = IngestQueue(self.client, self.name)
+        self.assertEqual(producer.enqueue(["AAA", "BBB", "BAD", "AAA"], start_date="2024-01-01"), 3)
+
+        store = BarStore(f"{self.tmp.name}/bars")
+        written = 0
+        for worker in ("w1", "w2"):
+            catalog = DataCatalog(self.tmp.name, use_cache=False, sources=[])
+            catalog.add_data_source(StreamSource())
+            written += run_worker(IngestQueue(self.client, self.name, worker_id=worker), catalog, store,
+                                  threads=2, idle_timeout=0.5)
+
+        self.assertEqual(written, 10)
+        self.assertEqual(store.list_symbols(), ["AAA", "BBB"])
+        self.assertEqual(list(producer.failed()), ["BAD"])
+        self.assertEqual(producer.pending(), 0)
+
+    def test_recover_requeues_claimed_jobs(self):
+        queue = IngestQueue(self.client, self.name, worker_id="crashed")
+        queue.enqueue(["AAA"])
+        self.assertEqual(queue.pop().symbol, "AAA")
+        self.assertEqual(queue.pending(), 0)
+        self.assertEqual(queue.recover(), 1)
+        self.assertEqual(queue.pending(), 1)
+
+    def test_shared_cache_serves_other_catalogs(self):
+        source = StreamSource()
+        first = DataCatalog(self.tmp.name, use_cache=False, sources=[])
+        first.add_data_source(source)
+        first.attach_redis(self.client)
+        first.shared_cache = RedisBarCache(self.client, prefix=self.name)
+        first.get_data("AAA", "2024-01-01", "2024-01-05")
+
+        other = StreamSource()
+        second = DataCatalog(self.tmp.name, use_cache=False, sources=[])
+        second.add_data_source(other)
+        second.shared_cache = RedisBarCache(self.client, prefix=self.name)
+        data = second.get_data("AAA", "2024-01-01", "2024-01-05")
+
+        self.assertEqual(len(data), 5)
+        self.assertEqual((source.started, other.started), (1, 0))
+
+    def test_rate_limit_shared_between_buckets(self):
+        key = f"{self.name}:bucket"
+        a = RedisTokenBucket(self.client, key, rate=1.0, capacity=2)
+        b = RedisTokenBucket(self.client, key, rate=1.0, capacity=2)
+
+        self.assertTrue(a.try_acquire())
+        self.assertTrue(b.try_acquire())
+        self.assertFalse(a.try_acquire())
+        self.assertGreater(b.wait_time(), 0.5)
+        time.sleep(1.1)
+        self.assertTrue(b.try_acquire())
+
+
+if __name__ == '__main__':
+    unittest.main()
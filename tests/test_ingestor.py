@@ -0,0 +1,99 @@
+"""
+Test the streaming ingestor
+
+This script is responsible for:
+- Testing that symbols are validated and written to the bar store one by one
+- Testing that bad bars are dropped and local timestamps normalized instead of failing the symbol
+- Testing that the download queue stays bounded and can be abandoned early
+"""
+
+import tempfile
+import threading
+import time
+import unittest
+import pandas as pd
+from app.data.catalog import DataCatalog
+from app.data.ingestor import ingest
+from app.data.sources.base_class import DataSource
+from app.data.store import BarStore
+
+
+class StreamSource(DataSource):
+    """Offline source; DUP returns a duplicated bar, NAN a bar without close, BAD raises"""
+
+    def __init__(self, periods: int = 5, **kwargs):
+        super().__init__(**kwargs)
+        self.periods = periods
+        self.lock = threading.Lock()
+        self.started = 0
+
+    def fetch_data(self, symbol: str, period="1y", interval="1d", start=None) -> pd.DataFrame:
+        with self.lock:
+            self.started += 1
+        if symbol == "BAD":
+            raise ValueError("unknown symbol")
+        return self._standardize_data(self._fetch_raw_data(symbol, period, interval), symbol)
+
+    def _fetch_raw_data(self, symbol: str, period=str, interval=str) -> pd.DataFrame:
+        ts = pd.date_range("2024-01-01", periods=self.periods, freq="D", tz="UTC")
+        data = pd.DataFrame({"timestamp": ts, "open": 1.0, "high": 1.0, "low": 1.0, "close": 1.0, "volume": 10.0})
+        if symbol == "DUP":
+            data = pd.concat([data, data.iloc[[0]]], ignore_index=True)
+        if symbol == "NAN":
+            data.loc[2, "close"] = float("nan")
+        return data
+
+
+class TestIngest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.catalog = DataCatalog(self.tmp.name, use_cache=False, sources=[])
+        self.store = BarStore(f"{self.tmp.name}/bars")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_streams_valid_symbols_into_store(self):
+        self.catalog.add_data_source(StreamSource())
+        written = ingest(["AAA", "BBB", "BAD", "DUP"], "2024-01-01", "2024-01-05",
+                         catalog=self.catalog, store=self.store, max_workers=2, queue_size=1)
+
+        self.assertEqual(written, 10)
+        self.assertEqual(self.store.list_symbols(), ["AAA", "BBB"])
+        self.assertEqual(len(self.store.read()), 10)
+
+    def test_bad_bars_are_dropped(self):
+        self.catalog.add_data_source(StreamSource())
+        written = ingest(["NAN"], "2024-01-01", "2024-01-05", catalog=self.catalog, store=self.store)
+
+        self.assertEqual(written, 4)
+        self.assertNotIn(pd.Timestamp("2024-01-03", tz="UTC"), set(self.store.read()["ts"]))
+
+    def test_local_timestamps_are_normalized(self):
+        source = StreamSource()
+        # A source still returning exchange-local timestamps
+        source.fetch_data = lambda symbol, **kwargs: pd.DataFrame({
+            "ts": pd.date_range("2024-01-01 09:30", periods=5, freq="D", tz="America/New_York"),
+            "symbol": symbol, "open": 1.0, "high": 1.0, "low": 1.0, "close": 1.0, "volume": 10.0})
+        self.catalog.add_data_source(source)
+        written = ingest(["AAA"], "2024-01-01", "2024-01-05", catalog=self.catalog, store=self.store)
+
+        self.assertEqual(written, 5)
+        self.assertEqual(self.store.read()["ts"].iloc[0], pd.Timestamp("2024-01-01 14:30", tz="UTC"))
+
+    def test_queue_is_bounded(self):
+        source = StreamSource()
+        self.catalog.add_data_source(source)
+        stream = self.catalog.iter_data_many([f"S{i}" for i in range(20)], "2024-01-01", "2024-01-05",
+                                             max_workers=2, queue_size=1)
+        next(stream)
+        time.sleep(0.2)
+        # One consumed, one queued, two workers blocked on put()
+        self.assertLessEqual(source.started, 4)
+        stream.close()
+        self.assertLessEqual(source.started, 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+"""
+Test the instrumentation and profiling hooks
+
+This script is responsible for:
+- Testing stage counters, latency histograms and the process-wide recorder
+- Testing the backtest engine's per-run timing breakdown
+- Testing that both profiler modes write their output files
+"""
+
+import pstats
+import tempfile
+import unittest
+from pathlib import Path
+from app.alpha.momentum import MomentumStrategy
+from app.backtest.engine import BacktestEngine
+from app.core import instrument
+from app.core.profiler import profile
+from app.data.sources.yahoo_source import YahooSource
+from benchmarks.synthetic import synthetic_bars, synthetic_raw
+
+
+class TestRecorder(unittest.TestCase):
+
+    def test_stage_histogram(self):
+        stage = instrument.Stage("x")
+        for ns in [1_000] * 98 + [1_000_000, 2_000_000]:
+            stage.record(ns, rows=2)
+
+        summary = stage.summary()
+        self.assertEqual((summary["calls"], summary["rows"]), (100, 200))
+        # Bucket upper edges: 1,000ns -> 1,024ns
+        self.assertAlmostEqual(summary["p50_us"], 1.024)
+        self.assertGreaterEqual(summary["p99_us"], 1_000)
+        self.assertEqual(summary["max_us"], 2_000)
+
+    def test_wrap_only_when_active(self):
+        fn = len
+        self.assertIsNone(instrument.active())
+        self.assertIs(instrument.wrap_if_active("len", fn), fn)
+
+        with instrument.recording() as recorder:
+            wrapped = instrument.wrap_if_active("len", fn, rows=lambda args, result: result)
+            self.assertEqual(wrapped("abc"), 3)
+        self.assertIsNone(instrument.active())
+        self.assertEqual(recorder.stages["len"].rows, 3)
+
+    def test_decorated_source_stage(self):
+        source = YahooSource()
+        raw = synthetic_raw(30)
+        source._standardize_data(raw, "AAA")
+
+        with instrument.recording() as recorder:
+            source._standardize_data(raw, "AAA")
+        self.assertEqual(recorder.stages["standardize_data"].calls, 1)
+        self.assertEqual(recorder.stages["standardize_data"].rows, 30)
+
+
+class TestEngineTimings(unittest.TestCase):
+
+    def setUp(self):
+        self.bars = synthetic_bars(5, 40)
+
+    def test_off_by_default(self):
+        result = BacktestEngine(MomentumStrategy(5, 2)).run(self.bars)
+        self.assertIsNone(result.timings)
+
+    def test_event_breakdown(self):
+        result = BacktestEngine(MomentumStrategy(5, 2), timings=True).run(self.bars)
+
+        timings = result.timings
+        self.assertEqual(set(timings.index), {"on_bar", "simulate", "apply_fills", "mark_to_market"})
+        self.assertEqual(timings.loc["on_bar", "calls"], 40)
+        self.assertEqual(timings.loc["on_bar", "rows"], 200)
+        self.assertEqual(list(timings.columns), instrument.SUMMARY_COLUMNS)
+
+    def test_vectorized_breakdown_merges_into_recorder(self):
+        with instrument.recording() as recorder:
+            result = BacktestEngine(MomentumStrategy(5, 2)).run(self.bars, mode="vectorized")
+            BacktestEngine(MomentumStrategy(5, 2)).run(self.bars, mode="vectorized")
+
+        self.assertEqual(set(result.timings.index), {"targets", "simulate_matrix"})
+        self.assertEqual(result.timings.loc["targets", "calls"], 1)
+        self.assertEqual(recorder.stages["targets"].calls, 2)
+
+
+class TestProfiler(unittest.TestCase):
+
+    def test_sample_writes_folded_stacks(self):
+        bars = synthetic_bars(20, 120)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "run.folded"
+            with profile(path, mode="sample", interval=0.0005):
+                BacktestEngine(MomentumStrategy(5, 2)).run(bars)
+            lines = path.read_text().splitlines()
+
+        self.assertTrue(lines)
+        stack, count = lines[0].rsplit(" ", 1)
+        self.assertGreater(int(count), 0)
+        self.assertTrue(stack.startswith("MainThread;"))
+        self.assertTrue(any("engine.py:_run_event" in line for line in lines))
+
+    def test_cprofile_writes_stats(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "run.prof"
+            with profile(path, mode="cprofile"):
+                BacktestEngine(MomentumStrategy(5, 2)).run(synthetic_bars(3, 10))
+            stats = pstats.Stats(str(path))
+
+        self.assertTrue(any(func[2] == "_run_event" for func in stats.stats))
+
+    def test_unknown_mode(self):
+        with self.assertRaises(ValueError):
+            with profile("unused", mode="perf"):
+                pass
+
+
+if __name__ == '__main__':
+    unittest.main()
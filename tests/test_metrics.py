@@ -0,0 +1,87 @@
+"""
+Test the performance metrics
+
+This script is responsible for:
+- Checking batch metrics against hand-computed values
+- Checking that stacked runs match one-at-a-time runs
+- Checking that streaming metrics agree with batch metrics
+"""
+
+import math
+import unittest
+import numpy as np
+import pandas as pd
+from app.alpha.momentum import MomentumStrategy
+from app.metrics.performance import METRIC_NAMES, StreamingMetrics, backtest_metrics, compute_metrics
+from app.paper.feed import ReplayFeed
+from app.paper.runtime import PaperTrader
+
+
+def random_curves(runs: int = 5, n: int = 300, seed: int = 0) -> tuple[np.ndarray, np.ndarray]:
+    rng = np.random.default_rng(seed)
+    equity = 1e6 * np.exp(np.cumsum(rng.normal(0.0003, 0.01, (runs, n)), axis=1))
+    equity[:, 10:15] = equity[:, 9:10]  # flat stretch
+    traded = np.where(rng.random((runs, n)) < 0.2, rng.uniform(0, 5e4, (runs, n)), 0.0)
+    return equity, traded
+
+
+class TestBatchMetrics(unittest.TestCase):
+
+    def test_hand_computed(self):
+        metrics = compute_metrics([100.0, 110.0, 99.0, 121.0], traded=[0, 50, 0, 50], periods_per_year=3)
+
+        self.assertAlmostEqual(metrics["total_return"], 0.21)
+        self.assertAlmostEqual(metrics["cagr"], 0.21)
+        self.assertAlmostEqual(metrics["max_drawdown"], -0.1)
+        self.assertAlmostEqual(metrics["hit_rate"], 2 / 3)
+        self.assertAlmostEqual(metrics["turnover"], 100 / 107.5)
+        returns = np.array([0.1, -0.1, 121 / 99 - 1])
+        self.assertAlmostEqual(metrics["sharpe"], returns.mean() / returns.std(ddof=1) * math.sqrt(3))
+
+    def test_stacked_runs_match_single_runs(self):
+        equity, traded = random_curves()
+        stacked = compute_metrics(equity, traded, initial=1e6)
+        for i in range(len(equity)):
+            single = compute_metrics(equity[i], traded[i], initial=1e6)
+            for name in METRIC_NAMES:
+                self.assertAlmostEqual(stacked[name][i], single[name], places=12)
+
+    def test_short_curves(self):
+        self.assertTrue(math.isnan(compute_metrics([100.0])["sharpe"]))
+        self.assertEqual(compute_metrics([100.0], initial=100.0)["max_drawdown"], 0.0)
+
+
+class TestStreamingMetrics(unittest.TestCase):
+
+    def assert_agree(self, streaming: dict, batch: dict):
+        for name in METRIC_NAMES:
+            if math.isnan(batch[name]):
+                self.assertTrue(math.isnan(streaming[name]), name)
+            else:
+                self.assertAlmostEqual(streaming[name], batch[name], delta=1e-9 * max(1.0, abs(batch[name])),
+                                       msg=name)
+
+    def test_streaming_matches_batch(self):
+        equity, traded = random_curves(runs=2)
+        for initial in (None, 1e6):
+            metrics = StreamingMetrics(initial=initial)
+            for e, t in zip(equity[0], traded[0]):
+                metrics.update(e, t)
+            self.assert_agree(metrics.snapshot(), compute_metrics(equity[0], traded[0], initial=initial))
+
+    def test_paper_session_matches_backtest_metrics(self):
+        rng = np.random.default_rng(4)
+        ts = pd.date_range("2024-01-01", periods=60, freq="D", tz="UTC")
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, (60, 4)), axis=0))
+        bars = pd.DataFrame([{"ts": t, "symbol": f"S{j}", "open": c, "high": c, "low": c, "close": c,
+                              "volume": 1.0} for i, t in enumerate(ts) for j, c in enumerate(close[i])])
+
+        trader = PaperTrader(ReplayFeed(bars))
+        session = trader.add(MomentumStrategy(5, 2, 10_000), initial_cash=100_000)
+        trader.run_sync()
+
+        self.assert_agree(session.metrics.snapshot(), backtest_metrics(session.portfolio, session.trades_log))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+"""
+Test the momentum strategy
+
+This script is responsible for:
+- Testing the momentum strategy on the alpha_momentum_plan dataset
+- Checking that the event and vectorized modes agree
+"""
+
+import unittest
+import numpy as np
+import pandas as pd
+from app.alpha.momentum import MomentumStrategy
+from app.backtest.engine import BacktestEngine
+
+
+def make_bars(closes: dict) -> pd.DataFrame:
+    frames = []
+    for symbol, series in closes.items():
+        ts = pd.date_range("2024-01-01", periods=len(series), freq="D", tz="UTC")
+        frames.append(pd.DataFrame({"ts": ts, "symbol": symbol, "open": series, "high": series,
+                                    "low": series, "close": series, "volume": 1000.0}))
+    return pd.concat(frames, ignore_index=True)
+
+
+class TestMomentumStrategy(unittest.TestCase):
+
+    def setUp(self):
+        days = np.arange(30)
+        self.bars = make_bars({
+            "AAA": 100 + days * 1.0,
+            "BBB": np.full(30, 100.0),
+            "CCC": 100 - days * 1.0,
+        })
+
+    def test_plan_dataset(self):
+        """AAA and BBB are held with K=2, and nothing trades after the initial buys"""
+        strategy = MomentumStrategy(lookback_days=5, top_k=2, dollar_per_position=1_000)
+        engine = BacktestEngine(strategy, initial_cash=100_000)
+        result = engine.run(self.bars)
+
+        bought = {t["symbol"] for t in result.trades_log if t["qty"] > 0}
+        self.assertEqual(bought, {"AAA", "BBB"})
+        self.assertEqual(set(engine.portfolio.positions), {"AAA", "BBB"})
+        self.assertEqual(len(result.equity_timeseries), 30)
+
+    def test_event_vectorized_parity(self):
+        """Both engine modes produce the same trades and equity"""
+        rng = np.random.default_rng(7)
+        closes = {f"S{i}": 50 * np.exp(np.cumsum(rng.normal(0, 0.03, 80))) for i in range(10)}
+        bars = make_bars(closes)
+        bars = bars.drop(rng.choice(len(bars), 40, replace=False)).reset_index(drop=True)
+
+        params = {"lookback_days": 10, "top_k": 3, "dollar_per_position": 5_000}
+        event = BacktestEngine(MomentumStrategy(**params), initial_cash=12_000).run(bars)
+        vector = BacktestEngine(MomentumStrategy(**params), initial_cash=12_000).run(bars, mode="vectorized")
+
+        self.assertEqual(list(event.trades_log), list(vector.trades_log))
+        np.testing.assert_allclose([r["equity"] for r in event.equity_timeseries],
+                                   [r["equity"] for r in vector.equity_timeseries])
+
+    def test_invalid_params(self):
+        with self.assertRaises(ValueError):
+            MomentumStrategy(lookback_days=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+"""
+Test the order and fill representations
+
+This script is responsible for:
+- Testing the symbol table and columnar order/fill batches
+- Checking that batch and record paths through Broker/Portfolio agree
+- Testing the trades log exports
+"""
+
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+from app.backtest.broker import Broker
+from app.backtest.order import Fill, FillBatch, Order, OrderBatch, SymbolTable, TradesLog
+from app.backtest.portfolio import Portfolio
+
+TS = pd.Timestamp("2024-01-02", tz="UTC")
+
+
+class TestBatches(unittest.TestCase):
+
+    def test_slots(self):
+        order = Order(ts=TS, symbol="AAPL", qty=5)
+        self.assertFalse(hasattr(order, "__dict__"))
+        self.assertFalse(hasattr(Fill(ts=TS, symbol="AAPL", qty=5, price=1.0), "__dict__"))
+
+    def test_symbol_table(self):
+        table = SymbolTable(["AAPL", "MSFT"])
+        self.assertEqual(table.codes(["MSFT", "KO", "AAPL"]).tolist(), [1, 2, 0])
+        self.assertEqual(table.symbol(2), "KO")
+        self.assertEqual(len(table), 3)
+
+    def test_order_batch_roundtrip(self):
+        table = SymbolTable()
+        orders = [Order(ts=TS, symbol="AAPL", qty=5), Order(ts=TS, symbol="MSFT", qty=-3)]
+        batch = OrderBatch.from_orders(orders, table)
+        self.assertEqual(batch.symbol_id.dtype, np.int32)
+        self.assertEqual(batch.to_orders(), orders)
+
+    def test_broker_batch_matches_records(self):
+        table = SymbolTable()
+        orders = [Order(ts=TS, symbol="AAPL", qty=5), Order(ts=TS, symbol="NAN", qty=1),
+                  Order(ts=TS, symbol="MSFT", qty=0), Order(ts=TS, symbol="KO", qty=-2)]
+        prices = {"AAPL": 100.0, "MSFT": 50.0, "KO": 60.0}
+
+        records = Broker().simulate(orders, prices)
+        batch = Broker().simulate(OrderBatch.from_orders(orders, table), prices)
+        self.assertIsInstance(batch, FillBatch)
+        self.assertEqual(batch.to_fills(), [Fill(ts=f.ts, symbol=f.symbol, qty=f.qty, price=f.price) for f in records])
+
+    def test_portfolio_batch_matches_records(self):
+        fills = [Fill(TS, "AAA", 30, 100.0), Fill(TS, "BBB", -5, 10.0), Fill(TS, "CCC", 50, 20.0),
+                 Fill(TS, "BBB", -10, 10.0), Fill(TS, "DDD", 3, 5.0)]
+        by_record, by_batch = Portfolio(4_000), Portfolio(4_000)
+        by_record.positions = {"BBB": 12}
+        by_batch.positions = {"BBB": 12}
+
+        applied = by_record.apply_fills(fills, {})
+        applied_batch = by_batch.apply_fills(FillBatch.from_fills(fills, SymbolTable()), {})
+
+        self.assertEqual(applied_batch.to_fills(), applied)
+        self.assertEqual(by_batch.positions, by_record.positions)
+        self.assertAlmostEqual(by_batch.cash, by_record.cash)
+        self.assertGreaterEqual(by_batch.cash, 0)
+
+
+class TestTradesLog(unittest.TestCase):
+
+    def setUp(self):
+        self.log = TradesLog()
+        self.log.append([Fill(TS, "AAPL", 5, 100.0)])
+        other = SymbolTable(["ZZZ", "MSFT"])
+        self.log.append(FillBatch(other, np.array([TS.value]), np.array([1], dtype=np.int32),
+                                  np.array([-2]), np.array([50.0])))
+
+    def test_reads_like_list_of_dicts(self):
+        self.assertEqual(len(self.log), 2)
+        self.assertEqual(self.log[1], {"ts": TS, "symbol": "MSFT", "qty": -2, "price": 50.0})
+        self.assertEqual([t["symbol"] for t in self.log], ["AAPL", "MSFT"])
+        self.assertNotEqual(self.log, [])
+        self.assertEqual(TradesLog(), [])
+
+    def test_export(self):
+        table = self.log.to_arrow()
+        self.assertEqual(table.column_names, ["ts", "symbol", "qty", "price"])
+        with tempfile.TemporaryDirectory() as tmp:
+            path = f"{tmp}/trades.parquet"
+            self.log.to_parquet(path)
+            frame = pq.read_table(path).to_pandas()
+        self.assertEqual(frame["symbol"].astype(str).tolist(), ["AAPL", "MSFT"])
+        self.assertEqual(frame["ts"].iloc[0], TS)
+
+
+if __name__ == '__main__':
+    unittest.main()
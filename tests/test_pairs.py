@@ -0,0 +1,94 @@
+"""
+Test the pairs mean-reversion strategy
+
+This script is responsible for:
+- Testing that the screen finds cointegrated pairs and their hedge ratios
+- Checking that multi-process screening matches the single-process run
+- Testing entries and exits of PairsStrategy in the backtest engine
+"""
+
+import unittest
+import numpy as np
+import pandas as pd
+from app.alpha.pairs import PairsStrategy, screen_pairs
+from app.backtest.engine import BacktestEngine
+from app.backtest.portfolio import Portfolio
+
+
+def make_panel(seed: int = 0, n_ts: int = 250, n_noise: int = 6) -> pd.DataFrame:
+    """AAA and BBB cointegrated (log BBB = 0.2 + 1.5 log AAA + AR(1) noise), plus random walks"""
+    rng = np.random.default_rng(seed)
+    log_a = np.log(50) + np.cumsum(rng.normal(0, 0.01, n_ts))
+    noise = np.zeros(n_ts)
+    for t in range(1, n_ts):
+        noise[t] = 0.5 * noise[t - 1] + rng.normal(0, 0.005)
+    columns = {"AAA": np.exp(log_a), "BBB": np.exp(0.2 + 1.5 * log_a + noise)}
+    for i in range(n_noise):
+        columns[f"N{i}"] = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n_ts)))
+    index = pd.date_range("2024-01-01", periods=n_ts, freq="D", tz="UTC")
+    return pd.DataFrame(columns, index=index)
+
+
+class TestScreen(unittest.TestCase):
+
+    def test_finds_cointegrated_pair(self):
+        panel = make_panel()
+        panel.iloc[10, -1] = np.nan  # incomplete symbols are skipped
+        pairs = screen_pairs(panel, min_corr=0.5)
+
+        best = pairs.iloc[0]
+        self.assertEqual((best["y"], best["x"]), ("AAA", "BBB"))
+        self.assertAlmostEqual(1 / best["hedge_ratio"], 1.5, delta=0.1)
+        self.assertLess(best["half_life"], 5)
+        self.assertNotIn(panel.columns[-1], set(pairs["y"]) | set(pairs["x"]))
+
+    def test_parallel_matches_serial(self):
+        panel = make_panel(seed=1, n_noise=30)
+        serial = screen_pairs(panel, min_corr=-1.0, max_adf_t=0.0)
+        parallel = screen_pairs(panel, min_corr=-1.0, max_adf_t=0.0, chunk_size=50, max_workers=2)
+
+        self.assertGreater(len(serial), 50)
+        pd.testing.assert_frame_equal(serial, parallel)
+
+
+class TestPairsStrategy(unittest.TestCase):
+
+    def make_bars(self, spread_path):
+        ts = pd.date_range("2024-01-01", periods=len(spread_path), freq="D", tz="UTC")
+        rows = []
+        for t, bump in zip(ts, spread_path):
+            rows.append({"ts": t, "symbol": "XXX", "close": 100.0})
+            rows.append({"ts": t, "symbol": "YYY", "close": 100.0 * np.exp(bump)})
+        bars = pd.DataFrame(rows)
+        for col in ("open", "high", "low"):
+            bars[col] = bars["close"]
+        bars["volume"] = 1.0
+        return bars
+
+    def test_enters_and_exits_on_zscore(self):
+        path = [0.001, -0.001] * 15 + [0.05, 0.05] + [0.001, -0.001] * 5
+        bars = self.make_bars(path)
+
+        strategy = PairsStrategy([("YYY", "XXX", 1.0)], window=20, entry_z=2.0, exit_z=0.5, dollar_per_leg=10_000)
+        engine = BacktestEngine(strategy, portfolio=Portfolio(100_000, allow_short=True))
+        result = engine.run(bars)
+
+        trades = list(result.trades_log)
+        # Spread jumps up: short YYY, long XXX; then both legs are closed
+        self.assertEqual([(t["symbol"], np.sign(t["qty"])) for t in trades[:2]], [("YYY", -1), ("XXX", 1)])
+        self.assertEqual(trades[0]["ts"], bars["ts"].iloc[60])
+        self.assertEqual(engine.portfolio.positions, {})
+        self.assertEqual(strategy.positions, {})
+        self.assertEqual(len(trades), 4)
+
+    def test_long_only_portfolio_keeps_long_leg(self):
+        path = [0.001, -0.001] * 15 + [-0.05]
+        strategy = PairsStrategy([("YYY", "XXX", 1.0)], window=20)
+        engine = BacktestEngine(strategy, initial_cash=100_000)
+        engine.run(self.make_bars(path))
+
+        self.assertEqual(engine.portfolio.positions, {"YYY": 105})
+
+
+if __name__ == '__main__':
+    unittest.main()
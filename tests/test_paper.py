@@ -0,0 +1,134 @@
+"""
+Test the paper-trading runtime
+
+This script is responsible for:
+- Checking that a replayed paper run matches the event-loop backtest
+- Testing replay pacing and bar-to-order latency records
+- Testing replay from one interval of a bar store directory
+- Testing the polling feed against an offline async data source
+- Testing that a rate-limited source still delivers every symbol
+"""
+
+import asyncio
+import tempfile
+import time
+import unittest
+import numpy as np
+import pandas as pd
+from app.alpha.momentum import MomentumStrategy
+from app.backtest.engine import BacktestEngine
+from app.data.sources.base_class import DataSource
+from app.data.store import BarStore
+from app.paper.feed import PollingFeed, ReplayFeed
+from app.paper.runtime import PaperTrader
+
+
+def make_bars(n_ts: int = 40, n_sym: int = 5, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    ts = pd.date_range("2024-01-01", periods=n_ts, freq="D", tz="UTC")
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, (n_ts, n_sym)), axis=0))
+    rows = [{"ts": t, "symbol": f"S{j}", "open": c, "high": c, "low": c, "close": c, "volume": 1000.0}
+            for i, t in enumerate(ts) for j, c in enumerate(close[i])]
+    return pd.DataFrame(rows)
+
+
+class GrowingSource(DataSource):
+    """Offline source whose history grows by one minute bar per call"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.calls = {}
+
+    def fetch_data(self, symbol: str, period="1y", interval="1d", start=None) -> pd.DataFrame:
+        self.calls[symbol] = self.calls.get(symbol, 0) + 1
+        return self._standardize_data(self._fetch_raw_data(symbol, period, interval), symbol)
+
+    def _fetch_raw_data(self, symbol: str, period=str, interval=str) -> pd.DataFrame:
+        ts = pd.date_range("2024-01-02 14:30", periods=2 + self.calls[symbol], freq="min", tz="UTC")
+        return pd.DataFrame({"timestamp": ts, "open": 1.0, "high": 1.0, "low": 1.0, "close": 1.0, "volume": 1.0})
+
+
+class RateLimitedSource(GrowingSource):
+    """GrowingSource behind a token bucket, like YahooSource's check_rate_limit"""
+
+    def fetch_data(self, symbol: str, period="1y", interval="1d", start=None) -> pd.DataFrame:
+        self.check_rate_limit()
+        return super().fetch_data(symbol, period, interval, start)
+
+
+class TestPaperTrader(unittest.TestCase):
+
+    def test_replay_matches_backtest(self):
+        bars = make_bars()
+        with tempfile.TemporaryDirectory() as tmp:
+            path = f"{tmp}/bars.parquet"
+            bars.to_parquet(path)
+            trader = PaperTrader(ReplayFeed(path))
+            params = [(5, 1), (10, 2), (3, 3)]
+            sessions = [trader.add(MomentumStrategy(lookback, top_k, 10_000), initial_cash=50_000)
+                        for lookback, top_k in params]
+            trader.run_sync()
+
+        self.assertEqual(trader.bars_seen, 40)
+        for (lookback, top_k), session in zip(params, sessions):
+            result = BacktestEngine(MomentumStrategy(lookback, top_k, 10_000), initial_cash=50_000).run(bars)
+            self.assertEqual(session.portfolio.equity_history, result.equity_timeseries)
+            self.assertEqual(list(session.trades_log), list(result.trades_log))
+            self.assertEqual(len(session.latencies_us), 40)
+            self.assertGreater(session.latency_summary()["p50_us"], 0)
+
+    def test_replay_speed(self):
+        bars = make_bars(n_ts=4, n_sym=1)
+        trader = PaperTrader(ReplayFeed(bars, speed=86_400 * 20))
+        started = time.perf_counter()
+        trader.run_sync()
+        # 3 days of bars at 20 days per second
+        self.assertGreaterEqual(time.perf_counter() - started, 0.14)
+        self.assertEqual(trader.bars_seen, 4)
+
+    def test_replay_store_interval(self):
+        bars = make_bars(n_ts=3, n_sym=2)
+        with tempfile.TemporaryDirectory() as tmp:
+            store = BarStore(tmp)
+            store.write(bars, interval="1d")
+            store.write(bars.iloc[-2:], interval="1d")
+            store.write(bars.assign(ts=bars["ts"] + pd.Timedelta(hours=1)), interval="1h")
+            feed = ReplayFeed(tmp, interval="1d")
+
+        async def collect():
+            return [event async for event in feed]
+        events = asyncio.run(collect())
+        self.assertEqual([event.ts for event in events], sorted(bars["ts"].unique()))
+        self.assertTrue(all(len(event.frame) == 2 for event in events))
+
+
+class TestPollingFeed(unittest.TestCase):
+
+    def test_emits_new_closed_bars_once(self):
+        feed = PollingFeed(GrowingSource(), ["AAA", "BBB"], poll_seconds=0.01, max_polls=3)
+
+        async def collect():
+            return [event async for event in feed]
+
+        events = asyncio.run(collect())
+        # Polls return 3, 4 and 5 bars; the newest bar of each poll is held back
+        stamps = [event.ts for event in events]
+        self.assertEqual(stamps, list(pd.date_range("2024-01-02 14:30", periods=4, freq="min", tz="UTC")))
+        self.assertTrue(all(sorted(event.frame["symbol"]) == ["AAA", "BBB"] for event in events))
+
+    def test_rate_limited_source_delivers_every_symbol(self):
+        symbols = [f"S{i}" for i in range(8)]
+        source = RateLimitedSource(requests_per_second=100, burst=2)
+        feed = PollingFeed(source, symbols, poll_seconds=0.01, max_polls=3)
+
+        async def collect():
+            return [event async for event in feed]
+
+        events = asyncio.run(collect())
+        self.assertEqual(len(events), 4)
+        self.assertTrue(all(sorted(event.frame["symbol"]) == symbols for event in events))
+        self.assertEqual(source.calls, {symbol: 3 for symbol in symbols})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+"""
+Test the portfolio ledger
+
+This script is responsible for:
+- Checking incremental equity against a full revaluation
+- Testing cost basis, last-price marks and the equity history arrays
+- Testing short positions when shorting is allowed
+"""
+
+import unittest
+import numpy as np
+import pandas as pd
+from app.backtest.order import Fill
+from app.backtest.portfolio import Portfolio
+
+
+class TestPortfolioLedger(unittest.TestCase):
+
+    def test_incremental_equity_matches_full_revaluation(self):
+        rng = np.random.default_rng(4)
+        symbols = [f"S{i}" for i in range(30)]
+        portfolio = Portfolio(1_000_000, capacity=4)
+        marks = {}
+
+        for day in range(40):
+            ts = pd.Timestamp("2024-01-01", tz="UTC") + pd.Timedelta(days=day)
+            prices = {s: float(p) for s, p in zip(symbols, rng.uniform(10, 200, len(symbols)))
+                      if rng.random() > 0.1}
+            fills = [Fill(ts, s, int(rng.integers(-50, 80)), prices[s])
+                     for s in rng.choice(list(prices), 5, replace=False)]
+            portfolio.apply_fills(fills, prices)
+            equity = portfolio.mark_to_market(ts, prices)
+
+            marks.update(prices)
+            expected = portfolio.cash + sum(q * marks[s] for s, q in portfolio.positions.items())
+            self.assertAlmostEqual(equity, expected, places=6)
+            self.assertGreaterEqual(portfolio.cash, 0)
+            self.assertTrue(all(q > 0 for q in portfolio.positions.values()))
+
+        ts, curve = portfolio.equity_curve
+        self.assertEqual(len(curve), 40)
+        self.assertEqual(curve.dtype, np.float64)
+        self.assertEqual(portfolio.equity_history[-1]["equity"], curve[-1])
+        self.assertEqual(portfolio.equity_history[0]["ts"], pd.Timestamp("2024-01-01", tz="UTC"))
+
+    def test_cost_basis_average_cost(self):
+        portfolio = Portfolio(10_000)
+        ts = pd.Timestamp("2024-01-01", tz="UTC")
+        portfolio.apply_fills([Fill(ts, "AAA", 10, 100.0)], {})
+        portfolio.apply_fills([Fill(ts, "AAA", 10, 200.0)], {})
+        self.assertAlmostEqual(portfolio.cost_basis("AAA"), 3000.0)
+        portfolio.apply_fills([Fill(ts, "AAA", -5, 300.0)], {})
+        self.assertAlmostEqual(portfolio.cost_basis("AAA"), 2250.0)
+        portfolio.apply_fills([Fill(ts, "AAA", -50, 300.0)], {})
+        self.assertEqual(portfolio.positions, {})
+        self.assertEqual(portfolio.cost_basis("AAA"), 0.0)
+
+    def test_missing_price_keeps_last_mark(self):
+        portfolio = Portfolio(1_000)
+        ts = pd.Timestamp("2024-01-01", tz="UTC")
+        portfolio.apply_fills([Fill(ts, "AAA", 5, 100.0)], {"AAA": 100.0})
+        self.assertEqual(portfolio.mark_to_market(ts, {"AAA": 110.0}), 1_050.0)
+        self.assertEqual(portfolio.mark_to_market(ts, {"BBB": 5.0}), 1_050.0)
+        self.assertEqual(portfolio.mark_to_market(ts, {"AAA": float("nan")}), 1_050.0)
+
+    def test_short_positions(self):
+        portfolio = Portfolio(1_000, allow_short=True)
+        ts = pd.Timestamp("2024-01-01", tz="UTC")
+        portfolio.apply_fills([Fill(ts, "AAA", -10, 100.0)], {})
+        self.assertEqual(portfolio.positions, {"AAA": -10})
+        self.assertEqual(portfolio.cash, 2_000.0)
+        self.assertAlmostEqual(portfolio.cost_basis("AAA"), -1_000.0)
+        self.assertEqual(portfolio.mark_to_market(ts, {"AAA": 90.0}), 1_100.0)
+        self.assertEqual(portfolio.gross_value, 900.0)
+
+        # Buying 15 covers the short and flips to a 5-share long opened at 80
+        portfolio.apply_fills([Fill(ts, "AAA", 15, 80.0)], {})
+        self.assertEqual(portfolio.positions, {"AAA": 5})
+        self.assertAlmostEqual(portfolio.cost_basis("AAA"), 400.0)
+        self.assertEqual(portfolio.mark_to_market(ts, {"AAA": 80.0}), 1_200.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+"""
+Test the bar resampler
+
+This script is responsible for:
+- Testing resampled bars against a pandas groupby reference
+- Testing calendar buckets (local days, Monday weeks, months) and dropped no-trade bars
+"""
+
+import unittest
+import numpy as np
+import pandas as pd
+from app.data.resample import can_resample, coarsest_source, resample_bars
+from benchmarks.synthetic import synthetic_bars
+
+FIELDS = ["open", "high", "low", "close", "volume"]
+
+
+def reference(bars: pd.DataFrame, freq: str) -> pd.DataFrame:
+    grouped = bars.assign(bucket=bars["ts"].dt.floor(freq)).groupby(["bucket", "symbol"], observed=True)
+    return grouped.agg(open=("open", "first"), high=("high", "max"), low=("low", "min"),
+                       close=("close", "last"), volume=("volume", "sum")).reset_index()
+
+
+class TestResample(unittest.TestCase):
+
+    def setUp(self):
+        self.bars = synthetic_bars(4, 3 * 1440, freq="min")
+
+    def test_matches_groupby(self):
+        for interval, freq in [("5m", "5min"), ("1h", "1h"), ("1d", "1D")]:
+            expected = reference(self.bars, freq)
+            result = resample_bars(self.bars, interval)
+
+            np.testing.assert_array_equal(result["ts"].to_numpy(), expected["bucket"].to_numpy())
+            self.assertEqual(list(result["symbol"]), list(expected["symbol"]))
+            np.testing.assert_allclose(result[FIELDS].to_numpy(), expected[FIELDS].to_numpy())
+
+    def test_unsorted_input_and_no_trade_bars(self):
+        bars = self.bars.copy()
+        bars.loc[bars.index[-4:], "close"] = np.nan
+        shuffled = bars.sample(frac=1.0, random_state=0)
+
+        result = resample_bars(shuffled, "1h")
+        pd.testing.assert_frame_equal(result, resample_bars(bars.dropna(subset=["close"]), "1h"))
+        self.assertEqual(result["symbol"].dtype, bars["symbol"].dtype)
+
+    def test_calendar_buckets(self):
+        daily = resample_bars(self.bars, "1d", tz="America/New_York")
+        # Local midnight in January is 05:00 UTC
+        self.assertTrue((daily["ts"].dt.hour == 5).all())
+
+        weekly = resample_bars(synthetic_bars(2, 30), "1wk")
+        self.assertTrue((weekly["ts"].dt.dayofweek == 0).all())
+        monthly = resample_bars(synthetic_bars(2, 60), "1mo")
+        self.assertEqual(sorted(monthly["ts"].dt.day.unique()), [1])
+
+    def test_interval_rules(self):
+        self.assertTrue(can_resample("1m", "5m"))
+        self.assertTrue(can_resample("1d", "1wk"))
+        self.assertFalse(can_resample("1h", "90m"))
+        self.assertFalse(can_resample("5m", "1m"))
+        self.assertEqual(coarsest_source(["1m", "5m", "1d"], "1h"), "5m")
+        self.assertIsNone(coarsest_source(["1d"], "1h"))
+        with self.assertRaises(ValueError):
+            resample_bars(self.bars, "3d")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,163 @@
+"""
+Test the risk engine
+
+This script is responsible for:
+- Testing the per-position cap, gross exposure limit and daily loss stop
+- Checking that order lists and OrderBatches are clipped the same way
+- Testing the RiskEngine hooked into the backtest engine
+"""
+
+import unittest
+import numpy as np
+import pandas as pd
+from app.backtest.engine import BacktestEngine, Strategy
+from app.backtest.order import Order, OrderBatch
+from app.backtest.portfolio import Portfolio
+from app.risk.engine import RiskEngine, RiskLimits
+
+TS = pd.Timestamp("2024-01-02", tz="UTC")
+
+
+def orders_for(qty: dict, ts=TS) -> list[Order]:
+    return [Order(ts=ts, symbol=symbol, qty=q) for symbol, q in qty.items()]
+
+
+class TestRiskLimits(unittest.TestCase):
+
+    def test_position_cap_clips_buys(self):
+        """2% of 100k is 2,000: 20 shares at 100"""
+        portfolio = Portfolio(100_000)
+        orders = RiskEngine().check(TS, orders_for({"AAA": 50, "BBB": 10}), portfolio, {"AAA": 100.0, "BBB": 100.0})
+
+        self.assertEqual([(o.symbol, o.qty) for o in orders], [("AAA", 20), ("BBB", 10)])
+
+    def test_reductions_always_pass(self):
+        portfolio = Portfolio(100_000)
+        portfolio.set_positions({"AAA": 100}, marks={"AAA": 100.0})
+        orders = RiskEngine().check(TS, orders_for({"AAA": -30}), portfolio, {"AAA": 100.0})
+
+        self.assertEqual(orders[0].qty, -30)
+
+    def test_gross_limit_shared_in_order(self):
+        """Equity 10k, gross 9k: room is 2k once the sell is credited"""
+        portfolio = Portfolio(1_000)
+        portfolio.set_positions({"AAA": 90}, marks={"AAA": 100.0})
+        risk = RiskEngine(RiskLimits(max_position_pct=1.0, max_gross_pct=1.0))
+        orders = risk.check(TS, orders_for({"AAA": -10, "BBB": 15, "CCC": 10}), portfolio,
+                            {"AAA": 100.0, "BBB": 100.0, "CCC": 100.0})
+
+        self.assertEqual([(o.symbol, o.qty) for o in orders], [("AAA", -10), ("BBB", 15), ("CCC", 5)])
+        self.assertEqual(risk.breaches["gross"], 1)
+
+    def test_gross_limit_fills_later_smaller_orders(self):
+        """Room 2k: BBB is clipped to 6 x 300, the 200 left fit CCC's 1 x 100 and 1 of DDD's 5"""
+        portfolio = Portfolio(10_000)
+        risk = RiskEngine(RiskLimits(max_position_pct=1.0, max_gross_pct=0.2))
+        orders = risk.check(TS, orders_for({"BBB": 30, "CCC": 1, "DDD": 5}), portfolio,
+                            {"BBB": 300.0, "CCC": 100.0, "DDD": 100.0})
+
+        self.assertEqual([(o.symbol, o.qty) for o in orders], [("BBB", 6), ("CCC", 1), ("DDD", 1)])
+        self.assertEqual(risk.breaches["gross"], 2)
+
+    def test_daily_loss_stop(self):
+        portfolio = Portfolio(50_000)
+        portfolio.set_positions({"AAA": 1000}, marks={"AAA": 50.0})
+        risk = RiskEngine()
+
+        # Start of day equity 100k; AAA falls 50 -> 44 so equity is down 6%
+        orders = risk.check(TS, orders_for({"AAA": -100, "BBB": 5}), portfolio, {"AAA": 44.0, "BBB": 10.0})
+        self.assertEqual([(o.symbol, o.qty) for o in orders], [("AAA", -100)])
+        self.assertEqual(risk.breaches["daily_loss"], 1)
+
+        # The next day starts from the marked equity and trading resumes
+        portfolio.mark_to_market(TS, {"AAA": 44.0})
+        orders = risk.check(TS + pd.Timedelta(days=1), orders_for({"BBB": 5}), portfolio, {"BBB": 10.0})
+        self.assertEqual(orders[0].qty, 5)
+
+    def test_daily_loss_stop_blocks_flips(self):
+        """Halted: selling 15 of a 10-share long stops at flat instead of opening a 5-share short"""
+        portfolio = Portfolio(0)
+        portfolio.set_positions({"AAA": 10}, marks={"AAA": 100.0})
+        risk = RiskEngine()
+        orders = risk.check(TS, orders_for({"AAA": -15}), portfolio, {"AAA": 90.0})
+
+        self.assertEqual([(o.symbol, o.qty) for o in orders], [("AAA", -10)])
+        self.assertEqual(risk.breaches["daily_loss"], 1)
+
+    def test_flip_is_capped_as_a_new_position(self):
+        """A 50-share long over the 20-share cap can flip to at most a 20-share short"""
+        portfolio = Portfolio(95_000)
+        portfolio.set_positions({"AAA": 50}, marks={"AAA": 100.0})
+        orders = RiskEngine().check(TS, orders_for({"AAA": -100}), portfolio, {"AAA": 100.0})
+
+        self.assertEqual(orders[0].qty, -70)
+
+    def test_batch_matches_list(self):
+        rng = np.random.default_rng(0)
+        symbols = [f"S{i:03d}" for i in range(1000)]
+        prices = dict(zip(symbols, rng.uniform(5, 500, len(symbols)).tolist()))
+        qty = dict(zip(symbols, rng.integers(-50, 200, len(symbols)).tolist()))
+
+        def fresh():
+            portfolio = Portfolio(1_000_000)
+            held = symbols[::7]
+            portfolio.set_positions({s: 10 for s in held}, marks={s: prices[s] for s in held})
+            return portfolio
+
+        portfolio = fresh()
+        listed = RiskEngine().check(TS, orders_for(qty), portfolio, prices)
+        portfolio = fresh()
+        batch = OrderBatch.from_orders(orders_for(qty), portfolio.symbols)
+        batched = RiskEngine().check(TS, batch, portfolio, prices)
+
+        self.assertEqual([(o.symbol, o.qty) for o in listed], [(o.symbol, o.qty) for o in batched.to_orders()])
+
+    def test_repeated_symbol(self):
+        portfolio = Portfolio(100_000)
+        orders = RiskEngine().check(TS, orders_for({"AAA": 15}) + orders_for({"AAA": 15}), portfolio,
+                                    {"AAA": 100.0})
+
+        self.assertEqual([o.qty for o in orders], [15, 5])
+
+    def test_repeated_symbol_after_clipped_order(self):
+        """The buy is capped at 20, so the sell can flip to at most a 20-share short (-40), not -60"""
+        portfolio = Portfolio(100_000)
+        risk = RiskEngine()
+        orders = risk.check(TS, orders_for({"AAA": 50}) + orders_for({"AAA": -60}), portfolio, {"AAA": 100.0})
+
+        self.assertEqual([o.qty for o in orders], [20, -40])
+        self.assertEqual(risk.breaches["position"], 2)
+
+    def test_repeated_symbol_reduction_passes_without_room(self):
+        """Gross is already over the limit: the repeated symbol's sell still passes"""
+        portfolio = Portfolio(0)
+        portfolio.set_positions({"AAA": 100, "BBB": 100}, marks={"AAA": 100.0, "BBB": 100.0})
+        risk = RiskEngine(RiskLimits(max_position_pct=1.0, max_gross_pct=0.5))
+        orders = risk.check(TS, orders_for({"AAA": -10}) + orders_for({"AAA": -10, "BBB": 5}), portfolio,
+                            {"AAA": 100.0, "BBB": 100.0})
+
+        self.assertEqual([(o.symbol, o.qty) for o in orders], [("AAA", -10), ("AAA", -10)])
+
+
+class TestEngineHook(unittest.TestCase):
+
+    def test_backtest_respects_position_cap(self):
+        ts = pd.date_range("2024-01-01", periods=3, freq="D", tz="UTC")
+        bars = pd.DataFrame([{"ts": t, "symbol": s, "open": 10.0, "high": 10.0, "low": 10.0, "close": 10.0,
+                              "volume": 1.0} for t in ts for s in ("AAA", "BBB")])
+
+        class BuyAll(Strategy):
+            def on_bar(self, ts, frame):
+                return [Order(ts=ts, symbol=s, qty=1_000) for s in frame["symbol"]]
+
+        engine = BacktestEngine(BuyAll(), initial_cash=100_000, risk=RiskEngine())
+        engine.run(bars)
+
+        # 2% of 100k at 10 is 200 shares per name, reached on the first bar
+        self.assertEqual(engine.portfolio.positions, {"AAA": 200, "BBB": 200})
+        with self.assertRaises(ValueError):
+            engine.run(bars, mode="vectorized")
+
+
+if __name__ == '__main__':
+    unittest.main()
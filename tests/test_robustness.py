@@ -0,0 +1,123 @@
+"""
+Test the robustness runner
+
+This script is responsible for:
+- Testing walk-forward split generation
+- Checking that a window run on precomputed targets matches a warm-started run
+- Checking that parallel walk-forward and Monte Carlo match sequential runs
+- Testing that bootstrap paths are deterministic per seed and keep missing bars
+- Checking that worker stage timings reach the parent's recorder
+"""
+
+import unittest
+import numpy as np
+import pandas as pd
+from app.alpha.momentum import MomentumStrategy
+from app.backtest.engine import BacktestEngine
+from app.backtest.matrix import BarMatrix
+from app.backtest.robustness import (PathGenerator, PrecomputedTargets, block_bootstrap, monte_carlo,
+                                     walk_forward, walk_forward_splits)
+from app.core import instrument
+from app.metrics.performance import METRIC_NAMES
+
+
+class TestSplits(unittest.TestCase):
+
+    def test_rolling(self):
+        splits = walk_forward_splits(100, train=40, test=20)
+        self.assertEqual([(s.train_start, s.train_stop, s.test_start, s.test_stop) for s in splits],
+                         [(0, 40, 40, 60), (20, 60, 60, 80), (40, 80, 80, 100)])
+
+    def test_anchored_and_step(self):
+        splits = walk_forward_splits(100, train=40, test=20, step=30, anchored=True)
+        self.assertEqual([(s.train_start, s.train_stop, s.test_stop) for s in splits], [(0, 40, 60), (0, 70, 90)])
+
+    def test_too_short(self):
+        self.assertEqual(walk_forward_splits(50, train=40, test=20), [])
+        with self.assertRaises(ValueError):
+            walk_forward_splits(50, train=0, test=20)
+
+
+class TestRobustness(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(5)
+        ts = pd.date_range("2024-01-01", periods=120, freq="D", tz="UTC")
+        frames = []
+        for i in range(5):
+            close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, len(ts))))
+            frames.append(pd.DataFrame({"ts": ts, "symbol": f"S{i}", "open": close, "high": close,
+                                        "low": close, "close": close, "volume": 1.0}))
+        self.bars = pd.concat(frames, ignore_index=True)
+        self.matrix = BarMatrix.from_frame(self.bars)
+        self.grid = {"lookback_days": [5, 10], "top_k": [1, 2], "dollar_per_position": [10_000.0]}
+
+    def test_precomputed_window_matches_warm_start(self):
+        params = {"lookback_days": 10, "top_k": 2, "dollar_per_position": 10_000.0}
+        shared = PrecomputedTargets.compute(MomentumStrategy(**params), self.matrix)
+        window = BacktestEngine(shared, initial_cash=50_000.0)
+        window.run_matrix(self.matrix.window(60, 90))
+
+        # Targets of a warm-started chunk: computed with 10 rows of history, then trimmed
+        strategy = MomentumStrategy(**params)
+        expected = strategy.targets(self.matrix.window(50, 90))[10:]
+        np.testing.assert_array_equal(shared.targets(self.matrix.window(60, 90)), expected)
+        self.assertEqual(len(window.portfolio.equity_curve[1]), 30)
+
+    def test_walk_forward(self):
+        result = walk_forward(self.bars, self.grid, train=40, test=20, max_workers=1)
+        self.assertEqual(len(result.folds), 4)
+        # 4 grid points x (4 train + 4 test windows), each run once
+        self.assertEqual(len(result.runs), 4 * 8)
+        self.assertFalse(result.runs.duplicated(["lookback_days", "top_k", "start", "stop"]).any())
+
+        for fold in result.folds.to_dict("records"):
+            train = result.runs[(result.runs["start"] == fold["fold"] * 20)
+                                & (result.runs["stop"] == fold["fold"] * 20 + 40)]
+            self.assertEqual(fold["train_sharpe"], train["sharpe"].max())
+        summary = result.summary()
+        self.assertEqual(list(summary["metric"]), [f"test_{name}" for name in METRIC_NAMES])
+        self.assertTrue((summary["count"] <= 4).all())
+
+        with self.assertRaises(ValueError):
+            walk_forward(self.bars, self.grid, train=100, test=40, max_workers=1)
+
+    def test_walk_forward_parallel_matches_sequential(self):
+        sequential = walk_forward(self.bars, self.grid, train=40, test=20, anchored=True, max_workers=1)
+        parallel = walk_forward(self.bars, self.grid, train=40, test=20, anchored=True, max_workers=2)
+        pd.testing.assert_frame_equal(sequential.folds, parallel.folds)
+
+    def test_bootstrap_paths(self):
+        rows = block_bootstrap(95, 10, np.random.default_rng(0))
+        self.assertEqual(len(rows), 95)
+        self.assertTrue((np.diff(rows.reshape(-1, 5), axis=1) == 1).all())
+
+        bars = self.bars.copy()
+        bars.loc[(bars["symbol"] == "S1") & (bars.index % 7 == 0), "close"] = np.nan
+        generator = PathGenerator(BarMatrix.from_frame(bars), block=10, seed=1)
+        first, again = generator.path(3), generator.path(3)
+        np.testing.assert_array_equal(first.close, again.close)
+        self.assertFalse(np.array_equal(first.close, generator.path(4).close))
+        self.assertEqual(np.isnan(first.close).any(axis=0).tolist(), [False, True, False, False, False])
+
+    def test_monte_carlo(self):
+        sequential = monte_carlo(self.bars, self.grid, n_paths=6, block=10, seed=2, max_workers=1)
+        parallel = monte_carlo(self.bars, self.grid, n_paths=6, block=10, seed=2, max_workers=2, batch_size=2)
+        self.assertEqual(len(sequential.runs), 6 * 4)
+        pd.testing.assert_frame_equal(sequential.runs, parallel.runs)
+
+        summary = sequential.summary()
+        self.assertEqual(len(summary), 4 * len(METRIC_NAMES))
+        self.assertTrue((summary["count"] == 6).all())
+        self.assertTrue((summary["p05"] <= summary["p95"]).all())
+
+    def test_worker_timings_are_merged(self):
+        with instrument.recording() as recorder:
+            walk_forward(self.bars, self.grid, train=40, test=20, max_workers=2)
+            monte_carlo(self.bars, self.grid, n_paths=3, block=10, max_workers=2, batch_size=1)
+        # 4 grid points x 8 windows, then 4 grid points x 3 paths
+        self.assertEqual(recorder.stages["simulate_matrix"].calls, 4 * 8 + 4 * 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+"""
+Test the momentum signal engine
+
+This script is responsible for:
+- Checking that streaming and batch momentum are identical
+- Testing top-K selection and its tie-breaking
+- Checking that streaming and batch spread z-scores agree
+"""
+
+import unittest
+import numpy as np
+from app.alpha.signals import MomentumSignal, SpreadZScore, top_k_indices, top_k_mask
+
+
+class TestMomentumSignal(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(11)
+        self.symbols = [f"S{i:02d}" for i in range(12)]
+        self.close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, (50, 12)), axis=0))
+        self.close[rng.random(self.close.shape) < 0.1] = np.nan
+        self.close[:20, 7] = np.nan  # listed late
+        self.close[5, :] = np.nan    # market holiday
+
+    def test_streaming_matches_batch(self):
+        batch = MomentumSignal(5).compute(self.close)
+        streaming = MomentumSignal(5, capacity=2)
+
+        for t in range(len(self.close)):
+            present = ~np.isnan(self.close[t])
+            symbols = [s for s, p in zip(self.symbols, present) if p]
+            momentum = streaming.update(symbols, self.close[t][present])
+
+            # Streaming columns are in first-seen order
+            expected = np.full(len(streaming.symbols), np.nan)
+            for j, symbol in enumerate(streaming.symbols):
+                expected[j] = batch[t, self.symbols.index(symbol)]
+            np.testing.assert_array_equal(momentum, expected)
+
+            mask_row = top_k_mask(batch[t:t + 1], 3)[0]
+            self.assertEqual(sorted(streaming.top_k(3)), [s for s, m in zip(self.symbols, mask_row) if m])
+
+    def test_warmup_is_nan(self):
+        signal = MomentumSignal(3)
+        for close in [10.0, 11.0, 12.0]:
+            self.assertTrue(np.isnan(signal.update(["AAA"], [close])).all())
+        self.assertAlmostEqual(signal.update(["AAA"], [13.0])[0], 0.3)
+        self.assertAlmostEqual(signal.get("AAA"), 0.3)
+
+
+class TestTopK(unittest.TestCase):
+
+    def test_matches_full_sort(self):
+        rng = np.random.default_rng(5)
+        scores = rng.normal(size=200)
+        scores[rng.random(200) < 0.2] = np.nan
+        expected = [i for i in np.argsort(-np.where(np.isnan(scores), -np.inf, scores), kind="stable")[:10]]
+        self.assertEqual(top_k_indices(scores, 10).tolist(), expected)
+
+    def test_ties_break_by_name(self):
+        scores = np.array([0.1, 0.5, 0.5, 0.5, np.nan])
+        names = ["E", "D", "B", "C", "A"]
+        self.assertEqual(top_k_indices(scores, 2, names).tolist(), [2, 3])
+
+    def test_mask_ties_and_short_rows(self):
+        scores = np.array([[0.5, 0.5, 0.5, 0.1],
+                           [np.nan, 0.2, np.nan, np.nan]])
+        mask = top_k_mask(scores, 2)
+        self.assertEqual(mask.tolist(), [[True, True, False, False], [False, True, False, False]])
+
+
+class TestSpreadZScore(unittest.TestCase):
+
+    def test_streaming_matches_batch(self):
+        rng = np.random.default_rng(5)
+        spreads = rng.normal(0, 1, (200, 6)) + 50.0
+        spreads[rng.random(spreads.shape) < 0.05] = np.nan
+        spreads[:, 5] = 1.0  # flat spread has no z-score
+
+        batch = SpreadZScore(10, 6).compute(spreads)
+        signal = SpreadZScore(10, 6)
+        streaming = np.array([signal.update(row) for row in spreads])
+
+        np.testing.assert_allclose(streaming, batch, rtol=1e-8, atol=1e-8)
+        self.assertTrue(np.isnan(batch[:9]).all())
+        self.assertTrue(np.isnan(batch[:, 5]).all())
+
+    def test_matches_window_statistics(self):
+        spreads = np.arange(30, dtype=float)[:, None] ** 1.5
+        z = SpreadZScore(8, 1).compute(spreads)
+        window = spreads[-8:, 0]
+        self.assertAlmostEqual(z[-1, 0], (window[-1] - window.mean()) / window.std())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+"""
+Test CLI startup cost
+
+This script is responsible for:
+- Testing that importing the ingestor and sweep CLIs does not load optional
+  client libraries (yfinance, psycopg2, redis)
+- Testing that both CLIs start within the cold-start budget
+"""
+
+import json
+import subprocess
+import sys
+import time
+import unittest
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+CLIS = ["app.data.ingestor", "app.backtest.sweep"]
+
+# Generous on purpose: shared machines are noisy, a regression is an eager
+# import of a whole client library, not a few milliseconds
+STARTUP_BUDGET_SECONDS = 1.5
+
+DEFERRED_MODULES = ["yfinance", "psycopg2", "redis"]
+
+
+def run_python(*args: str) -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable, *args], cwd=ROOT, capture_output=True, text=True, check=True)
+
+
+class TestStartup(unittest.TestCase):
+
+    def test_imports_defer_client_libraries(self):
+        for module in CLIS:
+            script = (f"import json, sys; import {module}; "
+                      f"print(json.dumps([m for m in {DEFERRED_MODULES!r} if m in sys.modules]))")
+            loaded = json.loads(run_python("-c", script).stdout)
+            self.assertEqual(loaded, [], f"{module} imports {loaded} at startup")
+
+    def test_cli_help_within_budget(self):
+        for module in CLIS:
+            # Best of two, so a single slow start on a busy host does not fail the suite
+            timings = []
+            for _ in range(2):
+                started = time.perf_counter()
+                run_python("-m", module, "--help")
+                timings.append(time.perf_counter() - started)
+            self.assertLess(min(timings), STARTUP_BUDGET_SECONDS, f"{module} --help took {min(timings):.2f}s")
+
+
+if __name__ == '__main__':
+    unittest.main()
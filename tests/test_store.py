@@ -0,0 +1,125 @@
+"""
+Test the partitioned bar store
+
+This script is responsible for:
+- Testing append-only writes and the partition layout
+- Testing symbol, date-range and column filters on read
+- Testing derived (resampled) intervals and their cached aggregates
+"""
+
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from app.data.resample import resample_bars
+from app.data.store import AGGREGATES_DIR, BarStore
+from benchmarks.synthetic import synthetic_bars
+
+
+def make_bars(symbols, start="2022-12-28", periods=10) -> pd.DataFrame:
+    ts = pd.date_range(start, periods=periods, freq="D", tz="UTC")
+    frames = []
+    for i, symbol in enumerate(symbols):
+        close = 100.0 + i + np.arange(periods)
+        frames.append(pd.DataFrame({"ts": ts, "symbol": symbol, "open": close, "high": close,
+                                    "low": close, "close": close, "volume": 1e6}))
+    return pd.concat(frames, ignore_index=True)
+
+
+class TestBarStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = BarStore(self.tmp.name)
+        self.store.write(make_bars(["AAPL", "MSFT", "KO"]))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_partition_layout(self):
+        years = sorted(p.name for p in (self.store.root / "interval=1d" / "symbol=AAPL").iterdir())
+        self.assertEqual(years, ["year=2022", "year=2023"])
+        self.assertEqual(self.store.list_symbols(), ["AAPL", "KO", "MSFT"])
+
+    def test_read_schema(self):
+        data = self.store.read()
+        self.assertEqual(len(data), 30)
+        self.assertEqual(list(data.columns), ["ts", "symbol", "open", "high", "low", "close", "volume"])
+        self.assertEqual(str(data["ts"].dt.tz), "UTC")
+        self.assertIsInstance(data["symbol"].dtype, pd.CategoricalDtype)
+        self.assertEqual(data["close"].dtype, np.float32)
+
+    def test_filters(self):
+        data = self.store.read(["MSFT", "KO"], start="2023-01-01", end="2023-01-03", columns=["close"])
+        self.assertEqual(list(data.columns), ["ts", "symbol", "close"])
+        self.assertEqual(len(data), 6)
+        self.assertEqual(set(data["symbol"]), {"MSFT", "KO"})
+        self.assertTrue((data["ts"] >= pd.Timestamp("2023-01-01", tz="UTC")).all())
+
+    def test_append_latest_wins(self):
+        update = make_bars(["AAPL"], start="2023-01-06", periods=3).assign(close=1.0)
+        self.store.write(update)
+
+        data = self.store.read(["AAPL"])
+        self.assertEqual(len(data), 12)
+        self.assertEqual(data["close"].iloc[-3:].tolist(), [1.0, 1.0, 1.0])
+
+        self.store.compact("1d", "AAPL", 2023)
+        parts = list((self.store.root / "interval=1d" / "symbol=AAPL" / "year=2023").glob("part-*.parquet"))
+        self.assertEqual(len(parts), 1)
+        pd.testing.assert_frame_equal(self.store.read(["AAPL"]), data)
+
+    def test_missing_and_invalid(self):
+        self.assertTrue(self.store.read(["NOPE"]).empty)
+        with self.assertRaises(ValueError):
+            self.store.read(columns=["vwap"])
+        with self.assertRaises(ValueError):
+            self.store.write(pd.DataFrame({"ts": [], "close": []}))
+
+    def test_stray_partitions_are_skipped(self):
+        symbol_dir = self.store.root / "interval=1d" / "symbol=AAPL"
+        (symbol_dir / "year=__HIVE_DEFAULT_PARTITION__").mkdir()
+        (symbol_dir / ".DS_Store").touch()
+        self.assertEqual(len(self.store.read(["AAPL"])), 10)
+        self.assertEqual(self.store.years(["AAPL"]), [2022, 2023])
+
+
+class TestDerivedIntervals(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = BarStore(self.tmp.name)
+        self.bars = synthetic_bars(3, 2 * 1440, start="2023-12-31", freq="min")
+        self.store.write(self.bars, interval="1m")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_read_resamples_finest_stored_interval(self):
+        hourly = self.store.read(interval="1h")
+        expected = resample_bars(self.store.read(interval="1m"), "1h")
+
+        pd.testing.assert_frame_equal(hourly, expected)
+        self.assertEqual(self.store.intervals(), ["1m"])
+        self.assertEqual(self.store.years(interval="1h"), [2023, 2024])
+        self.assertEqual(list(self.store.read(["S00001"], start="2024-01-01", interval="1d")["ts"]),
+                         [pd.Timestamp("2024-01-01", tz="UTC")])
+
+    def test_aggregates_are_cached_until_base_changes(self):
+        self.store.read(interval="1d")
+        cached = list((self.store.root / AGGREGATES_DIR).rglob("*.parquet"))
+        self.assertEqual(len(cached), 3)
+        self.assertEqual(self.store.read(interval="1d")["close"].iloc[-1], self.bars["close"].iloc[-1].astype(np.float32))
+
+        # A new base part file (a late correction) rebuilds the aggregate
+        self.store.write(self.bars.iloc[-3:].assign(close=1.0), interval="1m")
+        self.assertEqual(self.store.read(interval="1d")["close"].iloc[-1], 1.0)
+
+    def test_unresampleable_interval(self):
+        self.assertTrue(self.store.read(interval="1h").size)
+        with self.assertRaises(ValueError):
+            self.store.read_resampled(interval="90s")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+"""
+Test the parameter sweep
+
+This script is responsible for:
+- Testing grid expansion
+- Checking that the parallel sweep matches sequential runs
+- Checking that workers' stage timings and profiles reach the parent
+"""
+
+import pstats
+import tempfile
+import unittest
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from app.backtest import sweep
+from app.backtest.matrix import BarMatrix
+from app.backtest.sweep import expand_grid, run_one, run_sweep
+from app.core import instrument
+from app.core.profiler import profile
+
+
+class TestSweep(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(3)
+        ts = pd.date_range("2024-01-01", periods=60, freq="D", tz="UTC")
+        frames = []
+        for i in range(6):
+            close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, len(ts))))
+            frames.append(pd.DataFrame({"ts": ts, "symbol": f"S{i}", "open": close, "high": close,
+                                        "low": close, "close": close, "volume": 1.0}))
+        self.bars = pd.concat(frames, ignore_index=True)
+        self.grid = {"lookback_days": [5, 10], "top_k": [1, 2, 3], "dollar_per_position": [10_000.0]}
+
+    def test_expand_grid(self):
+        points = expand_grid(self.grid)
+        self.assertEqual(len(points), 6)
+        self.assertIn({"lookback_days": 10, "top_k": 2, "dollar_per_position": 10_000.0}, points)
+
+    def test_parallel_matches_sequential(self):
+        streamed = []
+        table = run_sweep(self.bars, self.grid, max_workers=2, batch_size=2, on_result=streamed.append)
+        self.assertEqual(len(table), 6)
+        self.assertEqual(len(streamed), 6)
+
+        matrix = BarMatrix.from_frame(self.bars)
+        for row in table.to_dict("records"):
+            params = {k: row[k] for k in self.grid}
+            expected = run_one(matrix, params, 1_000_000.0)
+            self.assertAlmostEqual(row["final_equity"], expected["final_equity"])
+            self.assertEqual(row["n_trades"], expected["n_trades"])
+
+    def test_worker_timings_are_merged(self):
+        with instrument.recording() as recorder:
+            run_sweep(self.bars, self.grid, max_workers=2, batch_size=2)
+        self.assertEqual(recorder.stages["targets"].calls, 6)
+        self.assertEqual(recorder.stages["simulate_matrix"].calls, 6)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            bars = Path(tmp) / "bars.parquet"
+            self.bars.to_parquet(bars)
+            with self.assertLogs(level="INFO") as logs:
+                sweep.main(["--bars", str(bars), "--lookback-days", "5", "10", "--workers", "2",
+                            "--out", str(Path(tmp) / "out.csv"), "--timings"])
+        self.assertTrue(any("Stage timings" in line and "simulate_matrix" in line for line in logs.output))
+
+    def test_worker_profiles_are_merged(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "sweep.prof"
+            with profile(path, mode="cprofile"):
+                run_sweep(self.bars, self.grid, max_workers=2, batch_size=2)
+            stats = pstats.Stats(str(path))
+
+        # The engine only runs in the workers
+        self.assertTrue(any(func[2] == "run_matrix" for func in stats.stats))
+
+
+if __name__ == '__main__':
+    unittest.main()
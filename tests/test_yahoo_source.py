@@ -8,10 +8,11 @@ This script is responsible for:
 
 import unittest
 import yfinance as yf
+import numpy as np
 import pandas as pd
 from unittest.mock import Mock, patch
 from app.data.sources.yahoo_source import YahooSource
-from app.data.sources.base_class import DataSource, DataSourceError, InvalidSymbolError
+from app.data.sources.base_class import BAR_COLUMNS, NO_COPY, DataSource, DataSourceError, InvalidSymbolError, RateLimitError
 
 class TestYahooSource(unittest.TestCase):
 
@@ -48,14 +49,15 @@ class TestYahooSource(unittest.TestCase):
         
     def test_check_rate_limit(self):
         """Test the check_rate_limit method"""
-        # Yahoo Finance doesn't have a rate limit so it always returns True
+        # A fresh source has a full token bucket so the first check passes
         self.assertTrue(self.yahoo_source.check_rate_limit())
     
     def test_standardize_data_empty(self):
         """Test _standardize_data with empty data"""
         data = pd.DataFrame()
-        result = self.yahoo_source._standardize_data(data)
+        result = self.yahoo_source._standardize_data(data, "AAPL")
         self.assertTrue(result.empty)
+        self.assertEqual(list(result.columns), BAR_COLUMNS)
     
     def test_standardize_data_valid(self):
         """Test data standardization with valid data"""
@@ -68,14 +70,47 @@ class TestYahooSource(unittest.TestCase):
             'Volume': [1000, 1500, 2000]
         }, index = pd.to_datetime(['2024-01-01', '2024-01-02', '2024-01-03']))
 
-        result = self.yahoo_source._standardize_data(raw_data)
+        result = self.yahoo_source._standardize_data(raw_data, "AAPL")
+
+        self.assertEqual(list(result.columns), BAR_COLUMNS)
+
+        # Check data types: UTC ts, categorical symbol, float prices
+        self.assertEqual(str(result['ts'].dt.tz), "UTC")
+        self.assertEqual(result['ts'].iloc[0], pd.Timestamp("2024-01-01", tz="UTC"))
+        self.assertIsInstance(result['symbol'].dtype, pd.CategoricalDtype)
+        self.assertEqual(list(result['symbol'].cat.categories), ["AAPL"])
+        self.assertEqual(result['close'].dtype, np.float64)
+        self.assertEqual(result['volume'].tolist(), [1000.0, 1500.0, 2000.0])
+
+    def test_standardize_data_converts_to_utc_without_copying(self):
+        """Exchange-local timestamps become UTC; matching float columns are not copied"""
+        raw_data = pd.DataFrame({
+            'Open': [100.0, 101.0], 'High': [105.0, 106.0], 'Low': [95.0, 96.0], 'Close': [102.0, 103.0],
+            'Volume': [1000.0, 1500.0], 'Dividends': [0.0, 0.0]
+        }, index=pd.DatetimeIndex(['2024-01-02 09:30', '2024-01-02 09:31'], name='Date').tz_localize('America/New_York'))
+
+        result = self.yahoo_source._standardize_data(raw_data, "AAPL")
+
+        self.assertEqual(result['ts'].iloc[0], pd.Timestamp("2024-01-02 14:30", tz="UTC"))
+        for column in ['open', 'high', 'low', 'close', 'volume']:
+            self.assertTrue(np.shares_memory(result[column].to_numpy(), raw_data[column.title()].to_numpy()))
+        # Writes to the result must not leak back into the raw frame (copy-on-write, pandas 3)
+        if not NO_COPY:
+            result.loc[0, 'close'] = 0.0
+            self.assertEqual(raw_data['Close'].iloc[0], 102.0)
+
+    def test_standardize_data_float32_prices(self):
+        source = YahooSource(price_dtype="float32")
+        raw_data = pd.DataFrame({'Open': [1.5], 'High': [2.0], 'Low': [1.0], 'Close': [1.25], 'Volume': [10]},
+                                index=pd.to_datetime(['2024-01-01']))
+
+        result = source._standardize_data(raw_data, "AAPL")
+
+        self.assertEqual(result['open'].dtype, np.float32)
+        self.assertEqual(result['volume'].dtype, np.float64)
+        frames = pd.concat([result, source._standardize_data(raw_data, "MSFT")], ignore_index=True)
+        self.assertEqual(frames['open'].dtype, np.float32)
 
-        expected_columns = ['timestamp', 'open', 'high', 'low', 'close', 'volume']
-        self.assertEqual(list(result.columns), expected_columns)
-        
-        # Check data types
-        self.assertIsInstance(result['timestamp'].iloc[0], pd.Timestamp)
-    
     @patch('yfinance.Ticker')
     def test_fetch_raw_data_success(self, mock_ticker):
         """Test successful raw data fetching"""
@@ -102,6 +137,13 @@ class TestYahooSource(unittest.TestCase):
         with self.assertRaises(DataSourceError):
             self.yahoo_source._fetch_raw_data("INVALID", "1y", "1d")
     
+    @patch('yfinance.Ticker')
+    def test_fetch_raw_data_http_429(self, mock_ticker):
+        """Test that a plain 429 (yfinance without YFRateLimitError) maps to RateLimitError"""
+        mock_ticker.side_effect = Exception("429 Client Error: Too Many Requests")
+        with self.assertRaises(RateLimitError):
+            self.yahoo_source._fetch_raw_data("AAPL", "1y", "1d")
+
     @patch('yfinance.Ticker')
     def test_fetch_data_invalid_symbol(self, mock_ticker):
         """Test fetching data with an invalid symbol"""